@@ -1,25 +1,38 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, send_from_directory
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify, abort, g
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-import os, datetime
+from werkzeug.utils import secure_filename
+import os, io, datetime, json, uuid, time, shutil, tempfile, hashlib, cProfile
 
 from config import Config
-from modules.image_steg.encoder import encode as img_encode
-from modules.image_steg.decoder import decode as img_decode
-from modules.audio_steg.encoder import encode as aud_encode
-from modules.audio_steg.decoder import decode as aud_decode
-from modules.video_steg.encoder import encode as vid_encode
-from modules.video_steg.decoder import decode as vid_decode
+from cache import ResultCache, hash_stream, link_or_copy
+from history import HistoryBuffer, tune_sqlite, upgrade_schema
+from jobs import JobQueue, pinned_paths
+from modules import archive, codecs, metrics
+from modules.capacity import media_for
+from modules.compression import SAMPLE_SIZE as COMPRESSION_SAMPLE
 
 app = Flask(__name__)
 app.config.from_object(Config)
 os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
+os.makedirs(app.config["JOB_FOLDER"], exist_ok=True)
 os.makedirs("instance", exist_ok=True)
+if app.config["METRICS_ENABLED"]:
+    metrics.enable()  # before the job pool starts, so its workers collect too
+# Codecs import NumPy / PIL / OpenCV on first use unless preloaded here (pre-fork servers)
+codecs.preload(app.config["PRELOAD_CODECS"])
 
 db = SQLAlchemy(app)
+with app.app_context():
+    tune_sqlite(db.engine)
 login_manager = LoginManager(app)
 login_manager.login_view = "login"
+job_queue = JobQueue(app.config["SQLALCHEMY_DATABASE_URI"], app.config["JOB_WORKERS_PER_CPU"],
+                     cache=(app.config["CACHE_FOLDER"], app.config["CACHE_MAX_BYTES"]),
+                     lease_seconds=app.config["JOB_LEASE_SECONDS"])
+result_cache = ResultCache(app.config["CACHE_FOLDER"], app.config["CACHE_MAX_BYTES"],
+                           pinned=lambda: pinned_paths(app.config["SQLALCHEMY_DATABASE_URI"]))
 
 # ---------------- DATABASE ----------------
 class User(db.Model, UserMixin):
@@ -28,22 +41,254 @@ class User(db.Model, UserMixin):
     password = db.Column(db.String(200))
 
 class History(db.Model):
+    # the dashboard pages through one user's rows, newest first
+    __table_args__ = (db.Index("ix_history_username_time", "username", "time", "id"),)
+
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50))
     module = db.Column(db.String(20))
     action = db.Column(db.String(20))
     filename = db.Column(db.String(200))
     time = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    duration = db.Column(db.Float)  # seconds
+    carrier_bytes = db.Column(db.Integer)
+    payload_bytes = db.Column(db.Integer)
+    bits = db.Column(db.Integer)
 
-def save_history(module, action, filename):
-    record = History(
+def write_history(rows):
+    # One transaction per batch from the HistoryBuffer thread
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(History.__table__.insert(), rows)
+
+history_buffer = HistoryBuffer(write_history, app.config["HISTORY_BATCH_SIZE"],
+                               app.config["HISTORY_FLUSH_SECONDS"])
+
+@app.before_request
+def start_timer():
+    g.started = time.perf_counter()
+    if app.config["PROFILE_DIR"] and "1" in (request.args.get("profile"), request.headers.get("X-Profile")):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return  # another profiler is active in this interpreter
+        g.profiler = profiler
+
+@app.after_request
+def record_request(response):
+    if metrics.enabled():
+        metrics.observe("stego_http_request_seconds", time.perf_counter() - g.started,
+                        endpoint=request.endpoint or "none", method=request.method,
+                        status=response.status_code)
+    return response
+
+@app.teardown_request
+def dump_profile(exc=None):
+    # One .prof per profiled request, e.g. `python -m pstats <file>` or snakeviz
+    profiler = g.pop("profiler", None)
+    if profiler is None:
+        return
+    profiler.disable()
+    os.makedirs(app.config["PROFILE_DIR"], exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.endpoint or 'none'}-{uuid.uuid4().hex[:8]}.prof"
+    profiler.dump_stats(os.path.join(app.config["PROFILE_DIR"], name))
+
+# The web forms embed at one bit per unit (the batch CLI takes --bits);
+# codec calls and history rows both use this
+WEB_BITS = 1
+
+def history_row(module, action, filename, carrier_bytes=None, payload_bytes=None, bits=None):
+    return {
+        "username": current_user.username,
+        "module": module,
+        "action": action,
+        "filename": filename,
+        "carrier_bytes": carrier_bytes,
+        "payload_bytes": payload_bytes,
+        "bits": bits
+    }
+
+def save_history(module, action, filename, **stats):
+    # Buffered: written in batches, timed from the start of the request
+    row = history_row(module, action, filename, **stats)
+    row["time"] = datetime.datetime.utcnow()
+    row["duration"] = time.perf_counter() - g.started
+    history_buffer.add(row)
+
+class Job(db.Model):
+    id = db.Column(db.String(32), primary_key=True)
+    username = db.Column(db.String(50))
+    task = db.Column(db.String(20))
+    params = db.Column(db.Text)
+    status = db.Column(db.String(10), default="queued")
+    progress = db.Column(db.Float, default=0.0)
+    cleanup = db.Column(db.Text)
+    result = db.Column(db.String(200))
+    error = db.Column(db.String(500))
+    history = db.Column(db.Text)  # history row the worker writes once the job ends
+    cache_key = db.Column(db.String(64))  # result is cached under this key
+    resumable = db.Column(db.Boolean, default=True)  # False when params needed a password (never stored)
+    owner = db.Column(db.String(100))  # "host:pid" of the server process running the job
+    heartbeat = db.Column(db.DateTime)  # owner's last lease renewal; stale jobs are reclaimed
+    created = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+def new_job_dir():
+    job_id = uuid.uuid4().hex
+    job_dir = os.path.join(app.config["JOB_FOLDER"], job_id)
+    os.makedirs(job_dir)
+    return job_id, job_dir
+
+def sweep_job_dirs():
+    # Staged inputs and results are kept for JOB_RETENTION_SECONDS only
+    cutoff = time.time() - app.config["JOB_RETENTION_SECONDS"]
+    for name in os.listdir(app.config["JOB_FOLDER"]):
+        path = os.path.join(app.config["JOB_FOLDER"], name)
+        if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+
+def enqueue_job(task, params, job_id=None, cleanup=(), cache_key=None, history=None):
+    sweep_job_dirs()
+    if task.startswith("video."):
+        # the job pool is the per-CPU cap: a job never starts processes of its own
+        params = dict(params, workers=0)
+    # The password goes to the pool in memory only; such a job is not resumed
+    stored = {name: value for name, value in params.items() if name != "password"}
+    job = Job(
+        id=job_id or uuid.uuid4().hex,
         username=current_user.username,
-        module=module,
-        action=action,
-        filename=filename
+        task=task,
+        params=json.dumps(stored),
+        resumable=not params.get("password"),
+        cleanup=json.dumps(list(cleanup)),
+        history=json.dumps(history) if history else None,
+        cache_key=cache_key,
+        owner=job_queue.owner,
+        heartbeat=datetime.datetime.utcnow()
     )
-    db.session.add(record)
+    db.session.add(job)
     db.session.commit()
+    cache = (app.config["CACHE_FOLDER"], app.config["CACHE_MAX_BYTES"], cache_key) if cache_key else None
+    job_queue.submit(job.id, task, params, cleanup, cache, history)
+    return job
+
+def cached_job(task, job_id, job_dir, cached_path, result_name):
+    # A repeat request: link the cached result into the job folder and
+    # record the job as already done, without touching the pool
+    result_name = secure_filename(result_name) or "result"
+    link_or_copy(cached_path, os.path.join(job_dir, result_name))
+    job = Job(
+        id=job_id,
+        username=current_user.username,
+        task=task,
+        status="done",
+        progress=1.0,
+        result=result_name
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+def job_response(job):
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify(job_id=job.id, status_url=url_for("job_status", job_id=job.id)), 202
+    return redirect(url_for("job_status", job_id=job.id))
+
+def spooled_file():
+    return tempfile.SpooledTemporaryFile(max_size=app.config["SPOOL_MAX_BYTES"])
+
+def stream_download(fileobj, download_name, mimetype="application/octet-stream"):
+    # Generator response: chunks are read lazily and the file is closed
+    # (and a spooled temp file deleted) once the client has it all
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(0)
+
+    def generate():
+        try:
+            while True:
+                chunk = fileobj.read(app.config["STREAM_CHUNK_BYTES"])
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            fileobj.close()
+
+    return Response(generate(), mimetype=mimetype, headers={
+        "Content-Disposition": f'attachment; filename="{secure_filename(download_name)}"',
+        "Content-Length": str(size)
+    })
+
+def cached_bits(cached):
+    # Image decodes are cached as "decoded_<bits>bit.txt"
+    name = os.path.basename(cached.name)
+    return int(name[len("decoded_"):-len("bit.txt")]) if name.startswith("decoded_") else WEB_BITS
+
+def open_cached(key):
+    # Cached result as an open file, or None on a miss (or when key is None)
+    path = result_cache.get(key) if key else None
+    return open(path, "rb") if path else None
+
+def secret_payload(text):
+    # Text alone is hidden as-is; with uploaded files, everything is packed
+    # into one archive payload (raises ValueError on clashing file names)
+    files = [f for f in request.files.getlist("secret_files") if f and f.filename]
+    if not files:
+        return text
+    entries = [("secret.txt", text.encode("utf-8"))] if text else []
+    entries += [(secure_filename(f.filename) or "secret.bin", f.read()) for f in files]
+    return archive.pack(entries)
+
+def payload_bytes(payload):
+    return payload if isinstance(payload, bytes) else payload.encode("utf-8")
+
+def payload_digest(payload):
+    return hashlib.sha256(payload_bytes(payload)).hexdigest()
+
+def stream_size(stream):
+    position = stream.tell()
+    size = stream.seek(0, os.SEEK_END)
+    stream.seek(position)
+    return size
+
+def decoded_response(module, stem, out, carrier_bytes=None, bits=WEB_BITS):
+    # Archive payloads are listed (mode=list), read one entry at a time
+    # (form field "entry") or downloaded whole as a ZIP
+    is_archive = archive.is_archive(out.read(archive.PREFIX_SIZE))
+    out.seek(0)
+    stats = {"carrier_bytes": carrier_bytes, "payload_bytes": stream_size(out), "bits": bits}
+
+    if request.form.get("mode") == "list":
+        with out:
+            entries = archive.read_toc(out.read) if is_archive else []
+        return jsonify(archive=is_archive, entries=[{"name": e.name, "size": e.size} for e in entries])
+
+    if not is_archive:
+        save_history(module, "Decode", stem, **stats)
+        return stream_download(out, stem + "_decoded.txt", "text/plain")
+
+    entry = request.form.get("entry", "").strip()
+    result = spooled_file()
+    try:
+        with out:
+            if entry:
+                found = archive.find(archive.read_toc(out.read), entry)
+                archive.copy_entry(out, found, result)
+                name = secure_filename(found.name) or "extracted.bin"
+            else:
+                archive.to_zip(out, result)
+                name = stem + "_decoded.zip"
+    except ValueError:
+        result.close()
+        raise
+
+    save_history(module, "Decode", name, **stats)
+    return stream_download(result, name)
+
+def upload_stem(upload, default):
+    name = secure_filename(upload.filename or "") or default
+    return name.rsplit(".", 1)[0]
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -86,10 +331,56 @@ def logout():
 @app.route("/dashboard")
 @login_required
 def dashboard():
-    history = History.query.filter_by(
-        username=current_user.username
-    ).order_by(History.time.desc()).all()
-    return render_template("dashboard.html", history=history)
+    # Rows still in the write buffer show up within HISTORY_FLUSH_SECONDS,
+    # when the writer thread stores them; a page load never writes
+    # Keyset pagination: ?before=<time>_<id> of the last row already shown
+    page_size = app.config["HISTORY_PAGE_SIZE"]
+    query = History.query.filter_by(username=current_user.username)
+    cursor = parse_history_cursor(request.args.get("before"))
+    if cursor:
+        query = query.filter(db.tuple_(History.time, History.id) < cursor)
+    rows = query.order_by(History.time.desc(), History.id.desc()).limit(page_size + 1).all()
+
+    history = rows[:page_size]
+    next_cursor = f"{history[-1].time.isoformat()}_{history[-1].id}" if len(rows) > page_size else None
+    return render_template("dashboard.html", history=history, next_cursor=next_cursor,
+                           paged=cursor is not None, trends=throughput_trends())
+
+def parse_history_cursor(value):
+    try:
+        stamp, row_id = value.rsplit("_", 1)
+        return datetime.datetime.fromisoformat(stamp), int(row_id)
+    except (AttributeError, ValueError):
+        return None
+
+def throughput_trends():
+    # Payload throughput per day and operation over the last
+    # HISTORY_TREND_DAYS days, from the timed rows
+    since = datetime.datetime.utcnow() - datetime.timedelta(days=app.config["HISTORY_TREND_DAYS"])
+    day = db.func.date(History.time)
+    rows = db.session.query(
+        day, History.module, History.action, db.func.count(History.id),
+        db.func.sum(History.payload_bytes), db.func.sum(History.duration)
+    ).filter(
+        History.username == current_user.username,
+        History.time >= since,
+        History.duration > 0,
+        History.payload_bytes.isnot(None)
+    ).group_by(day, History.module, History.action).order_by(day.desc(), History.module, History.action)
+
+    return [{
+        "day": d, "module": module, "action": action, "count": count,
+        "seconds": seconds / count, "rate": payload / seconds
+    } for d, module, action, count, payload, seconds in rows]
+
+@app.template_filter("filesize")
+def filesize(value):
+    if value is None:
+        return "-"
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024 or unit == "GB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
 
 
 # ---------------- IMAGE ----------------
@@ -104,53 +395,110 @@ def image():
             flash("Please upload an image", "warning")
             return redirect(url_for("image"))
 
-        in_path = os.path.join(app.config["UPLOAD_FOLDER"], img.filename)
-        img.save(in_path)
+        # Carrier is read straight from the (spooled) upload stream
+        stem = upload_stem(img, "image")
+        password = request.form.get("password") or None
 
         # -------- ENCODE --------
         if mode == "encode":
-            secret = request.form.get("secret", "").strip()
+            try:
+                secret = secret_payload(request.form.get("secret", "").strip())
+            except ValueError as e:
+                flash(str(e), "danger")
+                return redirect(url_for("image"))
             if not secret:
-                flash("Please enter secret text", "warning")
+                flash("Please enter secret text or choose files", "warning")
                 return redirect(url_for("image"))
 
-            out_path = in_path.rsplit(".", 1)[0] + "_stego.png"
-            img_encode(in_path, secret, out_path)
-
-            save_history("Image", "Encode", os.path.basename(out_path))
-
-            return send_from_directory(
-                app.config["UPLOAD_FOLDER"],
-                os.path.basename(out_path),
-                as_attachment=True
-            )
+            scatter = bool(request.form.get("scatter"))
+            # "Keep JPEG": hide in the DCT coefficients instead of writing a PNG;
+            # other carriers still become PNGs, as in the batch CLI
+            jpeg = bool(request.form.get("jpeg")) and \
+                os.path.splitext(img.filename or "")[1].lower() in codecs.get("jpeg").extensions
+            if jpeg:
+                if scatter:
+                    flash("JPEG output supports 1 bit per coefficient and no scatter", "danger")
+                    return redirect(url_for("image"))
+                return encode_jpeg_job(img, stem, secret, password)
+
+            ext, mimetype = ".png", "image/png"
+            # Encrypted results are never cached: a key over the password would let
+            # anyone holding the cache test guesses against it
+            key = None if password else ResultCache.key("image.encode", hash_stream(img.stream),
+                                                        payload_digest(secret), scatter, False)
+            out = open_cached(key)
+            if out is None:
+                try:
+                    out = job_queue.run("image", "encode", img.stream, secret, output=True, bits=WEB_BITS,
+                                        password=password, scatter=scatter)
+                except ValueError as e:
+                    flash(str(e), "danger")
+                    return redirect(url_for("image"))
+                if key:
+                    result_cache.put_stream(key, out, "stego" + ext)
+
+            save_history("Image", "Encode", stem + "_stego" + ext, carrier_bytes=stream_size(img.stream),
+                         payload_bytes=len(payload_bytes(secret)), bits=WEB_BITS)
+            return stream_download(out, stem + "_stego" + ext, mimetype)
 
         # -------- DECODE --------
         else:
+            # Decrypted secrets are never written to the cache
+            key = None if password else ResultCache.key("image.decode", hash_stream(img.stream))
+            out = open_cached(key)
+            if out is not None:
+                bits = cached_bits(out)
+            else:
+                try:
+                    # images from the batch CLI may use more bits: the header says
+                    secret, bits = job_queue.run("image", "decode_bytes", img.stream, password, with_bits=True)
+                except ValueError as e:
+                    flash(str(e), "danger")
+                    return redirect(url_for("image"))
+                except Exception:
+                    flash("No hidden text found or image corrupted", "danger")
+                    return redirect(url_for("image"))
+                out = io.BytesIO(secret)
+                if key:
+                    result_cache.put_stream(key, out, f"decoded_{bits}bit.txt")
+
+            # ✅ SAVE TO TXT FILE (or the archive entries)
             try:
-                decoded_text = img_decode(in_path)
-
-                # ✅ SAVE TO TXT FILE
-                txt_filename = "decoded_image.txt"
-                txt_path = os.path.join(app.config["UPLOAD_FOLDER"], txt_filename)
-
-                with open(txt_path, "w", encoding="utf-8") as f:
-                    f.write(decoded_text)
-
-                save_history("Image", "Decode", os.path.basename(in_path))
-
-                return send_from_directory(
-                    app.config["UPLOAD_FOLDER"],
-                    txt_filename,
-                    as_attachment=True
-                )
-
-            except Exception as e:
-                flash("No hidden text found or image corrupted", "danger")
+                return decoded_response("Image", stem, out, stream_size(img.stream), bits)
+            except ValueError as e:
+                flash(str(e), "danger")
                 return redirect(url_for("image"))
 
     return render_template("image.html")
 
+def encode_jpeg_job(img, stem, secret, password):
+    # Huffman-coding JPEG coefficients is per-symbol Python work that holds
+    # the GIL for seconds on large photos, so it runs on the job pool
+    job_id, job_dir = new_job_dir()
+    out_name = stem + "_stego.jpg"
+    payload = payload_bytes(secret)
+    stats = {"carrier_bytes": stream_size(img.stream), "payload_bytes": len(payload), "bits": 1}  # per coefficient
+    key = None if password else ResultCache.key("image.encode", hash_stream(img.stream), payload_digest(secret),
+                                                False, True)
+    hit = result_cache.get(key) if key else None
+    if hit:
+        job = cached_job("jpeg.encode", job_id, job_dir, hit, out_name)
+        save_history("Image", "Encode", out_name, **stats)
+    else:
+        carrier_path = os.path.join(job_dir, "carrier.jpg")
+        payload_path = os.path.join(job_dir, "secret.bin")
+        img.save(carrier_path)
+        with open(payload_path, "wb") as f:
+            f.write(payload)
+        job = enqueue_job("jpeg.encode", {
+            "input_image_path": carrier_path,
+            "secret_path": payload_path,
+            "output_image_path": os.path.join(job_dir, out_name),
+            "password": password
+        }, job_id=job_id, cleanup=(carrier_path, payload_path), cache_key=key,
+           history=history_row("Image", "Encode", out_name, **stats))
+    return job_response(job)
+
 
 
 # ---------------- AUDIO ----------------
@@ -165,37 +513,59 @@ def audio():
             flash("Please upload a WAV file", "warning")
             return redirect(url_for("audio"))
 
-        in_path = os.path.join(app.config["UPLOAD_FOLDER"], wav.filename)
-        wav.save(in_path)
+        # Carrier is read straight from the (spooled) upload stream
+        stem = upload_stem(wav, "audio")
+        password = request.form.get("password") or None
 
         # -------- ENCODE --------
         if mode == "encode":
-            secret = request.form.get("secret", "").strip()
+            try:
+                secret = secret_payload(request.form.get("secret", "").strip())
+            except ValueError as e:
+                flash(str(e), "danger")
+                return redirect(url_for("audio"))
             if not secret:
-                flash("Please enter secret text", "warning")
+                flash("Please enter secret text or choose files", "warning")
                 return redirect(url_for("audio"))
 
-            out_path = in_path.replace(".wav", "_stego.wav")
-            aud_encode(in_path, secret, out_path)
-
-            save_history("Audio", "Encode", os.path.basename(out_path))
-            return send_from_directory(
-                app.config["UPLOAD_FOLDER"],
-                os.path.basename(out_path),
-                as_attachment=True
-            )
+            scatter = bool(request.form.get("scatter"))
+            key = None if password else ResultCache.key("audio.encode", hash_stream(wav.stream),
+                                                        payload_digest(secret), scatter)
+            out = open_cached(key)
+            if out is None:
+                try:
+                    out = job_queue.run("audio", "encode", wav.stream, secret, output=True, bits=WEB_BITS,
+                                        password=password, scatter=scatter)
+                except ValueError as e:
+                    flash(str(e), "danger")
+                    return redirect(url_for("audio"))
+                if key:
+                    result_cache.put_stream(key, out, "stego.wav")
+
+            save_history("Audio", "Encode", stem + "_stego.wav", carrier_bytes=stream_size(wav.stream),
+                         payload_bytes=len(payload_bytes(secret)), bits=WEB_BITS)
+            return stream_download(out, stem + "_stego.wav", "audio/wav")
 
         # -------- DECODE --------
         else:
-            out_path = in_path.replace(".wav", "_decoded.txt")
-            aud_decode(in_path, out_path)
+            # Decrypted secrets are never written to the cache
+            key = None if password else ResultCache.key("audio.decode", hash_stream(wav.stream))
+            out = open_cached(key)
+            if out is None:
+                try:
+                    data = job_queue.run("audio", "decode", wav.stream, bits=WEB_BITS, password=password)
+                except ValueError as e:
+                    flash(str(e), "danger")
+                    return redirect(url_for("audio"))
+                out = io.BytesIO(data)
+                if key:
+                    result_cache.put_stream(key, out, "decoded.txt")
 
-            save_history("Audio", "Decode", os.path.basename(in_path))
-            return send_from_directory(
-                app.config["UPLOAD_FOLDER"],
-                os.path.basename(out_path),
-                as_attachment=True
-            )
+            try:
+                return decoded_response("Audio", stem, out, stream_size(wav.stream))
+            except ValueError as e:
+                flash(str(e), "danger")
+                return redirect(url_for("audio"))
 
     return render_template("audio.html")
 
@@ -211,57 +581,247 @@ def video():
             flash("Please upload a video", "warning")
             return redirect(url_for("video"))
 
-        v_path = os.path.join(app.config["UPLOAD_FOLDER"], video.filename)
-        video.save(v_path)
+        password = request.form.get("password") or None
+        secret_text = request.form.get("secret_text", "").strip()
+        secret_files = [f for f in request.files.getlist("secret_file") if f and f.filename]
+        if mode == "encode" and not secret_text and not secret_files:
+            flash("Provide secret text or file", "warning")
+            return redirect(url_for("video"))
+        scatter = bool(request.form.get("scatter"))
+        if mode == "encode" and scatter and not password:
+            flash("Scattered embedding needs a password", "warning")
+            return redirect(url_for("video"))
+
+        # OpenCV needs a real file: the carrier is stored once under its
+        # content hash in the cache, and the job works from that blob
+        v_name = secure_filename(video.filename or "") or "carrier"
+        v_digest, v_path = result_cache.store_blob(video, os.path.splitext(v_name)[1])
 
-        if mode == "encode":
-            secret_text = request.form.get("secret_text", "").strip()
-            secret_file = request.files.get("secret_file")
+        if mode == "list":
+            # Only the archive's table of contents is decoded
+            try:
+                entries = codecs.get("video").list_contents(v_path, password=password)
+            except ValueError as e:
+                return jsonify(error=str(e)), 400
+            return jsonify(archive=entries is not None,
+                           entries=[{"name": e.name, "size": e.size} for e in entries or ()])
 
-            if secret_text:
-                payload_path = os.path.join(
-                    app.config["UPLOAD_FOLDER"],
-                    f"video_secret_{int(datetime.datetime.now().timestamp())}.txt"
-                )
-                with open(payload_path, "w", encoding="utf-8") as f:
-                    f.write(secret_text)
+        job_id, job_dir = new_job_dir()
 
-            elif secret_file and secret_file.filename:
-                payload_path = os.path.join(app.config["UPLOAD_FOLDER"], secret_file.filename)
-                secret_file.save(payload_path)
+        if mode == "encode":
+            # Text and files are each stored once; several secrets are
+            # packed into one archive payload and embedded in a single pass
+            secrets = []
+            if secret_text:
+                secrets.append(("secret.txt", ResultCache.key(secret_text), None))
+            for secret_file in secret_files:
+                digest, blob = result_cache.store_blob(secret_file)
+                secrets.append((secure_filename(secret_file.filename) or "secret.bin", digest, blob))
+            payload_name = secrets[0][0] if len(secrets) == 1 else archive.DEFAULT_NAME
+
+            out_name = v_name.rsplit(".", 1)[0] + "_stego.mkv"
+            stats = {
+                "carrier_bytes": os.path.getsize(v_path),
+                "payload_bytes": len(secret_text.encode("utf-8")) + sum(
+                    os.path.getsize(blob) for _, _, blob in secrets if blob),
+                "bits": WEB_BITS
+            }
+            # payload names are embedded with the data, so they are part of the key
+            # (encrypted results are never cached, see image())
+            key = None if password else ResultCache.key("video.encode", v_digest, [s[:2] for s in secrets], scatter)
+            hit = result_cache.get(key) if key else None
+            if hit:
+                job = cached_job("video.encode", job_id, job_dir, hit, out_name)
+                save_history("Video", "Encode", out_name, **stats)
+            else:
+                payload_path = os.path.join(job_dir, payload_name)
+                if len(secrets) > 1:
+                    try:
+                        archive.write([
+                            (name, blob or secret_text.encode("utf-8")) for name, _, blob in secrets
+                        ], payload_path)
+                    except ValueError as e:
+                        shutil.rmtree(job_dir, ignore_errors=True)
+                        flash(str(e), "danger")
+                        return redirect(url_for("video"))
+                elif secrets[0][2]:
+                    link_or_copy(secrets[0][2], payload_path)
+                else:
+                    with open(payload_path, "w", encoding="utf-8") as f:
+                        f.write(secret_text)
+
+                job = enqueue_job("video.encode", {
+                    "input_video_path": v_path,
+                    "secret": payload_path,
+                    "output_video_path": os.path.join(job_dir, out_name),
+                    "password": password,
+                    "bits": WEB_BITS,
+                    "scatter": scatter
+                }, job_id=job_id, cleanup=(payload_path,), cache_key=key,
+                   history=history_row("Video", "Encode", out_name, **stats))
+
+            return job_response(job)
 
+        else:  # decode
+            # One archive entry only, when named
+            entry = request.form.get("entry", "").strip() or None
+            # Decrypted payloads are never written to the cache
+            key = None if password else ResultCache.key("video.decode", v_digest, entry)
+            hit = result_cache.get(key) if key else None
+            stats = {"carrier_bytes": os.path.getsize(v_path), "bits": WEB_BITS}
+            if hit:
+                job = cached_job("video.decode", job_id, job_dir, hit, os.path.basename(hit))
+                save_history("Video", "Decode", v_name, payload_bytes=os.path.getsize(hit), **stats)
             else:
-                flash("Provide secret text or file", "warning")
-                return redirect(url_for("video"))
+                # the worker fills in the payload size from the extracted file
+                job = enqueue_job("video.decode", {
+                    "stego_video_path": v_path,
+                    "output_path": job_dir,
+                    "password": password,
+                    "bits": WEB_BITS,
+                    "entry": entry
+                }, job_id=job_id, cache_key=key, history=history_row("Video", "Decode", v_name, **stats))
 
-            out_path = v_path.rsplit(".", 1)[0] + "_stego.mkv"
-            vid_encode(v_path, payload_path, out_path)
+            return job_response(job)
 
-            save_history("Video", "Encode", os.path.basename(out_path))
+    return render_template("video.html")
 
-            return send_from_directory(
-                app.config["UPLOAD_FOLDER"],
-                os.path.basename(out_path),
-                as_attachment=True
-            )
 
-        else:  # decode
-            try:
-               extracted_file = vid_decode(v_path, app.config["UPLOAD_FOLDER"])
-               save_history("Video", "Decode", os.path.basename(v_path))
-               return send_from_directory(
-                   app.config["UPLOAD_FOLDER"],
-                   os.path.basename(extracted_file),
-                   as_attachment=True
-                )
-            except ValueError as e:
-                flash(str(e), "danger")
-                return redirect(url_for("video"))
+# ---------------- CAPACITY ----------------
+@app.route("/capacity", methods=["POST"])
+@login_required
+def capacity():
+    """
+    Maximum payload per bits-per-unit setting, from carrier metadata only.
+
+    Form fields: carrier (file), media (optional), payload_size (bytes),
+    payload_sample (file: the first bytes of the payload, optional),
+    password ("1" if the payload will be encrypted), filename (video payload name)
+    """
+    carrier = request.files.get("carrier")
+    if not carrier:
+        return jsonify(error="carrier file is required"), 400
+
+    media = request.form.get("media") or media_for(carrier.filename or "")
+    sample = request.files.get("payload_sample")
+    try:
+        codec = codecs.get(media)
+        payload_size = request.form.get("payload_size", type=int)
+        params = dict(
+            payload_size=payload_size,
+            payload_sample=sample.stream.read(COMPRESSION_SAMPLE) if sample else None,
+            password=request.form.get("password") in ("1", "true", "on"),
+            name=request.form.get("filename", "")
+        )
 
-    return render_template("video.html")
+        if media == "video":
+            # OpenCV needs a real file; only its stream info is read
+            suffix = os.path.splitext(carrier.filename or "")[1] or ".mp4"
+            with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+                carrier.save(tmp)
+                tmp.flush()
+                report = codec.capacity(tmp.name, **params)
+        else:
+            report = codec.capacity(carrier.stream, **params)
+    except (ValueError, OSError) as e:
+        # OSError: PIL could not identify the image
+        return jsonify(error=str(e) or "Unreadable carrier"), 400
 
+    return jsonify(report)
 
-if __name__ == "__main__":
+
+# ---------------- SCAN ----------------
+@app.route("/scan", methods=["POST"])
+@login_required
+def scan():
+    """
+    Steganalysis screening score for one carrier (modules.steganalysis).
+
+    Form fields: carrier (file), media (optional)
+    """
+    carrier = request.files.get("carrier")
+    if not carrier:
+        return jsonify(error="carrier file is required"), 400
+
+    media = request.form.get("media") or media_for(carrier.filename or "")
+    try:
+        codec = codecs.get(media)
+        if media == "video":
+            # OpenCV needs a real file; only the first frames are decoded
+            suffix = os.path.splitext(carrier.filename or "")[1] or ".mp4"
+            with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+                carrier.save(tmp)
+                tmp.flush()
+                report = codec.scan(tmp.name)
+        else:
+            report = job_queue.run(media, "scan", carrier.stream)
+    except (ValueError, OSError) as e:
+        return jsonify(error=str(e) or "Unreadable carrier"), 400
+
+    return jsonify(report)
+
+
+# ---------------- JOBS ----------------
+def get_user_job(job_id):
+    job = db.session.get(Job, job_id)
+    if job is None or job.username != current_user.username:
+        abort(404)
+    return job
+
+@app.route("/jobs/<job_id>")
+@login_required
+def job_status(job_id):
+    job = get_user_job(job_id)
+
+    if request.accept_mimetypes.best != "application/json":
+        return render_template("job.html", job=job)
+
+    status = {
+        "id": job.id,
+        "task": job.task,
+        "status": job.status,
+        "progress": round(job.progress or 0.0, 4),
+        "error": job.error
+    }
+    if job.status == "done":
+        status["download_url"] = url_for("job_download", job_id=job.id)
+    return jsonify(status)
+
+@app.route("/metrics")
+def metrics_page():
+    # Prometheus scrape target; only served when metrics are enabled
+    if not metrics.enabled():
+        abort(404)
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.route("/jobs/<job_id>/download")
+@login_required
+def job_download(job_id):
+    job = get_user_job(job_id)
+    if job.status != "done":
+        abort(404)
+
+    path = os.path.join(app.config["JOB_FOLDER"], job.id, job.result)
+    if not os.path.isfile(path):
+        abort(410)  # swept after JOB_RETENTION_SECONDS
+    return stream_download(open(path, "rb"), job.result)
+
+
+def prepare():
+    # Once per server process: tables (and columns / indexes added since
+    # they were created), then the job leases: jobs left by a stopped
+    # process are claimed, and this process's own leases are kept alive
     with app.app_context():
         db.create_all()
+        upgrade_schema(db.engine, db.metadata)
+    job_queue.start()
+
+def shutdown():
+    history_buffer.close()
+    job_queue.shutdown()
+
+
+if __name__ == "__main__":
+    # Development server; see asgi.py for production
+    prepare()
     app.run(debug=True)
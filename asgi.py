@@ -0,0 +1,171 @@
+"""
+ASGI entry point for production servers.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 8000
+
+app.py stays a WSGI (Flask) application, served by a2wsgi's
+WSGIMiddleware on a bounded thread pool (ASGI_THREADS). SpooledBody sits
+in front of it so one process keeps many slow clients in flight:
+
+- the request body is received on the event loop and spooled to memory
+  (or a temp file past UPLOAD_SPOOL_BYTES) before the view runs, so a
+  slow upload holds no thread while it trickles in; bodies over
+  MAX_CONTENT_LENGTH get a 413 before they are read
+- image / audio codec calls and screening scans run on the job process
+  pool (JobQueue.run) while the view thread waits, and video work and
+  Keep JPEG encodes run there as jobs, so no codec work holds the GIL of
+  a view thread. JPEG decodes and capacity probes stay in the view but
+  only read the coefficient rows they need
+- lifespan startup creates / upgrades the tables and starts the job
+  leases (claiming jobs whose lease expired), shutdown writes pending
+  history rows and stops the job pool
+
+Several server processes may share the database: job leases make sure
+an interrupted job is run again by one of them only. Each process has
+its own job pool sized per CPU, so one process per host already uses
+every CPU.
+"""
+
+import asyncio
+import tempfile
+import time
+
+from a2wsgi import WSGIMiddleware
+
+from app import app, prepare, shutdown
+from modules import metrics
+
+# Request body chunks handed on to the WSGI side
+BODY_CHUNK_BYTES = 256 * 1024
+
+
+class SpooledBody:
+    """
+    ASGI middleware: receive the whole request body on the event loop
+    before the wrapped application sees the request, and run the app's
+    start-up / shut-down hooks on the lifespan scope.
+
+    asgi_app    : the wrapped ASGI application
+    spool_bytes : request bodies up to this size stay in memory
+    max_body    : reject larger request bodies with 413 (None: no limit)
+    on_startup  : called once (on a thread) before the first request
+    on_shutdown : called once (on a thread) when the server stops
+    """
+
+    def __init__(self, asgi_app, spool_bytes=1 << 20, max_body=None, on_startup=None, on_shutdown=None):
+        self.asgi_app = asgi_app
+        self.spool_bytes = spool_bytes
+        self.max_body = max_body
+        self.on_startup = on_startup
+        self.on_shutdown = on_shutdown
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+        else:
+            await self.asgi_app(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    if self.on_startup:
+                        await asyncio.to_thread(self.on_startup)
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+
+            elif message["type"] == "lifespan.shutdown":
+                if self.on_shutdown:
+                    await asyncio.to_thread(self.on_shutdown)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        length = _content_length(scope)
+        if self.max_body is not None and length is not None and length > self.max_body:
+            await _plain(send, 413, b"Request body too large")
+            return
+
+        body = await self._read_body(receive)
+        if body is None:
+            return  # client went away mid-upload
+        if body is False:
+            await _plain(send, 413, b"Request body too large")
+            return
+
+        # The spooled size is authoritative (chunked uploads send no length)
+        size = body.seek(0, 2)
+        body.seek(0)
+        headers = [(name, value) for name, value in scope["headers"] if name.lower() != b"content-length"]
+        scope = dict(scope, headers=headers + [(b"content-length", str(size).encode())])
+
+        async def replay():
+            chunk = body.read(BODY_CHUNK_BYTES)
+            return {"type": "http.request", "body": chunk, "more_body": len(chunk) == BODY_CHUNK_BYTES}
+
+        try:
+            await self.asgi_app(scope, replay, send)
+        finally:
+            body.close()
+
+    async def _read_body(self, receive):
+        """
+        Spool the request body; None if the client disconnected, False if
+        it grew past max_body.
+        """
+        body = tempfile.SpooledTemporaryFile(max_size=self.spool_bytes)
+        size = 0
+        started = time.perf_counter()
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                body.close()
+                return None
+
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if self.max_body is not None and size > self.max_body:
+                body.close()
+                return False
+            if chunk:
+                body.write(chunk)
+            if not message.get("more_body", False):
+                body.seek(0)
+                if size:
+                    metrics.observe("stego_http_upload_seconds", time.perf_counter() - started)
+                    metrics.observe("stego_http_upload_bytes", size)
+                return body
+
+
+# --------------------------------------------------
+# Helpers
+# --------------------------------------------------
+def _content_length(scope):
+    for name, value in scope["headers"]:
+        if name.lower() == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+async def _plain(send, status, text):
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"text/plain"),
+                            (b"content-length", str(len(text)).encode())]})
+    await send({"type": "http.response.body", "body": text})
+
+
+application = SpooledBody(
+    WSGIMiddleware(app, workers=app.config["ASGI_THREADS"]),
+    spool_bytes=app.config["UPLOAD_SPOOL_BYTES"],
+    max_body=app.config["MAX_CONTENT_LENGTH"],
+    on_startup=prepare,
+    on_shutdown=shutdown,
+)
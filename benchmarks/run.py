@@ -0,0 +1,399 @@
+"""
+Benchmark harness for the image, audio and video codecs.
+
+Generates synthetic carriers and payloads, times the encode/decode entry
+points in modules/*/encoder.py and decoder.py, and writes one JSON record
+per case. Each case runs in a fresh process so peak RSS is per case.
+
+    python -m benchmarks.run --preset quick --out bench.json
+    python -m benchmarks.run --out new.json --baseline bench.json --threshold 0.2
+
+With --baseline the run exits with status 1 if any case's encode or
+decode throughput dropped by more than --threshold (a fraction).
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import queue
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+PRESETS = {
+    "quick": {
+        "image_mp": [1, 4],
+        "audio_minutes": [1, 10],
+        "video": [((640, 360), 2)],
+        "payload_kb": [1, 256],
+        "bits": [1, 2],
+    },
+    "full": {
+        "image_mp": [1, 4, 12, 24],
+        "audio_minutes": [1, 10, 60],
+        "video": [((640, 360), 5), ((1280, 720), 5), ((1920, 1080), 10)],
+        "payload_kb": [1, 64, 1024, 8192],
+        "bits": [1, 2],
+    },
+}
+
+# Throughput metrics compared against a baseline run
+TRACKED = ("encode_payload_MBps", "decode_payload_MBps")
+
+MB = 1024 * 1024
+POLL_SECONDS = 1.0
+
+
+# --------------------------------------------------
+# Synthetic carriers
+# --------------------------------------------------
+def make_image(path, megapixels, rng):
+    from PIL import Image
+
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    # smooth gradient plus noise, so PNG sizes look like photos rather than static
+    grad = np.linspace(0, 200, width, dtype=np.float32)[None, :, None]
+    pixels = grad + rng.integers(0, 40, (height, width, 3), dtype=np.uint8)
+    Image.fromarray(pixels.astype(np.uint8)).save(path, format="PNG", compress_level=1)
+
+
+def make_audio(path, minutes, rng, rate=44100, channels=2):
+    nframes = int(minutes * 60 * rate)
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        block = rate * 10
+        t = np.arange(block) / rate
+        tone = (8000 * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+        for start in range(0, nframes, block):
+            n = min(block, nframes - start)
+            noise = rng.integers(-200, 200, (n, channels), dtype=np.int16)
+            wf.writeframes((tone[:n, None] + noise).astype("<i2").tobytes())
+
+
+def make_video(path, size, seconds, rng, fps=25):
+    import cv2
+
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"FFV1"), fps, (width, height))
+    base = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    for i in range(int(seconds * fps)):
+        writer.write(np.roll(base, i * 4, axis=1))
+    writer.release()
+
+
+# --------------------------------------------------
+# Cases
+# --------------------------------------------------
+def build_cases(preset):
+    cases = []
+    for payload_kb in preset["payload_kb"]:
+        for bits in preset["bits"]:
+            for mp_ in preset["image_mp"]:
+                cases.append({"media": "image", "carrier": {"megapixels": mp_},
+                              "payload_kb": payload_kb, "bits": bits})
+            for minutes in preset["audio_minutes"]:
+                cases.append({"media": "audio", "carrier": {"minutes": minutes},
+                              "payload_kb": payload_kb, "bits": bits})
+            for size, seconds in preset["video"]:
+                cases.append({"media": "video", "carrier": {"size": list(size), "seconds": seconds},
+                              "payload_kb": payload_kb, "bits": bits})
+    for case in cases:
+        carrier = "-".join(f"{k}={v if not isinstance(v, list) else 'x'.join(map(str, v))}"
+                           for k, v in case["carrier"].items())
+        case["id"] = f"{case['media']}/{carrier}/payload={case['payload_kb']}KB/bits={case['bits']}"
+    return cases
+
+
+def carrier_path(workdir, case):
+    ext = {"image": "png", "audio": "wav", "video": "mkv"}[case["media"]]
+    key = "_".join(str(v).replace(" ", "").replace(",", "x") for v in case["carrier"].values())
+    return os.path.join(workdir, f"carrier_{case['media']}_{key}.{ext}")
+
+
+def ensure_carrier(workdir, case):
+    path = carrier_path(workdir, case)
+    if not os.path.exists(path):
+        rng = np.random.default_rng(0)
+        carrier = case["carrier"]
+        if case["media"] == "image":
+            make_image(path, carrier["megapixels"], rng)
+        elif case["media"] == "audio":
+            make_audio(path, carrier["minutes"], rng)
+        else:
+            make_video(path, tuple(carrier["size"]), carrier["seconds"], rng)
+    return path
+
+
+def capacity_bytes(case, carrier):
+    bits = case["bits"]
+    if case["media"] == "image":
+        from PIL import Image
+        from modules.image_steg.image_core import capacity_bytes as image_capacity
+        with Image.open(carrier) as img:
+            shape = (img.height, img.width, len(img.getbands()))
+        return image_capacity(shape, bits)
+    if case["media"] == "audio":
+        from modules.audio_steg.encoder_core import estimate_capacity
+        from modules.container import HEADER_SIZE
+        return estimate_capacity(carrier, bits) // 8 - HEADER_SIZE
+    import cv2
+    cap = cv2.VideoCapture(carrier)
+    units = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) * int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) * 3
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return units * frames * bits // 8
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process in MB. ru_maxrss survives
+    exec on Linux (it would report the parent's peak), so prefer VmHWM.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return rss / MB if sys.platform == "darwin" else rss / 1024
+
+
+def _round_trip(case, carrier, payload, payload_path, workdir):
+    """
+    Encode then decode once through the public wrappers.
+
+    returns : (encode seconds, decode seconds, stego path, decoded path)
+    """
+    bits = case["bits"]
+
+    if case["media"] == "image":
+        from modules.image_steg.encoder import encode
+        from modules.image_steg.decoder import decode
+        stego = os.path.join(workdir, "stego.png")
+        out = os.path.join(workdir, "decoded.bin")
+        t0 = time.perf_counter()
+        encode(carrier, payload, stego, bits=bits)
+        t1 = time.perf_counter()
+        decode(stego, out)
+        t2 = time.perf_counter()
+
+    elif case["media"] == "audio":
+        from modules.audio_steg.encoder import encode
+        from modules.audio_steg.decoder import decode
+        stego = os.path.join(workdir, "stego.wav")
+        out = os.path.join(workdir, "decoded.bin")
+        t0 = time.perf_counter()
+        encode(carrier, payload_path, stego, bits=bits)
+        t1 = time.perf_counter()
+        decode(stego, out, bits=bits)
+        t2 = time.perf_counter()
+
+    else:
+        from modules.video_steg.encoder import encode
+        from modules.video_steg.decoder import decode
+        stego = os.path.join(workdir, "stego.mkv")
+        outdir = os.path.join(workdir, "decoded")
+        os.makedirs(outdir, exist_ok=True)
+        t0 = time.perf_counter()
+        encode(carrier, payload_path, stego, bits=bits)
+        t1 = time.perf_counter()
+        out = decode(stego, outdir, bits=bits)
+        t2 = time.perf_counter()
+
+    return t1 - t0, t2 - t1, stego, out
+
+
+def time_case(case, carrier, workdir, repeat=1):
+    """
+    Time the best of `repeat` encode + decode round trips.
+    Executed in a child process.
+    """
+    payload = np.random.default_rng(1).integers(0, 256, case["payload_kb"] * 1024, dtype=np.uint8).tobytes()
+    payload_path = os.path.join(workdir, "payload.bin")
+    with open(payload_path, "wb") as f:
+        f.write(payload)
+
+    encode_s = decode_s = float("inf")
+    for _ in range(repeat):
+        enc, dec, stego, out = _round_trip(case, carrier, payload, payload_path, workdir)
+        encode_s, decode_s = min(encode_s, enc), min(decode_s, dec)
+
+    frames = None
+    if case["media"] == "video":
+        import cv2
+        cap = cv2.VideoCapture(carrier)
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+
+    with open(out, "rb") as f:
+        ok = f.read() == payload
+
+    carrier_mb = os.path.getsize(carrier) / MB
+    payload_mb = len(payload) / MB
+    result = {
+        "ok": ok,
+        "encode_s": round(encode_s, 6),
+        "decode_s": round(decode_s, 6),
+        "encode_payload_MBps": round(payload_mb / encode_s, 4),
+        "decode_payload_MBps": round(payload_mb / decode_s, 4),
+        "encode_carrier_MBps": round(carrier_mb / encode_s, 4),
+        "carrier_MB": round(carrier_mb, 3),
+        "stego_MB": round(os.path.getsize(stego) / MB, 3),
+        "peak_rss_MB": round(peak_rss_mb(), 1),
+    }
+    if frames:
+        result["encode_fps"] = round(frames / encode_s, 2)
+    return result
+
+
+def _child(case, carrier, workdir, repeat, results):
+    try:
+        results.put(time_case(case, carrier, workdir, repeat))
+    except Exception as e:
+        results.put({"error": f"{e.__class__.__name__}: {e}"})
+
+
+def _wait_result(proc, results, timeout=None):
+    """
+    The child's result, or an error record if it died (OOM killer, crash)
+    or ran past `timeout` seconds.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        try:
+            return results.get(timeout=POLL_SECONDS)
+        except queue.Empty:
+            pass
+        if proc.exitcode is not None:
+            # a result put just before exiting may still be in flight
+            try:
+                return results.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                return {"error": f"benchmark process exited with code {proc.exitcode}"}
+        if deadline is not None and time.monotonic() > deadline:
+            proc.terminate()
+            return {"error": f"timed out after {timeout:g} s"}
+
+
+def run_case(case, workdir, repeat=1, timeout=None):
+    carrier = ensure_carrier(workdir, case)
+    capacity = capacity_bytes(case, carrier)
+    record = dict(case, capacity_bytes=capacity)
+
+    payload_bytes = case["payload_kb"] * 1024
+    if payload_bytes > capacity:
+        record["skipped"] = "payload exceeds capacity"
+        return record
+    record["capacity_utilisation"] = round(payload_bytes / capacity, 6)
+
+    case_dir = tempfile.mkdtemp(dir=workdir)
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(case, carrier, case_dir, repeat, results))
+    proc.start()
+    record.update(_wait_result(proc, results, timeout))
+    proc.join()
+    shutil.rmtree(case_dir, ignore_errors=True)
+    return record
+
+
+# --------------------------------------------------
+# Regression check
+# --------------------------------------------------
+def compare(records, baseline, threshold):
+    """
+    Return a list of human-readable regressions versus a baseline run.
+    """
+    old = {r["id"]: r for r in baseline["results"]}
+    regressions = []
+    for record in records:
+        prev = old.get(record["id"])
+        if not prev:
+            continue
+        for metric in TRACKED:
+            if metric in record and metric in prev and prev[metric] > 0:
+                change = record[metric] / prev[metric] - 1
+                if change < -threshold:
+                    regressions.append(
+                        f"{record['id']}: {metric} {prev[metric]} -> {record[metric]} ({change:+.1%})"
+                    )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the steganography codecs")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="quick")
+    parser.add_argument("--media", nargs="*", choices=["image", "audio", "video"],
+                        help="only run these media types")
+    parser.add_argument("--out", default="bench.json", help="JSON results file")
+    parser.add_argument("--baseline", help="previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed throughput drop before failing (fraction)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="round trips per case; the fastest one is reported")
+    parser.add_argument("--workdir", help="keep generated carriers here between runs")
+    parser.add_argument("--timeout", type=float, help="seconds before a case is stopped and recorded as an error")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="stego-bench-")
+    os.makedirs(workdir, exist_ok=True)
+
+    cases = build_cases(PRESETS[args.preset])
+    if args.media:
+        cases = [c for c in cases if c["media"] in args.media]
+
+    records = []
+    for case in cases:
+        record = run_case(case, workdir, args.repeat, args.timeout)
+        records.append(record)
+        status = record.get("skipped") or record.get("error") or (
+            f"enc {record['encode_payload_MBps']} MB/s, dec {record['decode_payload_MBps']} MB/s, "
+            f"rss {record['peak_rss_MB']} MB" + ("" if record["ok"] else " MISMATCH")
+        )
+        print(f"{case['id']:<60} {status}", flush=True)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "preset": args.preset,
+        "repeat": args.repeat,
+        "results": records,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    failed = [r for r in records if r.get("error") or r.get("ok") is False]
+    if failed:
+        print(f"{len(failed)} case(s) failed", file=sys.stderr)
+        return 1
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(records, json.load(f), args.threshold)
+        for line in regressions:
+            print("REGRESSION " + line, file=sys.stderr)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
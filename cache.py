@@ -0,0 +1,189 @@
+"""
+Content-addressed, size-bounded disk cache for uploads and results.
+
+    <root>/blobs/<sha256><ext>      uploaded carriers / payloads, stored once
+    <root>/results/<key>/<name>     output of a task, keyed by a hash of its
+                                    inputs' digests and parameters
+
+Entries are plain files, so a cached result can be streamed or hard-linked
+into a job folder directly. Every hit refreshes the entry's mtime, and
+evict() removes the least recently used entries once the cache grows past
+max_bytes. Blobs that queued or running jobs still reference are pinned
+(the `pinned` callable, see jobs.pinned_paths) and never evicted, however
+long the job waits; `min_age` only covers the moment between storing an
+upload and queueing its job.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_stream(fileobj):
+    """
+    SHA-256 of a seekable binary file object; the position is reset to 0.
+    """
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def hash_file(path):
+    with open(path, "rb") as f:
+        return hash_stream(f)
+
+
+def link_or_copy(src, dst):
+    """
+    Hard-link `src` to `dst`, copying when the filesystem cannot link.
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+class ResultCache:
+
+    def __init__(self, root, max_bytes, min_age=60, pinned=None):
+        """
+        pinned : optional callable returning the paths that must be kept
+        """
+        self.root = root
+        self.blobs = os.path.join(root, "blobs")
+        self.results = os.path.join(root, "results")
+        self.max_bytes = max_bytes
+        self.min_age = min_age
+        self.pinned = pinned
+        os.makedirs(self.blobs, exist_ok=True)
+        os.makedirs(self.results, exist_ok=True)
+
+    @staticmethod
+    def key(*parts):
+        """
+        Cache key for a task: a hash over input digests and parameters.
+        """
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    # --------------------------------------------------
+    # Deduplicated uploads
+    # --------------------------------------------------
+    def store_blob(self, upload, suffix=""):
+        """
+        Store an uploaded file under its content hash (once).
+
+        upload : werkzeug FileStorage or binary file object
+        returns : (sha256 hex digest, blob path)
+        """
+        stream = getattr(upload, "stream", upload)
+        fd, tmp_path = tempfile.mkstemp(dir=self.blobs, suffix=".part")
+        digest = hashlib.sha256()
+        with os.fdopen(fd, "wb") as tmp:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                tmp.write(chunk)
+
+        digest = digest.hexdigest()
+        path = os.path.join(self.blobs, digest + suffix.lower())
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            os.utime(path)
+        else:
+            os.replace(tmp_path, path)
+            self.evict()
+        return digest, path
+
+    # --------------------------------------------------
+    # Results
+    # --------------------------------------------------
+    def get(self, key):
+        """
+        Path of the cached result for `key`, or None.
+        """
+        entry = os.path.join(self.results, key)
+        try:
+            names = [n for n in os.listdir(entry) if not n.endswith(".part")]
+        except FileNotFoundError:
+            return None
+        if not names:
+            return None
+        os.utime(entry)
+        return os.path.join(entry, names[0])
+
+    def _new_entry(self, key, name):
+        entry = os.path.join(self.results, key)
+        os.makedirs(entry, exist_ok=True)
+        return entry, os.path.join(entry, os.path.basename(name) or "result")
+
+    def put_file(self, key, src, name=None):
+        """
+        Cache an existing result file (hard-linked when possible).
+        """
+        entry, path = self._new_entry(key, name or os.path.basename(src))
+        if not os.path.exists(path):
+            tmp = path + ".part"
+            link_or_copy(src, tmp)
+            os.replace(tmp, path)
+        os.utime(entry)
+        self.evict()
+        return path
+
+    def put_stream(self, key, fileobj, name):
+        """
+        Cache the contents of a binary file object; its position is reset to 0.
+        """
+        entry, path = self._new_entry(key, name)
+        tmp = path + ".part"
+        fileobj.seek(0)
+        with open(tmp, "wb") as f:
+            shutil.copyfileobj(fileobj, f, CHUNK_SIZE)
+        fileobj.seek(0)
+        os.replace(tmp, path)
+        self.evict()
+        return path
+
+    # --------------------------------------------------
+    # LRU eviction
+    # --------------------------------------------------
+    def _entries(self):
+        for entry in os.scandir(self.blobs):
+            if entry.is_file() and not entry.name.endswith(".part"):
+                st = entry.stat()
+                yield st.st_mtime, st.st_size, entry.path
+        for entry in os.scandir(self.results):
+            if entry.is_dir():
+                size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+                yield entry.stat().st_mtime, size, entry.path
+
+    def evict(self):
+        """
+        Drop least recently used entries until the cache fits max_bytes.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return total
+        cutoff = time.time() - self.min_age
+        try:
+            keep = {os.path.abspath(p) for p in self.pinned()} if self.pinned else set()
+        except Exception:
+            return total  # pins unknown (database unavailable): evicting could drop a job's input
+
+        for mtime, size, path in entries:
+            if total <= self.max_bytes or mtime > cutoff:
+                break
+            if os.path.abspath(path) in keep:
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+            total -= size
+        return total
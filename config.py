@@ -6,5 +6,27 @@ class Config:
     SECRET_KEY = "change-this-secret"
     SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(BASE_DIR, "instance", "stego.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Connections are reused across requests (SQLite runs in WAL mode, see history.py)
+    SQLALCHEMY_ENGINE_OPTIONS = {"pool_size": 10, "max_overflow": 20, "pool_timeout": 30,
+                                 "connect_args": {"timeout": 30}}
     UPLOAD_FOLDER = os.path.join(BASE_DIR, "static", "uploads")
     MAX_CONTENT_LENGTH = 200 * 1024 * 1024  # 200 MB
+    JOB_WORKERS_PER_CPU = 1  # concurrent encode/decode jobs per CPU
+    JOB_FOLDER = os.path.join(UPLOAD_FOLDER, "jobs")
+    JOB_RETENTION_SECONDS = 24 * 60 * 60  # staged job files are swept after this
+    JOB_LEASE_SECONDS = 60  # unfinished jobs not renewed by their server process for this long are run again
+    SPOOL_MAX_BYTES = 16 * 1024 * 1024  # in-memory results before spilling to a temp file
+    STREAM_CHUNK_BYTES = 256 * 1024
+    CACHE_FOLDER = os.path.join(UPLOAD_FOLDER, "cache")  # deduplicated uploads + cached results
+    CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024  # least recently used entries are evicted past this
+    ASGI_THREADS = 32  # threads running views under asgi.py (uploads are received without one)
+    UPLOAD_SPOOL_BYTES = 1024 * 1024  # per-request upload bytes held in memory by asgi.py
+    HISTORY_BATCH_SIZE = 100  # history rows are written in batches of up to this many...
+    HISTORY_FLUSH_SECONDS = 1.0  # ...or this long after the first pending one
+    HISTORY_PAGE_SIZE = 50
+    HISTORY_TREND_DAYS = 14  # dashboard throughput table
+    METRICS_ENABLED = os.environ.get("STEGO_METRICS", "") not in ("", "0")  # stage timers + /metrics
+    PROFILE_DIR = os.environ.get("STEGO_PROFILE_DIR")  # cProfile dumps of requests sent with ?profile=1
+    # Codecs imported at start-up, e.g. STEGO_PRELOAD=image,audio (or "all"); the rest load on first use
+    PRELOAD_CODECS = (None if os.environ.get("STEGO_PRELOAD") == "all" else
+                      tuple(filter(None, os.environ.get("STEGO_PRELOAD", "").split(","))))
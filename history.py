@@ -0,0 +1,143 @@
+"""
+History storage: buffered batch writes, schema upgrades and SQLite tuning.
+
+Every encode / decode adds a history row. Requests hand their rows to a
+HistoryBuffer instead of committing one by one; a background thread
+inserts them in a single transaction per batch, so a busy server takes
+the SQLite write lock a few times per second instead of once per request.
+
+SQLite databases run in WAL mode: readers (the dashboard, /jobs polling)
+no longer wait for writers, and commits only sync the log.
+"""
+import atexit
+import logging
+import threading
+
+from sqlalchemy import event, inspect, text
+
+log = logging.getLogger(__name__)
+
+
+# --------------------------------------------------
+# SQLite tuning
+# --------------------------------------------------
+def tune_sqlite(engine):
+    """
+    WAL journal, relaxed fsync (safe under WAL) and a busy timeout on
+    every new connection of a SQLite engine. Other backends are left alone.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=30000")
+        cursor.close()
+
+
+def upgrade_schema(engine, metadata):
+    """
+    Bring tables created by earlier versions up to date: add missing
+    columns (all new columns are nullable) and missing indexes.
+    create_all() only ever creates whole tables.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    kind = column.type.compile(engine.dialect)
+                    conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {kind}'))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
+# --------------------------------------------------
+# Buffered writes
+# --------------------------------------------------
+class HistoryBuffer:
+    """
+    Collects rows and hands them to `write(rows)` in batches, from a
+    background thread: when `batch_size` rows are pending or `interval`
+    seconds after the first one, whichever comes first.
+
+    A failed write is retried with the next batch; rows beyond
+    `max_pending` are dropped (oldest first) so a dead database cannot
+    grow the buffer without bound. Pending rows are written at exit.
+    """
+
+    def __init__(self, write, batch_size=100, interval=1.0, max_pending=10000):
+        self.write = write
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self._rows = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        atexit.register(self.close)
+
+    def add(self, row):
+        with self._cond:
+            self._rows.append(row)
+            if len(self._rows) > self.max_pending:
+                del self._rows[:len(self._rows) - self.max_pending]
+                log.warning("History buffer full, oldest rows dropped")
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+                self._thread.start()
+            # the first pending row starts the writer's interval; a full batch ends it
+            if len(self._rows) == 1 or len(self._rows) >= self.batch_size:
+                self._cond.notify()
+
+    def pending(self):
+        with self._cond:
+            return len(self._rows)
+
+    def flush(self):
+        """
+        Write everything pending now (e.g. before reading history back).
+        """
+        with self._flush_lock:
+            with self._cond:
+                rows, self._rows = self._rows, []
+            if not rows:
+                return
+            try:
+                self.write(rows)
+            except Exception:
+                with self._cond:
+                    self._rows[:0] = rows
+                raise
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        try:
+            self.flush()
+        except Exception:
+            log.exception("Could not write pending history rows")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._rows and not self._closed:
+                    self._cond.wait()
+                if len(self._rows) < self.batch_size and not self._closed:
+                    self._cond.wait(self.interval)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                log.exception("History write failed; retrying with the next batch")
+                with self._cond:
+                    self._cond.wait(self.interval)
@@ -0,0 +1,352 @@
+"""
+Background job queue for encode/decode work.
+
+Routes store a Job row and hand the work to a process pool. The pool
+process reports progress straight into the same database, so any web
+worker can answer /jobs/<id>. Each server process holds a lease on the
+jobs it submitted and renews it while it runs; a queued or running job
+whose lease ran out (its process stopped) is claimed and run again by
+exactly one of the processes still serving. Payload passwords are never
+written to the job row: a job with a password is handed to the pool in
+memory only and fails instead of resuming.
+
+Image and audio views use the same pool for their codec calls
+(JobQueue.run) and wait for the result instead of queuing a job.
+
+With metrics on (modules.metrics), each job returns what it recorded in
+the pool process and the app merges it into its own /metrics registry.
+"""
+import datetime
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from history import tune_sqlite
+from modules import codecs, metrics
+
+# task name -> (codec, operation, accepts progress_cb); a pool process
+# only imports the codecs of the tasks it actually runs
+TASKS = {
+    "image.encode": ("image", "encode", False),
+    "image.decode": ("image", "decode", False),
+    "jpeg.encode": ("jpeg", "encode_file", False),
+    "audio.encode": ("audio", "encode", True),
+    "audio.decode": ("audio", "decode", True),
+    "video.encode": ("video", "encode", True),
+    "video.decode": ("video", "decode", True),
+}
+
+# Only write progress to the DB when it moved by at least this much
+PROGRESS_STEP = 0.01
+
+_engines = {}
+
+
+# --------------------------------------------------
+# Worker side (runs inside the process pool)
+# --------------------------------------------------
+def _engine(db_uri):
+    if db_uri not in _engines:
+        connect_args = {"timeout": 30} if db_uri.startswith("sqlite") else {}
+        _engines[db_uri] = create_engine(db_uri, connect_args=connect_args)
+        tune_sqlite(_engines[db_uri])
+    return _engines[db_uri]
+
+
+def _update(db_uri, job_id, **fields):
+    fields["updated"] = datetime.datetime.utcnow()
+    columns = ", ".join(f"{name} = :{name}" for name in fields)
+    with _engine(db_uri).begin() as conn:
+        conn.execute(text(f"UPDATE job SET {columns} WHERE id = :id"), {"id": job_id, **fields})
+
+
+def _record_history(db_uri, row, duration=None, result=None):
+    # The job's history row, timed here since the request only queued it
+    row = dict(row, time=datetime.datetime.utcnow(), duration=duration)
+    if row.get("payload_bytes") is None and result and os.path.isfile(result):
+        row["payload_bytes"] = os.path.getsize(result)
+    columns = ", ".join(row)
+    values = ", ".join(f":{name}" for name in row)
+    with _engine(db_uri).begin() as conn:
+        conn.execute(text(f"INSERT INTO history ({columns}) VALUES ({values})"), row)
+
+
+def pinned_paths(db_uri):
+    """
+    Input paths of jobs that are still queued or running; the ResultCache
+    must not evict these blobs before the job has read them.
+    """
+    with _engine(db_uri).connect() as conn:
+        rows = conn.execute(text(
+            "SELECT params FROM job WHERE status IN ('queued', 'running') AND params IS NOT NULL"
+        )).all()
+    paths = set()
+    for (params,) in rows:
+        try:
+            values = json.loads(params).values()
+        except (ValueError, AttributeError):
+            continue
+        paths.update(value for value in values if isinstance(value, str))
+    return paths
+
+
+def _job_metrics(task, status, started):
+    # Everything this job recorded, for the app to merge (None when off)
+    if not metrics.enabled():
+        return None
+    metrics.observe("stego_job_seconds", time.perf_counter() - started, task=task, status=status)
+    metrics.observe("stego_job_peak_memory_bytes", metrics.peak_memory(), task=task)
+    return metrics.snapshot()
+
+
+def run_job(db_uri, job_id, task, params, cleanup=(), cache=None, history=None, queued_at=None):
+    """
+    Execute one task and record its outcome on the job row.
+    Codec wrappers return the path of the file they produced.
+    Paths in `cleanup` (staged inputs) are removed once the task ends.
+    `cache` is (cache folder, max bytes, key): the result is added to the
+    ResultCache under that key so a repeat request skips the work.
+    `history` is the history row to write when the job ends, with its
+    duration filled in. `queued_at` (time.time() at submit) measures how
+    long the job waited for a worker.
+
+    returns : metrics recorded while running, when metrics are enabled
+    """
+    if metrics.enabled():
+        metrics.reset()
+        if queued_at is not None:
+            metrics.observe("stego_job_queue_wait_seconds", max(0.0, time.time() - queued_at), task=task)
+
+    media, op, reports_progress = TASKS[task]
+    last = [0.0]
+
+    def progress_cb(done, total):
+        if not total:
+            return
+        fraction = min(done / total, 1.0)
+        if fraction - last[0] >= PROGRESS_STEP:
+            last[0] = fraction
+            _update(db_uri, job_id, progress=fraction)
+
+    result = None
+    started = time.perf_counter()
+    try:
+        _update(db_uri, job_id, status="running", progress=0.0)
+        func = getattr(codecs.get(media), op)
+        if reports_progress:
+            params = dict(params, progress_cb=progress_cb)
+        result = func(**params)
+    except Exception as e:
+        _update(db_uri, job_id, status="failed", error=str(e) or e.__class__.__name__, params=None)
+        if history:
+            _record_history(db_uri, history)
+        return _job_metrics(task, "failed", started)
+    finally:
+        for path in cleanup:
+            if path != result and os.path.isfile(path):
+                os.remove(path)
+
+    if cache:
+        from cache import ResultCache
+        root, max_bytes, key = cache
+        try:
+            ResultCache(root, max_bytes, pinned=lambda: pinned_paths(db_uri)).put_file(key, result)
+        except OSError:
+            pass  # the job still succeeded; it just won't be reused
+
+    if history:
+        _record_history(db_uri, history, time.perf_counter() - started, result)
+
+    _update(db_uri, job_id, status="done", progress=1.0, result=os.path.basename(result), params=None)
+    return _job_metrics(task, "done", started)
+
+
+def run_inline(media, op, carrier_path, args, kwargs, output_path=None):
+    """
+    One codec call for a view that waits on it (JobQueue.run): the carrier
+    and any output are staged files.
+
+    returns : (the operation's result, metrics recorded while running)
+    """
+    if metrics.enabled():
+        metrics.reset()
+    func = getattr(codecs.get(media), op)
+    if output_path is None:
+        result = func(carrier_path, *args, **kwargs)
+    else:
+        result = func(carrier_path, *args, output_path, **kwargs)
+    return result, (metrics.snapshot() if metrics.enabled() else None)
+
+
+def _merge_metrics(future):
+    if not future.cancelled() and future.exception() is None:
+        metrics.merge(future.result())
+
+
+# --------------------------------------------------
+# App side
+# --------------------------------------------------
+class JobQueue:
+    """
+    Process pool capped at `workers_per_cpu` concurrent jobs per CPU.
+    The pool is started lazily on the first submit.
+
+    db_uri          : database holding the job table
+    workers_per_cpu : concurrent jobs per CPU
+    cache           : (cache folder, max bytes) for results of jobs reclaimed with a cache key
+    lease_seconds   : a job is reclaimed once its owner has not renewed it for this long
+    """
+
+    def __init__(self, db_uri, workers_per_cpu=1, cache=None, lease_seconds=60):
+        self.db_uri = db_uri
+        self.max_workers = max(1, (os.cpu_count() or 1) * workers_per_cpu)
+        self.cache = cache
+        self.lease_seconds = lease_seconds
+        self._pool = None
+        self._lease_thread = None
+        self._stop = threading.Event()
+
+    @property
+    def owner(self):
+        # Read per call: pre-fork servers import the app before forking
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    def submit(self, job_id, task, params, cleanup=(), cache=None, history=None):
+        if task not in TASKS:
+            raise ValueError(f"Unknown task: {task}")
+        future = self.pool.submit(run_job, self.db_uri, job_id, task, params, tuple(cleanup), cache, history,
+                                  time.time())
+        if metrics.enabled():
+            future.add_done_callback(_merge_metrics)
+        return future
+
+    def run(self, media, op, carrier, *args, output=False, **kwargs):
+        """
+        Run one image / audio codec operation on the pool and wait for it,
+        so its NumPy / PIL work never holds the GIL of a view thread.
+
+        carrier : seekable upload stream, staged to a temp file for the pool
+        args    : arguments after the carrier (and before the output, if any)
+        output  : the operation writes a file (encode): pass it a temp path
+
+        returns : the operation's result, or with output=True the written
+                  file, open for reading and deleted on close
+        """
+        position = carrier.tell()
+        with tempfile.NamedTemporaryFile() as staged:
+            shutil.copyfileobj(carrier, staged)
+            staged.flush()
+            carrier.seek(position)
+            out = tempfile.NamedTemporaryFile() if output else None
+            try:
+                result, recorded = self.pool.submit(run_inline, media, op, staged.name, args, kwargs,
+                                                    out and out.name).result()
+            except BaseException:
+                if out:
+                    out.close()
+                raise
+        if recorded:
+            metrics.merge(recorded)
+        return out if output else result
+
+    # --------------------------------------------------
+    # Leases
+    # --------------------------------------------------
+    def start(self):
+        """
+        Claim the jobs left behind by stopped processes, then keep renewing
+        this process's leases (and claiming newly expired ones) in the background.
+        """
+        self.reclaim()
+        if self._lease_thread is None:
+            self._stop.clear()
+            self._lease_thread = threading.Thread(target=self._renew_loop, name="job-lease", daemon=True)
+            self._lease_thread.start()
+
+    def _renew_loop(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                self.renew()
+                self.reclaim()
+            except SQLAlchemyError:
+                pass  # e.g. the database is locked: try again on the next beat
+
+    def renew(self):
+        """
+        Extend the lease on every unfinished job this process owns.
+        """
+        with _engine(self.db_uri).begin() as conn:
+            conn.execute(text(
+                "UPDATE job SET heartbeat = :now WHERE owner = :owner AND status IN ('queued', 'running')"
+            ), {"now": datetime.datetime.utcnow(), "owner": self.owner})
+
+    def reclaim(self):
+        """
+        Run again the unfinished jobs whose lease has expired.
+
+        returns : ids of the jobs this process claimed
+        """
+        now = datetime.datetime.utcnow()
+        expired = ("status IN ('queued', 'running') AND (heartbeat IS NULL OR heartbeat < :cutoff)")
+        values = {"now": now, "cutoff": now - datetime.timedelta(seconds=self.lease_seconds),
+                  "owner": self.owner}
+        engine = _engine(self.db_uri)
+        with engine.connect() as conn:
+            candidates = conn.execute(text(f"SELECT id FROM job WHERE {expired}"), values).scalars().all()
+
+        claimed = []
+        for job_id in candidates:
+            with engine.begin() as conn:
+                # The conditional UPDATE is the claim: when several processes
+                # race for the same job only one of them changes the row
+                won = conn.execute(text(
+                    "UPDATE job SET owner = :owner, heartbeat = :now, updated = :now, status = 'queued', "
+                    f"progress = 0.0 WHERE id = :id AND {expired}"
+                ), dict(values, id=job_id)).rowcount
+                if not won:
+                    continue
+                job = conn.execute(text(
+                    "SELECT task, params, cleanup, history, cache_key, resumable FROM job WHERE id = :id"
+                ), {"id": job_id}).one()
+            if job.resumable is not None and not job.resumable:
+                self._abandon(job_id, job)
+                continue
+            cache = (*self.cache, job.cache_key) if self.cache and job.cache_key else None
+            self.submit(job_id, job.task, json.loads(job.params), json.loads(job.cleanup or "[]"), cache,
+                        json.loads(job.history) if job.history else None)
+            claimed.append(job_id)
+        return claimed
+
+    def _abandon(self, job_id, job):
+        # The payload password was only ever held in memory by the process
+        # that stopped, so the job cannot run again
+        _update(self.db_uri, job_id, status="failed", params=None,
+                error="Interrupted by a server restart; submit it again (its password is not stored)")
+        for path in json.loads(job.cleanup or "[]"):
+            if os.path.isfile(path):
+                os.remove(path)
+        if job.history:
+            _record_history(self.db_uri, json.loads(job.history))
+
+    def shutdown(self, wait=True):
+        if self._lease_thread is not None:
+            self._stop.set()
+            self._lease_thread.join()
+            self._lease_thread = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
@@ -0,0 +1,80 @@
+"""
+Command line batch interface.
+
+    python -m modules encode carriers/ --output out/ --secret "watermark"
+    python -m modules encode manifest.jsonl --output out/ --secret payload.bin --password pw
+    python -m modules decode out/ --output decoded/ --report decode.jsonl
+    python -m modules scan uploads/ --report scan.jsonl
+
+Per-file results are appended to the JSONL report as they finish; running
+the same command again skips the files that already completed.
+"""
+
+import argparse
+import sys
+
+from . import batch
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m modules",
+                                     description="Batch steganography encode / decode / scan")
+    parser.add_argument("action", choices=["encode", "decode", "scan"])
+    parser.add_argument("source", help="directory of carriers or a manifest (.jsonl / list of paths)")
+    parser.add_argument("-o", "--output", help="output directory (encode / decode)")
+    parser.add_argument("-s", "--secret", help="text to hide, or path of a file to hide (encode)")
+    parser.add_argument("-p", "--password", help="encrypt / decrypt payloads with this password")
+    parser.add_argument("-b", "--bits", type=int, default=1, help="bits per unit (image/audio 1-4, video 1-2)")
+    parser.add_argument("--scatter", action="store_true",
+                        help="spread the payload at password-seeded positions (encode, needs --password)")
+    parser.add_argument("--jpeg", action="store_true",
+                        help="keep JPEG carriers as JPEG, hiding in the DCT coefficients (encode)")
+    parser.add_argument("-m", "--media", choices=sorted(batch.EXTENSIONS), help="only process this media type")
+    parser.add_argument("-w", "--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("-r", "--report", default="batch_report.jsonl", help="JSONL report path")
+    parser.add_argument("--no-resume", action="store_true", help="redo everything and overwrite the report")
+    parser.add_argument("-q", "--quiet", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.action != "scan" and not args.output:
+        parser.error(f"{args.action} needs --output")
+    if args.action == "encode" and not args.secret:
+        parser.error("encode needs --secret")
+
+    params = {"bits": args.bits}
+    if args.secret:
+        params["secret"] = args.secret
+    if args.password:
+        params["password"] = args.password
+    if args.scatter:
+        if not args.password:
+            parser.error("--scatter needs --password")
+        params["scatter"] = True
+    if args.jpeg:
+        params["jpeg"] = True
+
+    items = batch.discover(args.source, args.action, args.output, media=args.media, **params)
+
+    suspicious = []
+
+    def show(record):
+        result = record.get("result")
+        if args.action == "scan" and record["status"] == "ok":
+            if result["suspicious"]:
+                suspicious.append(record["input"])
+            result = f"score {result['score']:.2f}" + (" SUSPICIOUS" if result["suspicious"] else "")
+        if not args.quiet:
+            detail = record.get("error") or result
+            print(f"{record['status']:<8} {record['input']} -> {detail}", flush=True)
+
+    summary = batch.run_batch(items, args.report, workers=args.workers,
+                              resume=not args.no_resume, on_result=show)
+    if args.action == "scan":
+        # only this run's records: resumed items are in the report already
+        summary["suspicious"] = len(suspicious)
+    print(", ".join(f"{status}: {count}" for status, count in sorted(summary.items())))
+    return 1 if summary.get("error") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
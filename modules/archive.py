@@ -0,0 +1,266 @@
+"""
+Multi-file archive payload.
+
+Several files travel as one payload, so one pass over one carrier hides
+them all. The table of contents comes first, so a decoder can list the
+entries, or find one entry and stop reading once it has its bytes:
+
+    magic "STA" | version | entry count (I)
+    count x (name length (H) | offset (Q) | size (Q) | CRC32 (I) | name)
+    CRC32 of everything above (I)
+    file data, back to back
+
+Offsets count from the start of the archive. The archive is ordinary
+payload plaintext: the container compresses and encrypts it like any
+other, and each entry carries its own CRC because a single-entry read
+never reaches the container CRC at the end of the stream.
+"""
+
+import io
+import os
+import struct
+import zipfile
+import zlib
+from collections import namedtuple
+
+MAGIC = b"STA"
+VERSION = 1
+HEAD_FMT = ">3sBI"
+HEAD_SIZE = struct.calcsize(HEAD_FMT)
+PREFIX_SIZE = len(MAGIC) + 1
+ENTRY_FMT = ">HQQI"
+ENTRY_SIZE = struct.calcsize(ENTRY_FMT)
+
+# Name a stego tool gives an archive it writes to disk
+DEFAULT_NAME = "bundle.stga"
+
+CHUNK_SIZE = 1 << 20
+
+Entry = namedtuple("Entry", "name offset size crc")
+
+
+def is_archive(buf) -> bool:
+    return bytes(buf[:len(MAGIC)]) == MAGIC and len(buf) >= PREFIX_SIZE and buf[len(MAGIC)] == VERSION
+
+
+# --------------------------------------------------
+# Pack
+# --------------------------------------------------
+def _sources(files):
+    """
+    Normalise to (name, source) pairs; a source is a path or bytes.
+    """
+    items = []
+    for item in files:
+        if isinstance(item, (str, os.PathLike)):
+            items.append((os.path.basename(item), item))
+        else:
+            name, source = item
+            items.append((os.path.basename(name), source))
+
+    names = [name for name, _ in items]
+    if not items:
+        raise ValueError("Archive needs at least one file")
+    if any(not name for name in names) or len(set(names)) != len(names):
+        raise ValueError("Archive entries need distinct, non-empty file names")
+    return items
+
+
+def _chunks(source):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            yield from iter(lambda: f.read(CHUNK_SIZE), b"")
+    else:
+        view = memoryview(source)
+        for start in range(0, len(view), CHUNK_SIZE):
+            yield view[start:start + CHUNK_SIZE]
+
+
+def iter_pack(files):
+    """
+    Archive bytes, in chunks.
+
+    files : paths, or (name, bytes or path) pairs
+
+    Files given as paths are read twice: once for the table of contents
+    (sizes and CRCs) and once for the data.
+    """
+    items = _sources(files)
+
+    sized = []
+    for name, source in items:
+        size, crc = 0, 0
+        for chunk in _chunks(source):
+            size += len(chunk)
+            crc = zlib.crc32(chunk, crc)
+        sized.append((name.encode("utf-8"), size, crc))
+
+    toc = bytearray(struct.pack(HEAD_FMT, MAGIC, VERSION, len(sized)))
+    offset = HEAD_SIZE + sum(ENTRY_SIZE + len(name) for name, _, _ in sized) + 4
+    for name, size, crc in sized:
+        toc += struct.pack(ENTRY_FMT, len(name), offset, size, crc) + name
+        offset += size
+    toc += struct.pack(">I", zlib.crc32(toc))
+    yield bytes(toc)
+
+    for _, source in items:
+        yield from _chunks(source)
+
+
+def pack(files) -> bytes:
+    return b"".join(iter_pack(files))
+
+
+def write(files, path):
+    """
+    Write an archive of `files` to `path`; returns `path`.
+    """
+    with open(path, "wb") as f:
+        for chunk in iter_pack(files):
+            f.write(chunk)
+    return path
+
+
+# --------------------------------------------------
+# Read
+# --------------------------------------------------
+def read_toc(read, prefix=b""):
+    """
+    Parse the table of contents.
+
+    read   : callable(count) -> bytes, positioned at the archive start
+             (after `prefix`, the bytes already consumed)
+
+    returns : list of Entry, or raises ValueError
+    """
+    head = prefix + read(HEAD_SIZE - len(prefix))
+    if len(head) < HEAD_SIZE or not is_archive(head):
+        raise ValueError("Hidden data is not an archive")
+    (count,) = struct.unpack(HEAD_FMT, head)[2:]
+
+    toc = bytearray(head)
+    entries = []
+    for _ in range(count):
+        raw = read(ENTRY_SIZE)
+        if len(raw) < ENTRY_SIZE:
+            raise ValueError("Archive table of contents is truncated")
+        name_len, offset, size, crc = struct.unpack(ENTRY_FMT, raw)
+        name = read(name_len)
+        toc += raw + name
+        entries.append(Entry(name.decode("utf-8", "replace"), offset, size, crc))
+
+    check = read(4)
+    if len(check) < 4 or struct.unpack(">I", check)[0] != zlib.crc32(toc):
+        raise ValueError("Archive table of contents failed the integrity check")
+    return entries
+
+
+def find(entries, entry):
+    """
+    Look an entry up by name or by position.
+    """
+    for i, e in enumerate(entries):
+        if e.name == entry or (isinstance(entry, int) and i == entry):
+            return e
+    raise ValueError(f"No entry named {entry!r} in the archive")
+
+
+def copy_entry(stream, entry, out):
+    """
+    Copy one entry from `stream` (readable binary file object positioned
+    at or before the entry) to the writable file object `out`, checking
+    its CRC. Seekable streams jump to the entry; others read up to it.
+    """
+    if stream.seekable():
+        stream.seek(entry.offset)
+    else:
+        gap = entry.offset - stream.tell()
+        if gap < 0:
+            raise ValueError("Archive entries must be read in order from a stream")
+        while gap:
+            skipped = len(stream.read(min(gap, CHUNK_SIZE)))
+            if not skipped:
+                raise ValueError("Archive is truncated")
+            gap -= skipped
+
+    left, crc = entry.size, 0
+    while left:
+        chunk = stream.read(min(left, CHUNK_SIZE))
+        if not chunk:
+            raise ValueError("Archive is truncated")
+        crc = zlib.crc32(chunk, crc)
+        out.write(chunk)
+        left -= len(chunk)
+    if crc != entry.crc:
+        raise ValueError(f"Archive entry {entry.name!r} failed the integrity check")
+
+
+def list_entries(data):
+    """
+    Entries of an archive held in memory.
+    """
+    return read_toc(io.BytesIO(data).read)
+
+
+def extract(data, entry):
+    """
+    Bytes of one entry (name or position) of an archive held in memory.
+    """
+    stream = io.BytesIO(data)
+    out = io.BytesIO()
+    copy_entry(stream, find(read_toc(stream.read), entry), out)
+    return out.getvalue()
+
+
+def to_zip(stream, out, entries=None):
+    """
+    Repack an archive stream as a ZIP file written to `out` (path or
+    binary file object), so the entries open with ordinary tools.
+    """
+    entries = entries if entries is not None else read_toc(stream.read)
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+        for entry in sorted(entries, key=lambda e: e.offset):
+            with zf.open(entry.name, "w", force_zip64=True) as member:
+                copy_entry(stream, entry, member)
+
+
+# --------------------------------------------------
+# File object over an iterator of byte chunks
+# --------------------------------------------------
+class ChunkStream(io.RawIOBase):
+    """
+    Readable, non-seekable file object over an iterator of bytes, e.g.
+    a payload decoded on the fly. `on_close` runs once when it is closed.
+    """
+
+    def __init__(self, chunks, on_close=None):
+        self._chunks = iter(chunks)
+        self._buffer = memoryview(b"")
+        self._pos = 0
+        self._on_close = on_close
+
+    def readable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def readinto(self, b):
+        while not len(self._buffer):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._buffer = memoryview(chunk).cast("B")
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        self._pos += n
+        return n
+
+    def close(self):
+        if not self.closed:
+            if hasattr(self._chunks, "close"):
+                self._chunks.close()
+            if self._on_close:
+                self._on_close()
+        super().close()
@@ -1,14 +1,18 @@
 """
 Flask wrapper for Audio Steganography Decoding
-Uses your original decode() function.
+Checks the arguments and extracts the payload through decoder_core
+(modules.audio_steg.wavstream).
 """
 
 import os
-from .decoder_core import decode_core  # we will create decoder_core below
+from .decoder_core import decode_core
 
-def decode(input_path, output_path, bits=1, password=None):
-    if not os.path.exists(input_path):
+def decode(input_path, output_path=None, bits=1, password=None, progress_cb=None):
+    # input_path may also be an open binary file object
+    if isinstance(input_path, str) and not os.path.exists(input_path):
         raise FileNotFoundError("Encoded WAV not found")
+    if bits not in (1, 2, 3, 4):
+        raise ValueError("bits must be between 1 and 4")
 
     # decode_core returns extracted bytes
     extracted_bytes = decode_core(
@@ -16,7 +20,8 @@ def decode(input_path, output_path, bits=1, password=None):
         bits_per_sample=bits,
         password=password,
         out_file=output_path,   # web output path
-        progress_callback=None
+        progress_callback=progress_cb
     )
 
-    return output_path   # Flask will send this file to user
+    # Flask will send this file to user (or the bytes, without output_path)
+    return output_path if output_path else extracted_bytes
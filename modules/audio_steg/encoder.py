@@ -1,38 +1,53 @@
 """
 Flask wrapper for Audio Steganography Encoding
-Uses your original embed_payload() function.
+Checks the arguments, builds the container and streams it into the WAV
+through encoder_core (modules.audio_steg.wavstream).
 """
 
 import os
-from .utils import samples_from_frames, frames_from_samples
-from .encoder_core import embed_payload, estimate_capacity  # we will create encoder_core below
+from .. import archive
+from ..container import HEADER_SIZE
+from .encoder_core import build_payload, embed_payload, estimate_capacity
 
-def encode(input_path, secret, output_path, bits=1, password=None):
-    if not os.path.exists(input_path):
+def encode(input_path, secret, output_path, bits=1, password=None, progress_cb=None, compress=True,
+           scatter=False):
+    # input_path / output_path may also be open binary file objects
+    if isinstance(input_path, str) and not os.path.exists(input_path):
         raise FileNotFoundError("Input WAV file not found.")
+    if bits not in (1, 2, 3, 4):
+        raise ValueError("bits must be between 1 and 4")
+    if scatter and not password:
+        raise ValueError("Scattered embedding needs a password")
 
-    # Secret may be file path OR text string
-    if isinstance(secret, str) and os.path.exists(secret):
+    # Secret may be file path, text string, raw bytes or a list of files (one archive)
+    if isinstance(secret, (list, tuple)):
+        payload = archive.pack(secret)
+    elif isinstance(secret, (bytes, bytearray)):
+        payload = bytes(secret)
+    elif isinstance(secret, str) and os.path.exists(secret):
         # secret is a file path
         payload = open(secret, 'rb').read()
     else:
         payload = str(secret).encode("utf-8")
 
-    # Capacity check
+    # Compress / encrypt first: capacity is checked on what actually gets embedded
+    data = build_payload(payload, bits, encrypt_password=password, compress=compress)
+
     capacity_bits = estimate_capacity(input_path, bits_per_sample=bits)
-    if len(payload) * 8 > capacity_bits:
+    if len(data) * 8 > capacity_bits:
         raise ValueError(
-            f"Payload too large. Max capacity = {capacity_bits//8} bytes."
+            f"Payload too large ({len(data) - HEADER_SIZE} bytes after compression/encryption). "
+            f"Max capacity = {capacity_bits//8 - HEADER_SIZE} bytes."
         )
 
     # Perform embedding
     embed_payload(
         wav_in=input_path,
         wav_out=output_path,
-        payload=payload,
+        data=data,
         bits_per_sample=bits,
-        encrypt_password=password,
-        progress_callback=None   # web mode → no progress bar
+        progress_callback=progress_cb,
+        scatter_password=password if scatter else None
     )
 
     return output_path
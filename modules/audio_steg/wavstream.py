@@ -0,0 +1,332 @@
+"""
+Streaming LSB embedding / extraction over the PCM data chunk of a WAV file.
+
+The file is processed in fixed-size sample blocks: only the blocks that
+hold payload bits are read into memory and modified, everything else is
+copied with bulk I/O. Memory use is bounded by one block plus the payload,
+whatever the length of the recording.
+
+Supports 8/16/24/32-bit integer PCM (plain and WAVE_FORMAT_EXTENSIBLE).
+The payload bits always live in the lowest byte of each little-endian
+sample, so every sample width is handled through a strided uint8 view.
+
+Scattered embedding (modules.scatter) treats every whole block as one
+window and spreads the payload over all of them at password-seeded
+positions; a password lets extraction fall back to that layout.
+"""
+
+import shutil
+import struct
+from collections import namedtuple
+from contextlib import nullcontext
+
+import numpy as np
+
+from .. import bitplane, container, metrics, scatter
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Samples per block. Kept a multiple of 8 so every block covers a whole
+# number of payload bytes whatever the bits-per-sample setting.
+BLOCK_SAMPLES = 1 << 20
+# First extraction block: just enough for the container header
+FIRST_BLOCK_SAMPLES = 256
+COPY_BUFSIZE = 4 * 1024 * 1024
+
+PcmLayout = namedtuple(
+    "PcmLayout",
+    "nchannels sampwidth framerate nframes data_offset data_size"
+)
+
+
+# --------------------------------------------------
+# RIFF parsing
+# --------------------------------------------------
+def read_layout(f):
+    """
+    Locate the fmt and data chunks of an open WAV file.
+
+    f       : binary file object positioned anywhere
+
+    returns : PcmLayout (data_offset is the absolute offset of the samples)
+    """
+    f.seek(0)
+    riff = f.read(12)
+    if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+        raise ValueError("Not a WAV file")
+
+    fmt = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            break
+        chunk_id = chunk[:4]
+        size = struct.unpack("<I", chunk[4:])[0]
+
+        if chunk_id == b"fmt ":
+            body = f.read(size)
+            tag, nchannels, framerate, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+            if tag == WAVE_FORMAT_EXTENSIBLE and size >= 26:
+                tag = struct.unpack("<H", body[24:26])[0]
+            if tag != WAVE_FORMAT_PCM:
+                raise ValueError("Only integer PCM WAV files are supported")
+            fmt = (nchannels, (bits + 7) // 8, framerate)
+            f.seek(size & 1, 1)
+
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk found before fmt chunk")
+            nchannels, sampwidth, framerate = fmt
+            if sampwidth not in (1, 2, 3, 4):
+                raise ValueError("Unsupported sample width")
+
+            data_offset = f.tell()
+            # Clamp sizes from streamed writers that leave 0xFFFFFFFF here
+            f.seek(0, 2)
+            data_size = min(size, f.tell() - data_offset)
+            frame_size = nchannels * sampwidth
+            data_size -= data_size % frame_size
+            return PcmLayout(nchannels, sampwidth, framerate,
+                             data_size // frame_size, data_offset, data_size)
+
+        else:
+            f.seek(size + (size & 1), 1)
+
+    raise ValueError("WAV file has no data chunk")
+
+
+def _open(target, mode):
+    """
+    Open a path, or pass an already-open binary file object through
+    without closing it (e.g. an upload stream or spooled temp file).
+    """
+    if hasattr(target, "read") or hasattr(target, "write"):
+        return nullcontext(target)
+    return open(target, mode)
+
+
+def _lsb_view(buf, sampwidth):
+    """
+    Writable uint8 view of the lowest byte of every sample in `buf`.
+    """
+    return np.frombuffer(buf, dtype=np.uint8)[::sampwidth]
+
+
+# --------------------------------------------------
+# Embed
+# --------------------------------------------------
+def embed_stream(wav_in, wav_out, data, bits_per_sample=1, progress_callback=None,
+                 scatter_password=None):
+    """
+    Copy `wav_in` to `wav_out`, writing `data` into the leading sample LSBs.
+
+    wav_in           : path or seekable binary file object
+    wav_out          : path or writable binary file object
+    data             : bytes to embed (a whole container, see modules.container)
+    scatter_password : spread `data` over every block at positions seeded
+                       by this password instead
+    """
+    with _open(wav_in, "rb") as fin, _open(wav_out, "wb") as fout:
+        layout = read_layout(fin)
+        nsamples = layout.nframes * layout.nchannels
+        if bitplane.units_needed(len(data) * 8, bits_per_sample) > nsamples:
+            raise ValueError("Payload too large for this audio file")
+
+        # RIFF header and any chunks before the samples are copied verbatim
+        fin.seek(0)
+        fout.write(fin.read(layout.data_offset))
+
+        if scatter_password:
+            _embed_scattered(fin, fout, layout, data, bits_per_sample,
+                             scatter_password, progress_callback)
+            _copy_rest(fin, fout)
+            return
+
+        block_payload = BLOCK_SAMPLES * bits_per_sample // 8
+        view = memoryview(data)
+        done = 0
+
+        while done < len(data):
+            chunk = view[done:done + block_payload]
+            units = bitplane.bits_to_units(bitplane.bytes_to_bits(chunk), bits_per_sample)
+
+            with metrics.stage("audio.read", len(units) * layout.sampwidth):
+                buf = bytearray(fin.read(len(units) * layout.sampwidth))
+            with metrics.stage("audio.embed", len(chunk)):
+                bitplane.embed_units(_lsb_view(buf, layout.sampwidth), units, bits_per_sample)
+            with metrics.stage("audio.write", len(buf)):
+                fout.write(buf)
+
+            done += len(chunk)
+            if progress_callback:
+                progress_callback(done, len(data))
+
+        # Remaining samples and trailing chunks never change
+        _copy_rest(fin, fout)
+
+
+def _copy_rest(fin, fout):
+    with metrics.stage("audio.copy") as timer:
+        start = fin.tell()
+        shutil.copyfileobj(fin, fout, COPY_BUFSIZE)
+        timer.nbytes = fin.tell() - start
+
+
+def _scatter_layout(layout, bits_per_sample, password):
+    # Windows of equal size, at most one block each, covering all but the
+    # last few samples
+    nsamples = layout.nframes * layout.nchannels
+    windows = max(-(-nsamples // BLOCK_SAMPLES), 1)
+    header_units = bitplane.units_needed(container.HEADER_SIZE * 8, bits_per_sample)
+    return scatter.Layout(nsamples // windows, windows, header_units, password)
+
+
+def _embed_scattered(fin, fout, layout, data, bits_per_sample, password, progress_callback=None):
+    # The header is converted on its own: its last unit is padded, so the
+    # payload starts on a unit boundary whatever the bits setting
+    plan = _scatter_layout(layout, bits_per_sample, password)
+    header = bitplane.bits_to_units(bitplane.bytes_to_bits(data[:container.HEADER_SIZE]), bits_per_sample)
+    units = bitplane.bits_to_units(bitplane.bytes_to_bits(data[container.HEADER_SIZE:]), bits_per_sample)
+    plan.plan(len(units))
+
+    for window in range(plan.spread):
+        with metrics.stage("audio.read", plan.window_units * layout.sampwidth):
+            buf = bytearray(fin.read(plan.window_units * layout.sampwidth))
+        with metrics.stage("audio.embed", plan.quota * bits_per_sample // 8):
+            lsb = _lsb_view(buf, layout.sampwidth)
+            if window == 0:
+                bitplane.embed_units_at(lsb, header, bits_per_sample, plan.header_positions())
+            bitplane.embed_units_at(lsb, plan.slice(window, units), bits_per_sample, plan.positions(window))
+        with metrics.stage("audio.write", len(buf)):
+            fout.write(buf)
+
+        if progress_callback:
+            progress_callback(window + 1, plan.spread)
+
+
+# --------------------------------------------------
+# Extract
+# --------------------------------------------------
+class SampleBitReader(bitplane.BitReader):
+    """
+    Embedded bits from the PCM samples of an open WAV file, read in blocks.
+    The first block is small, so a carrier with no hidden data is turned
+    away after a few hundred samples.
+    """
+
+    def __init__(self, f, layout, bits_per_sample=1):
+        super().__init__(bits_per_sample)
+        self.f = f
+        self.sampwidth = layout.sampwidth
+        self.remaining = layout.nframes * layout.nchannels
+        self._count = FIRST_BLOCK_SAMPLES
+        f.seek(layout.data_offset)
+
+    def _next_block(self):
+        count = min(self._count, self.remaining)
+        if count <= 0:
+            raise ValueError("No hidden data found (payload incomplete)")
+        self._count = BLOCK_SAMPLES
+        self.remaining -= count
+        with metrics.stage("audio.read", count * self.sampwidth):
+            buf = self.f.read(count * self.sampwidth)
+        return _lsb_view(buf, self.sampwidth)
+
+
+def extract_stream(wav_in, bits_per_sample=1, password=None, progress_callback=None):
+    """
+    Read the container header and the payload that follows it. The CRC is
+    checked (and the payload decrypted / decompressed) block by block.
+    With a password, a scattered layout is tried before the legacy one.
+    Files written before the container format (4-byte length header) are
+    still read.
+
+    returns : payload bytes
+    """
+    with _open(wav_in, "rb") as f:
+        layout = read_layout(f)
+        capacity = layout.nframes * layout.nchannels * bits_per_sample // 8
+        reader = SampleBitReader(f, layout, bits_per_sample)
+
+        prefix = reader.read_bytes(container.PREFIX_SIZE)
+        if not container.has_prefix(prefix) and password:
+            reader = _scattered_reader(f, layout, bits_per_sample, password)
+            if reader is not None:
+                prefix = reader.read_bytes(container.PREFIX_SIZE)
+        if not container.has_prefix(prefix):
+            reader = SampleBitReader(f, layout, bits_per_sample)
+            return _extract_legacy(reader, reader.read_bytes(4), capacity, progress_callback)
+
+        header = container.parse_header(
+            prefix + reader.read_bytes(container.HEADER_SIZE - container.PREFIX_SIZE),
+            container.MEDIA_AUDIO, capacity - container.HEADER_SIZE
+        )
+        if header.bits != bits_per_sample:
+            raise ValueError(f"Audio was encoded with {header.bits} bit(s) per sample")
+        if isinstance(reader, scatter.ScatterReader):
+            reader.plan(bitplane.units_needed((header.name_len + header.length) * 8, bits_per_sample))
+
+        payload = container.PayloadDecoder(header, password, reader.read_bytes(header.name_len))
+        block_bytes = BLOCK_SAMPLES * bits_per_sample // 8
+        parts = []
+        done = 0
+
+        while done < header.length:
+            nbytes = min(header.length - done, block_bytes)
+            parts.append(payload.update(reader.read_bytes(nbytes)))
+            done += nbytes
+            if progress_callback:
+                progress_callback(done, header.length)
+        parts.append(payload.finalize())
+
+    return b"".join(parts)
+
+
+def _scattered_reader(f, layout, bits_per_sample, password):
+    """
+    ScatterReader over the sample blocks, or None if the file is too
+    short for a scattered layout.
+    """
+    try:
+        plan = _scatter_layout(layout, bits_per_sample, password)
+    except ValueError:
+        return None
+
+    nbytes = plan.window_units * layout.sampwidth
+
+    def next_window():
+        with metrics.stage("audio.read", nbytes):
+            buf = f.read(nbytes)
+        if len(buf) < nbytes:
+            raise ValueError("No hidden data found (payload incomplete)")
+        return _lsb_view(buf, layout.sampwidth)
+
+    f.seek(layout.data_offset)
+    return scatter.ScatterReader(next_window, plan, bits_per_sample)
+
+
+def _extract_legacy(reader, prefix, capacity, progress_callback=None):
+    payload_len = struct.unpack(">I", prefix)[0]
+    if 4 + payload_len > capacity:
+        raise ValueError("No hidden data found (invalid payload length)")
+
+    block_bytes = BLOCK_SAMPLES * reader.bits // 8
+    parts = []
+    done = 0
+    while done < payload_len:
+        nbytes = min(payload_len - done, block_bytes)
+        parts.append(reader.read_bytes(nbytes))
+        done += nbytes
+        if progress_callback:
+            progress_callback(done, payload_len)
+    return b"".join(parts)
+
+
+def capacity_bits(wav_in, bits_per_sample=1):
+    """
+    Total number of LSB bits available in the file's PCM data.
+    """
+    with _open(wav_in, "rb") as f:
+        layout = read_layout(f)
+    return layout.nframes * layout.nchannels * bits_per_sample
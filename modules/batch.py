@@ -0,0 +1,254 @@
+"""
+Batch encode / decode / scan over many carriers.
+
+Work items come from a directory (every carrier with a known extension)
+or a manifest (JSONL with one object per line, or a plain list of paths).
+Items run on a process pool through the same encoder / decoder wrappers
+the web app uses, and every finished item is appended to a JSONL report
+as soon as it completes. Re-running with the same report skips items
+that already finished, so an interrupted batch picks up where it stopped.
+
+    from modules import batch
+    items = batch.discover("carriers/", "encode", output_dir="out/", secret="watermark")
+    summary = batch.run_batch(items, "report.jsonl")
+
+"scan" items write nothing: their record's result is the steganalysis
+report (modules.steganalysis), for triaging a large set of carriers.
+"""
+
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from . import codecs
+from .capacity import EXTENSIONS, media_for
+
+STEGO_EXTENSIONS = {"image": ".png", "audio": ".wav", "video": ".mkv"}
+
+# Statuses that count as finished when a batch is resumed
+DONE = ("ok", "no-data")
+
+# Items in flight per pool worker; bounds memory for very large batches
+QUEUE_DEPTH = 4
+
+
+# --------------------------------------------------
+# Work item discovery
+# --------------------------------------------------
+def _default_output(item, output_dir):
+    if item["action"] == "scan":
+        return None
+    stem = os.path.splitext(os.path.basename(item["input"]))[0]
+    if item["action"] == "encode":
+        ext = ".jpg" if _keeps_jpeg(item) else STEGO_EXTENSIONS[item["media"]]
+        return os.path.join(output_dir, stem + "_stego" + ext)
+    if item["media"] == "video":
+        # video decode restores the embedded file name inside this folder
+        return os.path.join(output_dir, stem)
+    return os.path.join(output_dir, stem + "_decoded.bin")
+
+
+def _keeps_jpeg(item):
+    # jpeg=True only changes JPEG carriers; other images still become PNG
+    return bool(item.get("jpeg")) and item["media"] == "image" and \
+        os.path.splitext(item["input"])[1].lower() in codecs.get("jpeg").extensions
+
+
+def _read_manifest(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            yield json.loads(line) if line.startswith("{") else {"input": line}
+
+
+def discover(source, action, output_dir=None, media=None, recursive=True, **params):
+    """
+    Build work items from a directory or a manifest file.
+
+    source     : directory of carriers, or a manifest (.jsonl / list of paths)
+    action     : "encode", "decode" or "scan"
+    output_dir : where results go unless a manifest entry names "output"
+                 (unused by "scan")
+    media      : only keep "image", "audio" or "video" carriers
+    params     : defaults for every item (secret, password, bits, scatter, jpeg)
+
+    returns : list of item dicts
+    """
+    if action not in ("encode", "decode", "scan"):
+        raise ValueError("action must be 'encode', 'decode' or 'scan'")
+    if action != "scan" and not output_dir:
+        raise ValueError(f"{action} needs an output directory")
+
+    if os.path.isdir(source):
+        entries = []
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            entries.extend({"input": os.path.join(root, name)} for name in sorted(files))
+            if not recursive:
+                break
+    else:
+        base = os.path.dirname(os.path.abspath(source))
+        entries = []
+        for entry in _read_manifest(source):
+            entry["input"] = os.path.join(base, entry["input"])
+            entries.append(entry)
+
+    items = []
+    for entry in entries:
+        item = dict(params, **entry)
+        item["action"] = action
+        item["input"] = os.path.abspath(item["input"])
+        item["media"] = item.get("media") or media_for(item["input"])
+        if item["media"] is None or (media and item["media"] != media):
+            continue
+        item.setdefault("output", _default_output(item, output_dir))
+        if item["output"]:
+            item["output"] = os.path.abspath(item["output"])
+        items.append(item)
+    return items
+
+
+# --------------------------------------------------
+# Worker side
+# --------------------------------------------------
+def _secret_bytes(secret):
+    if isinstance(secret, str) and os.path.isfile(secret):
+        with open(secret, "rb") as f:
+            return f.read()
+    return secret.encode("utf-8") if isinstance(secret, str) else secret
+
+
+def _run(item):
+    media, action = item["media"], item["action"]
+    password = item.get("password") or None
+    bits = int(item.get("bits", 1))
+    scatter = bool(item.get("scatter"))
+    src, dst = item["input"], item["output"]
+    if action == "scan":
+        from . import steganalysis
+        return steganalysis.scan(src, media)
+    os.makedirs(dst if media == "video" and action == "decode" else os.path.dirname(dst), exist_ok=True)
+
+    codec = codecs.get("jpeg" if action == "encode" and _keeps_jpeg(item) else media)
+
+    if media == "image":
+        if action == "encode":
+            return codec.encode(src, _secret_bytes(item["secret"]), dst, bits=bits, password=password,
+                                scatter=scatter)
+        return codec.decode(src, dst, password=password)
+
+    if media == "audio":
+        if action == "encode":
+            return codec.encode(src, item["secret"], dst, bits=bits, password=password, scatter=scatter)
+        return codec.decode(src, dst, bits=bits, password=password)
+
+    if action == "encode":
+        encode = codec.encode
+        secret = item["secret"]
+        # the pool already uses every core, so no per-video workers
+        if os.path.isfile(secret):
+            return encode(src, secret, dst, password=password, bits=bits, workers=0, scatter=scatter)
+        # video hides files: stage a text secret as secret.txt, like the web app
+        with tempfile.TemporaryDirectory() as tmp:
+            staged = os.path.join(tmp, "secret.txt")
+            with open(staged, "w", encoding="utf-8") as f:
+                f.write(secret)
+            return encode(src, staged, dst, password=password, bits=bits, workers=0, scatter=scatter)
+    return codec.decode(src, dst, password=password, bits=bits)
+
+
+def run_item(item):
+    """
+    Process one item and return its report record (never raises).
+    """
+    start = time.perf_counter()
+    record = {
+        "input": item["input"],
+        "output": item["output"],
+        "action": item["action"],
+        "media": item["media"],
+    }
+    try:
+        record["result"] = _run(item)
+        record["status"] = "ok"
+    except Exception as e:
+        message = str(e) or e.__class__.__name__
+        record["status"] = "no-data" if message.startswith("No hidden") else "error"
+        record["error"] = message
+    record["seconds"] = round(time.perf_counter() - start, 4)
+    return record
+
+
+# --------------------------------------------------
+# Driver
+# --------------------------------------------------
+def _item_key(item):
+    return item["action"], item["input"], item["output"]
+
+
+def finished_keys(report_path):
+    """
+    Keys of items a previous run already completed.
+    A truncated last line (crash mid-write) is ignored.
+    """
+    done = set()
+    if not os.path.exists(report_path):
+        return done
+    with open(report_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") in DONE:
+                done.add((record["action"], record["input"], record.get("output")))
+    return done
+
+
+def run_batch(items, report_path, workers=None, resume=True, on_result=None):
+    """
+    Run items on a process pool, appending one JSON record per item to
+    `report_path` as each finishes.
+
+    workers   : pool size (default: one per CPU)
+    resume    : skip items recorded as finished in an existing report
+    on_result : optional callable(record) for progress display
+
+    returns : dict of counts per status (plus "skipped")
+    """
+    done = finished_keys(report_path) if resume else set()
+    pending = [item for item in items if _item_key(item) not in done]
+    summary = {"skipped": len(items) - len(pending)}
+
+    workers = workers or os.cpu_count() or 1
+    mode = "a" if resume else "w"
+
+    with open(report_path, mode, encoding="utf-8") as report, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        queue = iter(pending)
+        running = set()
+
+        def fill():
+            for item in queue:
+                running.add(pool.submit(run_item, item))
+                if len(running) >= workers * QUEUE_DEPTH:
+                    break
+
+        fill()
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                running.remove(future)
+                record = future.result()
+                report.write(json.dumps(record) + "\n")
+                report.flush()
+                summary[record["status"]] = summary.get(record["status"], 0) + 1
+                if on_result:
+                    on_result(record)
+            fill()
+
+    return summary
@@ -0,0 +1,213 @@
+"""
+Vectorized LSB bit-plane engine shared by the steganography codecs.
+
+All helpers work on whole NumPy arrays: the payload is expanded with
+np.unpackbits, grouped into `nbits`-wide values (MSB first) and written
+into the low bits of a flat carrier view with masked assignment.
+"""
+
+import numpy as np
+
+SUPPORTED_BITS = (1, 2, 3, 4)
+
+
+def _check_bits(nbits):
+    if nbits not in SUPPORTED_BITS:
+        raise ValueError("bits per unit must be between 1 and 4")
+
+
+# --------------------------------------------------
+# bytes <-> bit arrays
+# --------------------------------------------------
+def bytes_to_bits(data):
+    """
+    Expand bytes into a uint8 array of 0/1 values (MSB first).
+    """
+    return np.unpackbits(np.frombuffer(bytes(data), dtype=np.uint8))
+
+
+def bits_to_bytes(bits):
+    """
+    Pack an array of 0/1 values back into bytes (MSB first).
+    A trailing partial byte is zero padded.
+    """
+    return np.packbits(np.asarray(bits, dtype=np.uint8)).tobytes()
+
+
+# --------------------------------------------------
+# bit arrays <-> nbits-wide unit values
+# --------------------------------------------------
+def bits_to_units(bits, nbits):
+    """
+    Group a bit array into `nbits`-wide values, one per carrier unit.
+
+    bits    : uint8 array of 0/1 values
+    nbits   : number of LSBs used per carrier unit (1-4)
+
+    returns : uint8 array of values in [0, 2**nbits)
+    """
+    _check_bits(nbits)
+    bits = np.asarray(bits, dtype=np.uint8)
+    if nbits == 1:
+        return bits
+
+    pad = (-len(bits)) % nbits
+    if pad:
+        bits = np.concatenate([bits, np.zeros(pad, dtype=np.uint8)])
+
+    weights = (1 << np.arange(nbits - 1, -1, -1)).astype(np.uint8)
+    return bits.reshape(-1, nbits) @ weights
+
+
+def units_to_bits(units, nbits):
+    """
+    Expand `nbits`-wide unit values back into a flat bit array.
+    """
+    _check_bits(nbits)
+    units = np.asarray(units, dtype=np.uint8)
+    if nbits == 1:
+        return units
+
+    return np.unpackbits(units[:, None], axis=1)[:, 8 - nbits:].ravel()
+
+
+def units_needed(nbits_total, nbits):
+    """
+    Number of carrier units required to hold `nbits_total` payload bits.
+    """
+    return -(-nbits_total // nbits)
+
+
+# --------------------------------------------------
+# Embed / extract on a flat carrier
+# --------------------------------------------------
+def embed_units(carrier, units, nbits, start=0):
+    """
+    Write unit values into the low `nbits` bits of `carrier` in place.
+
+    carrier : integer numpy array (any shape, must be contiguous)
+    units   : values produced by bits_to_units()
+    nbits   : number of LSBs used per carrier unit (1-4)
+    start   : index of the first carrier unit to overwrite
+
+    returns : number of carrier units written
+    """
+    _check_bits(nbits)
+    flat = carrier.reshape(-1)
+    n = min(len(units), flat.size - start)
+    if n <= 0:
+        return 0
+
+    clear = ~flat.dtype.type((1 << nbits) - 1)
+    region = flat[start:start + n]
+    region &= clear
+    region |= units[:n].astype(flat.dtype)
+    return n
+
+
+def extract_units(carrier, nbits, count=None, start=0):
+    """
+    Read the low `nbits` bits of `count` carrier units.
+
+    carrier : integer numpy array (any shape)
+    nbits   : number of LSBs used per carrier unit (1-4)
+    count   : number of units to read (default: to the end)
+    start   : index of the first carrier unit to read
+
+    returns : uint8 array of unit values
+    """
+    _check_bits(nbits)
+    flat = carrier.reshape(-1)
+    stop = flat.size if count is None else min(flat.size, start + count)
+    mask = flat.dtype.type((1 << nbits) - 1)
+    return (flat[start:stop] & mask).astype(np.uint8)
+
+
+def embed_units_at(carrier, units, nbits, positions):
+    """
+    Scatter unit values into the low `nbits` bits of the carrier units at
+    `positions` (an index array, e.g. from modules.scatter), in place.
+
+    returns : number of carrier units written
+    """
+    _check_bits(nbits)
+    flat = carrier.reshape(-1)
+    n = min(len(units), len(positions))
+    idx = positions[:n]
+    clear = ~flat.dtype.type((1 << nbits) - 1)
+    flat[idx] = (flat[idx] & clear) | units[:n].astype(flat.dtype)
+    return n
+
+
+def extract_units_at(carrier, nbits, positions):
+    """
+    Gather the low `nbits` bits of the carrier units at `positions`.
+    """
+    _check_bits(nbits)
+    flat = carrier.reshape(-1)
+    mask = flat.dtype.type((1 << nbits) - 1)
+    return (flat[positions] & mask).astype(np.uint8)
+
+
+# --------------------------------------------------
+# Streaming reader over block-wise carriers
+# --------------------------------------------------
+class BitReader:
+    """
+    Pulls embedded bits out of a carrier that is decoded block by block
+    (video frames, runs of audio samples).
+
+    Subclasses implement _next_block(), returning the next integer carrier
+    array or raising ValueError when the carrier is exhausted. Blocks are
+    only fetched when more bits are requested, so extraction stops reading
+    as soon as the payload is complete.
+    """
+
+    def __init__(self, nbits=1):
+        _check_bits(nbits)
+        self.bits = nbits
+        self._block = None
+        self._pos = 0
+        self._spare = np.zeros(0, dtype=np.uint8)
+
+    def _next_block(self):
+        raise NotImplementedError
+
+    def reset(self, block=None, pos=0):
+        """
+        Drop buffered bits and continue from unit `pos` of `block` (None:
+        from the start of the next block). Used by readers that seek.
+        """
+        self._block = block
+        self._pos = pos
+        self._spare = np.zeros(0, dtype=np.uint8)
+
+    def read(self, count):
+        """
+        Return the next `count` embedded bits as a uint8 array.
+        """
+        parts = [self._spare]
+        have = len(self._spare)
+
+        while have < count:
+            if self._block is None or self._pos >= self._block.size:
+                self._block = self._next_block()
+                self._pos = 0
+
+            want = units_needed(count - have, self.bits)
+            units = extract_units(self._block, self.bits, want, self._pos)
+            self._pos += len(units)
+
+            bits = units_to_bits(units, self.bits)
+            parts.append(bits)
+            have += len(bits)
+
+        bits = np.concatenate(parts)
+        self._spare = bits[count:]
+        return bits[:count]
+
+    def read_bytes(self, count):
+        """
+        Return the next `count` embedded bytes.
+        """
+        return bits_to_bytes(self.read(count * 8))
@@ -0,0 +1,218 @@
+"""
+Carrier capacity from container metadata alone.
+
+probe() never decodes pixels, samples or frames: images are opened lazily
+with PIL (which parses only the header, e.g. the PNG IHDR chunk), WAV
+files through their RIFF chunks and videos through the stream properties
+OpenCV reads when the file is opened. JPEG output ("jpeg") is the
+exception: its capacity depends on the luma DCT coefficients, which are
+entropy-decoded (still no pixels). capacity() turns that into the
+largest payload each bits-per-unit setting can hold, after the container
+header, the optional encryption overhead and an estimate of what
+compression will save.
+"""
+
+import math
+import os
+from collections import namedtuple
+
+from . import compression, container, crypto
+
+MEDIA_BITS = {"image": (1, 2, 3, 4), "jpeg": (1,), "audio": (1, 2, 3, 4), "video": (1, 2)}
+
+EXTENSIONS = {
+    "image": (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp"),
+    "audio": (".wav",),
+    "video": (".mp4", ".mkv", ".avi", ".mov"),
+}
+
+# media, carrier units (channel values / samples), details for display
+CarrierInfo = namedtuple("CarrierInfo", "media units details")
+
+
+def media_for(path):
+    """
+    Media type from a file name extension, or None.
+    """
+    ext = os.path.splitext(str(path))[1].lower()
+    for media, exts in EXTENSIONS.items():
+        if ext in exts:
+            return media
+    return None
+
+
+# --------------------------------------------------
+# Metadata probes
+# --------------------------------------------------
+def _probe_image(carrier):
+    from PIL import Image
+    from .image_steg.image_core import NATIVE_MODES
+
+    with Image.open(carrier) as img:
+        width, height = img.size
+        mode = img.mode
+        bands = img.getbands()
+    # Same conversion the codec applies before embedding
+    if mode not in NATIVE_MODES:
+        mode = "RGBA" if "A" in bands else "RGB"
+    channels = len(mode)
+    return CarrierInfo("image", width * height * channels,
+                       {"width": width, "height": height, "mode": mode})
+
+
+def _probe_jpeg(carrier):
+    from .image_steg import jpeg_core
+
+    units, jpeg = jpeg_core.carrier_units(carrier)
+    return CarrierInfo("jpeg", units, {
+        "width": jpeg.width, "height": jpeg.height, "progressive": jpeg.progressive,
+    })
+
+
+def _probe_audio(carrier):
+    from .audio_steg.wavstream import _open, read_layout
+
+    with _open(carrier, "rb") as f:
+        layout = read_layout(f)
+    return CarrierInfo("audio", layout.nframes * layout.nchannels, {
+        "channels": layout.nchannels,
+        "sample_width": layout.sampwidth,
+        "frame_rate": layout.framerate,
+        "frames": layout.nframes,
+    })
+
+
+def _probe_video(carrier):
+    import cv2
+
+    cap = cv2.VideoCapture(carrier)
+    try:
+        if not cap.isOpened():
+            raise ValueError("Unreadable video")
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+    finally:
+        cap.release()
+    return CarrierInfo("video", width * height * 3 * frames, {
+        "width": width, "height": height, "frames": frames, "fps": fps,
+    })
+
+
+def probe(carrier, media=None):
+    """
+    Read carrier metadata.
+
+    carrier : path, or binary file object for images and WAV files
+    media   : "image" / "jpeg" / "audio" / "video" (default: from the extension)
+    """
+    media = media or media_for(carrier)
+    if media == "image":
+        return _probe_image(carrier)
+    if media == "jpeg":
+        return _probe_jpeg(carrier)
+    if media == "audio":
+        return _probe_audio(carrier)
+    if media == "video":
+        if not isinstance(carrier, (str, os.PathLike)):
+            raise ValueError("Video capacity needs a file path")
+        return _probe_video(carrier)
+    raise ValueError("Unknown carrier type")
+
+
+# --------------------------------------------------
+# Capacity arithmetic
+# --------------------------------------------------
+def stored_capacity(info, bits, name_len=0):
+    """
+    Bytes available for the stored (compressed / encrypted) payload.
+    """
+    if info.media == "image":
+        # the image header is always written at 1 bit per channel
+        stored = (info.units - container.HEADER_SIZE * 8) * bits // 8
+    else:
+        stored = info.units * bits // 8 - container.HEADER_SIZE
+    return max(stored - name_len, 0)
+
+
+def max_plain(stored, password=False):
+    """
+    Largest payload whose stored size fits in `stored` bytes, ignoring
+    compression.
+    """
+    if not password:
+        return stored
+    n = stored - crypto.HEADER_SIZE - crypto.TAG_SIZE
+    if n <= 0:
+        return 0
+    # one extra tag per additional chunk
+    n -= crypto.TAG_SIZE * (math.ceil(n / crypto.CHUNK_SIZE) - 1)
+    while n > 0 and crypto.encrypted_size(n) > stored:
+        n -= 1
+    return max(n, 0)
+
+
+def estimate_stored(payload_size, sample=None, password=False, compress=True):
+    """
+    Estimated stored size of a payload, from a leading sample of it.
+
+    returns : (codec name, estimated stored bytes)
+    """
+    codec = compression.NONE
+    size = payload_size
+    if compress and sample:
+        codec = compression.choose(sample, payload_size)
+        if codec:
+            sample = bytes(sample[:compression.SAMPLE_SIZE])
+            ratio = len(compression.compress(sample, codec)) / len(sample)
+            size = min(payload_size, math.ceil(payload_size * ratio))
+    if password:
+        size = crypto.encrypted_size(size)
+    return compression.NAMES[codec], size
+
+
+def capacity(carrier, media=None, payload_size=None, payload_sample=None,
+             password=False, compress=True, name=""):
+    """
+    Capacity report for one carrier at every bits-per-unit setting.
+
+    payload_size   : planned payload size, to check whether it fits
+    payload_sample : leading bytes of the payload, used to estimate
+                     compression (without it no saving is assumed)
+    password       : whether the payload will be encrypted
+    name           : payload file name stored with it (video)
+
+    returns : dict, JSON serialisable
+    """
+    info = probe(carrier, media)
+    name_len = len(name.encode("utf-8"))
+
+    report = {
+        "media": info.media,
+        "carrier": info.details,
+        "header_bytes": container.HEADER_SIZE + name_len,
+        "encrypted": bool(password),
+        "bits": {},
+    }
+
+    estimate = None
+    if payload_size is not None:
+        codec, estimate = estimate_stored(payload_size, payload_sample, password, compress)
+        report["payload"] = {
+            "size": payload_size,
+            "compression": codec,
+            "estimated_stored_bytes": estimate,
+        }
+        report["recommended_bits"] = None
+
+    for bits in MEDIA_BITS[info.media]:
+        stored = stored_capacity(info, bits, name_len)
+        entry = {"capacity_bytes": stored, "max_payload_bytes": max_plain(stored, password)}
+        if estimate is not None:
+            entry["fits"] = estimate <= stored
+            if entry["fits"] and report["recommended_bits"] is None:
+                report["recommended_bits"] = bits
+        report["bits"][bits] = entry
+
+    return report
@@ -0,0 +1,164 @@
+"""
+Codec registry: the image, audio and video codecs behind one interface.
+
+    codec = codecs.get("image")          # or codecs.for_path("cover.png")
+    codec.encode(carrier, secret, out_path, bits=1, password=None)
+    codec.decode(carrier, ...)
+    codec.capacity(carrier, payload_size=...)
+    codec.scan(carrier)                  # steganalysis screening score
+
+Every operation is registered as a "module:function" string and imported
+on its first call, so importing this registry (and app.py, the job queue
+or the batch CLI) loads no NumPy, PIL or OpenCV. A web worker that only
+ever handles images never imports OpenCV at all.
+
+Pre-fork servers can pay the import cost once in the parent instead:
+preload() imports the operations of some or all codecs up front (app.py
+calls it with Config.PRELOAD_CODECS), and forked workers share the pages.
+"""
+
+import importlib
+import threading
+
+from .capacity import EXTENSIONS, MEDIA_BITS, media_for
+
+_REQUIRED = ("encode", "decode")
+
+
+class Codec:
+    """
+    One media type.
+
+    name       : "image" / "audio" / "video"
+    extensions : carrier file extensions (lower case, with the dot)
+    bits       : supported bits-per-unit settings
+    ops        : operation name -> "module:function"; encode and decode are
+                 required, any others (decode_bytes, list_contents, ...)
+                 are reached the same way, as attributes
+    """
+
+    def __init__(self, name, extensions, bits, **ops):
+        missing = [op for op in _REQUIRED if op not in ops]
+        if missing:
+            raise ValueError(f"Codec {name} is missing: {', '.join(missing)}")
+        self.name = name
+        self.extensions = tuple(extensions)
+        self.bits = tuple(bits)
+        self.ops = ops
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<Codec {self.name} ({'loaded' if self.loaded else 'lazy'})>"
+
+    def __getattr__(self, op):
+        # Only called for attributes not set yet: resolve the operation and
+        # keep it on the instance, so later calls are plain attribute reads
+        ops = self.__dict__.get("ops", {})
+        if op not in ops:
+            raise AttributeError(f"Codec {self.__dict__.get('name')!r} has no operation {op!r}")
+        with self._lock:
+            func = self.__dict__.get(op)
+            if func is None:
+                module_name, _, func_name = ops[op].partition(":")
+                func = getattr(importlib.import_module(module_name, __package__), func_name)
+                self.__dict__[op] = func
+        return func
+
+    @property
+    def loaded(self):
+        return all(op in self.__dict__ for op in self.ops)
+
+    def load(self):
+        """
+        Import every operation now.
+        """
+        for op in self.ops:
+            getattr(self, op)
+        return self
+
+    def capacity(self, carrier, **params):
+        """
+        Capacity report from carrier metadata (modules.capacity.capacity);
+        cheap enough that it never loads the codec itself.
+        """
+        from .capacity import capacity
+        return capacity(carrier, media=self.name, **params)
+
+
+_codecs = {}
+
+
+def register(codec):
+    """
+    Add (or replace) a codec; it is looked up by codec.name.
+    """
+    _codecs[codec.name] = codec
+    return codec
+
+
+def get(name):
+    try:
+        return _codecs[name]
+    except KeyError:
+        raise ValueError("Unknown carrier type") from None
+
+
+def for_path(path):
+    """
+    Codec for a carrier file name, by extension.
+    """
+    return get(media_for(path))
+
+
+def names():
+    return tuple(_codecs)
+
+
+def preload(media=None):
+    """
+    Import the operations of the named codecs (all of them when None).
+    For pre-fork servers: call it in the parent before workers fork.
+
+    returns : the codecs that were loaded
+    """
+    selected = [get(name) for name in (_codecs if media is None else media)]
+    return [codec.load() for codec in selected]
+
+
+# --------------------------------------------------
+# Built-in codecs
+# --------------------------------------------------
+register(Codec(
+    "image", EXTENSIONS["image"], MEDIA_BITS["image"],
+    encode=".image_steg.encoder:encode",
+    decode=".image_steg.decoder:decode",
+    decode_bytes=".image_steg.decoder:decode_bytes",
+    scan=".steganalysis:scan_image",
+))
+
+# JPEG carriers kept as JPEG (DCT coefficients); decoding is shared with
+# "image", which recognises JPEG input
+register(Codec(
+    "jpeg", (".jpg", ".jpeg"), MEDIA_BITS["jpeg"],
+    encode=".image_steg.encoder:encode_jpeg",
+    encode_file=".image_steg.encoder:encode_jpeg_file",
+    decode=".image_steg.decoder:decode",
+    decode_bytes=".image_steg.decoder:decode_bytes",
+    scan=".steganalysis:scan_image",
+))
+
+register(Codec(
+    "audio", EXTENSIONS["audio"], MEDIA_BITS["audio"],
+    encode=".audio_steg.encoder:encode",
+    decode=".audio_steg.decoder:decode",
+    scan=".steganalysis:scan_audio",
+))
+
+register(Codec(
+    "video", EXTENSIONS["video"], MEDIA_BITS["video"],
+    encode=".video_steg.encoder:encode",
+    decode=".video_steg.decoder:decode",
+    decode_range=".video_steg.decoder:decode_range",
+    list_contents=".video_steg.decoder:list_contents",
+    scan=".steganalysis:scan_video",
+))
@@ -0,0 +1,151 @@
+"""
+Pluggable payload compression (zlib, lzma and zstd when installed).
+
+Every codec streams: Compressor / Decompressor take data in chunks, so a
+payload can be compressed while it is read and decompressed while it is
+extracted. choose() picks a codec from a sample of the payload and
+returns NONE for data that will not shrink (media, archives, ciphertext).
+
+Codec IDs are what the container header records (modules.container),
+so they must never be renumbered.
+"""
+
+import lzma
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+NONE = 0
+ZLIB = 1
+LZMA = 2
+ZSTD = 3
+
+NAMES = {NONE: "none", ZLIB: "zlib", LZMA: "lzma", ZSTD: "zstd"}
+CODECS = {name: codec for codec, name in NAMES.items()}
+
+CHUNK_SIZE = 1 << 20
+SAMPLE_SIZE = 256 * 1024
+
+# Only bother when the sample shrinks below this ratio
+MIN_RATIO = 0.9
+# lzma gives the smallest output but runs at a few MB/s
+LZMA_MAX_BYTES = 4 * 1024 * 1024
+
+ZLIB_LEVEL = 6
+LZMA_PRESET = 6
+ZSTD_LEVEL = 3
+
+
+def available():
+    """
+    Codec IDs usable in this environment.
+    """
+    codecs = [NONE, ZLIB, LZMA]
+    if zstandard is not None:
+        codecs.append(ZSTD)
+    return codecs
+
+
+def choose(sample, size):
+    """
+    Pick a codec for a payload of `size` bytes from its leading `sample`.
+    """
+    sample = bytes(sample[:SAMPLE_SIZE])
+    if not sample or len(zlib.compress(sample, 1)) > MIN_RATIO * len(sample):
+        return NONE
+    if zstandard is not None:
+        return ZSTD
+    if size <= LZMA_MAX_BYTES:
+        return LZMA
+    return ZLIB
+
+
+# --------------------------------------------------
+# Streaming compressor / decompressor
+# --------------------------------------------------
+class Compressor:
+    def __init__(self, codec):
+        if codec not in available():
+            raise ValueError(f"Compression codec not available: {NAMES.get(codec, codec)}")
+        self.codec = codec
+        if codec == ZLIB:
+            self._obj = zlib.compressobj(ZLIB_LEVEL)
+        elif codec == LZMA:
+            self._obj = lzma.LZMACompressor(preset=LZMA_PRESET)
+        elif codec == ZSTD:
+            self._obj = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        else:
+            self._obj = None
+
+    def update(self, data) -> bytes:
+        return self._obj.compress(data) if self._obj else bytes(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush() if self._obj else b""
+
+
+class Decompressor:
+    """
+    finalize() raises ValueError if the compressed stream was cut short.
+    """
+
+    def __init__(self, codec):
+        if codec not in available():
+            raise ValueError(f"Payload uses an unavailable compression codec: {NAMES.get(codec, codec)}")
+        self.codec = codec
+        if codec == ZLIB:
+            self._obj = zlib.decompressobj()
+        elif codec == LZMA:
+            self._obj = lzma.LZMADecompressor()
+        elif codec == ZSTD:
+            self._obj = zstandard.ZstdDecompressor().decompressobj()
+        else:
+            self._obj = None
+
+    def update(self, data) -> bytes:
+        if not self._obj:
+            return bytes(data)
+        if not data:
+            return b""
+        try:
+            return self._obj.decompress(data)
+        except (zlib.error, lzma.LZMAError, EOFError) as e:
+            raise ValueError(f"Corrupted compressed payload ({e})")
+        except Exception as e:
+            if zstandard is not None and isinstance(e, zstandard.ZstdError):
+                raise ValueError(f"Corrupted compressed payload ({e})")
+            raise
+
+    def finalize(self) -> bytes:
+        if self._obj is not None and not getattr(self._obj, "eof", True):
+            raise ValueError("Compressed payload is truncated")
+        return b""
+
+
+# --------------------------------------------------
+# One-shot helpers
+# --------------------------------------------------
+def compress(data, codec, out=None) -> bytearray:
+    """
+    Compress `data` chunk by chunk, appending the stream to `out`.
+    """
+    out = bytearray() if out is None else out
+    comp = Compressor(codec)
+    view = memoryview(data)
+    for start in range(0, len(view), CHUNK_SIZE):
+        out += comp.update(view[start:start + CHUNK_SIZE])
+    out += comp.flush()
+    return out
+
+
+def decompress(data, codec, out=None) -> bytearray:
+    out = bytearray() if out is None else out
+    dec = Decompressor(codec)
+    view = memoryview(data)
+    for start in range(0, len(view), CHUNK_SIZE):
+        out += dec.update(view[start:start + CHUNK_SIZE])
+    out += dec.finalize()
+    return out
@@ -0,0 +1,204 @@
+"""
+Binary container shared by the image, audio and video codecs.
+
+Fixed 22-byte header (big-endian), followed by the optional payload name
+and the stored payload:
+
+    magic "STG" | version | media | compression | encryption | bits
+    | name length (H) | stored length (Q) | CRC32 of name + stored bytes (I)
+
+The stored bytes are the payload after compression (modules.compression)
+and encryption (modules.crypto), in that order. The first four bytes are
+magic + version, so a decoder can turn away a carrier with no hidden data
+after reading only 32 bits. The CRC covers what is actually embedded, so
+it is checked while extracting, before anything is decrypted or
+decompressed.
+"""
+
+import os
+import struct
+import zlib
+from collections import namedtuple
+
+from . import compression, crypto, metrics
+
+MAGIC = b"STG"
+VERSION = 1
+HEADER_FMT = ">3sBBBBBHQI"
+HEADER_SIZE = struct.calcsize(HEADER_FMT)
+PREFIX_SIZE = len(MAGIC) + 1
+
+MEDIA_IMAGE = 1
+MEDIA_AUDIO = 2
+MEDIA_VIDEO = 3
+
+ENCRYPTION_NONE = 0
+ENCRYPTION_AESGCM = 1
+
+CHUNK_SIZE = 1 << 20
+
+Header = namedtuple(
+    "Header",
+    "media compression encryption bits name_len length crc"
+)
+
+
+# --------------------------------------------------
+# Header
+# --------------------------------------------------
+def has_prefix(buf) -> bool:
+    """
+    True if `buf` starts with the container magic and a known version.
+    Only the first PREFIX_SIZE bytes are looked at.
+    """
+    return bytes(buf[:len(MAGIC)]) == MAGIC and len(buf) >= PREFIX_SIZE and buf[len(MAGIC)] == VERSION
+
+
+def parse_header(buf, media=None, capacity=None):
+    """
+    Parse and sanity-check a header.
+
+    buf      : at least HEADER_SIZE bytes
+    media    : expected MEDIA_* value (None to accept any)
+    capacity : bytes available after the header in this carrier, if known
+
+    returns : Header, or raises ValueError when the carrier holds no container
+    """
+    if len(buf) < HEADER_SIZE or not has_prefix(buf):
+        raise ValueError("No hidden data found")
+
+    _, _, media_id, codec, encryption, bits, name_len, length, crc = struct.unpack(
+        HEADER_FMT, bytes(buf[:HEADER_SIZE])
+    )
+    if media is not None and media_id != media:
+        raise ValueError("No hidden data found (header is for another media type)")
+    if codec not in compression.NAMES or encryption not in (ENCRYPTION_NONE, ENCRYPTION_AESGCM):
+        raise ValueError("No hidden data found (unknown payload format)")
+    if capacity is not None and name_len + length > capacity:
+        raise ValueError("No hidden data found (invalid payload length)")
+
+    return Header(media_id, codec, encryption, bits, name_len, length, crc)
+
+
+def _source_chunks(source):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            yield from iter(lambda: f.read(CHUNK_SIZE), b"")
+    else:
+        view = memoryview(source)
+        for start in range(0, len(view), CHUNK_SIZE):
+            yield view[start:start + CHUNK_SIZE]
+
+
+def _sample(source):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read(compression.SAMPLE_SIZE), os.path.getsize(source)
+    return bytes(source[:compression.SAMPLE_SIZE]), len(source)
+
+
+# --------------------------------------------------
+# Build
+# --------------------------------------------------
+def build(source, media, bits, password=None, compress=True, name=""):
+    """
+    Header + name + stored payload in a single buffer.
+
+    source   : payload bytes, or a file path that is streamed in chunks
+    password : encrypt with AES-GCM when set
+    compress : let compression.choose() pick a codec from the payload
+
+    returns : bytearray ready to embed
+    """
+    with metrics.stage("payload.seal") as timer:
+        out = _build(source, media, bits, password, compress, name)
+        timer.nbytes = len(out)
+    return out
+
+
+def _build(source, media, bits, password, compress, name):
+    sample, size = _sample(source)
+    codec = compression.choose(sample, size) if compress else compression.NONE
+    name_bytes = name.encode("utf-8")
+
+    while True:
+        out = bytearray(HEADER_SIZE) + name_bytes
+        compressor = compression.Compressor(codec) if codec else None
+        encryptor = crypto.StreamEncryptor(password) if password else None
+
+        for chunk in _source_chunks(source):
+            if compressor:
+                chunk = compressor.update(chunk)
+            out += encryptor.update(chunk) if encryptor else chunk
+        tail = compressor.flush() if compressor else b""
+        if encryptor:
+            tail = encryptor.update(tail) + encryptor.finalize()
+        out += tail
+
+        stored = len(out) - HEADER_SIZE - len(name_bytes)
+        # The sample can be misleading: never store more than the raw size
+        if codec and stored >= (crypto.encrypted_size(size) if password else size):
+            codec = compression.NONE
+            continue
+        break
+
+    struct.pack_into(
+        HEADER_FMT, out, 0,
+        MAGIC, VERSION, media, codec,
+        ENCRYPTION_AESGCM if password else ENCRYPTION_NONE,
+        bits, len(name_bytes), stored,
+        zlib.crc32(memoryview(out)[HEADER_SIZE:])
+    )
+    return out
+
+
+# --------------------------------------------------
+# Streaming payload decoder
+# --------------------------------------------------
+class PayloadDecoder:
+    """
+    Turns the stored bytes of a container back into the original payload.
+
+    Feed the stored bytes to update() as they are extracted; it checks the
+    CRC incrementally and returns plaintext as soon as it is available.
+    finalize() raises ValueError on a CRC mismatch, a wrong password or a
+    truncated stream, so callers writing to disk should discard the output.
+    """
+
+    def __init__(self, header, password=None, name=b""):
+        if header.encryption and not password:
+            raise ValueError("Hidden data is encrypted, a password is required")
+        self.header = header
+        self._crc = zlib.crc32(name)
+        self._seen = 0
+        self._decryptor = crypto.StreamDecryptor(password) if header.encryption else None
+        self._decompressor = compression.Decompressor(header.compression) if header.compression else None
+
+    def update(self, chunk) -> bytes:
+        self._crc = zlib.crc32(chunk, self._crc)
+        self._seen += len(chunk)
+        if self._decryptor:
+            chunk = self._decryptor.update(chunk)
+        return self._decompressor.update(chunk) if self._decompressor else bytes(chunk)
+
+    def finalize(self) -> bytes:
+        if self._seen != self.header.length or self._crc != self.header.crc:
+            raise ValueError("Hidden data failed the integrity check (carrier modified or corrupted)")
+        tail = self._decryptor.finalize() if self._decryptor else b""
+        if self._decompressor:
+            tail = self._decompressor.update(tail) + self._decompressor.finalize()
+        return tail
+
+
+def open_payload(header, stored, password=None, name=b""):
+    """
+    One-shot PayloadDecoder over stored bytes already in memory.
+    """
+    with metrics.stage("payload.open", len(stored)):
+        dec = PayloadDecoder(header, password, name)
+        out = bytearray()
+        view = memoryview(stored)
+        for start in range(0, len(view), CHUNK_SIZE):
+            out += dec.update(view[start:start + CHUNK_SIZE])
+        out += dec.finalize()
+    return bytes(out)
@@ -0,0 +1,203 @@
+"""
+Password-based streaming encryption for payloads (AES-256-GCM).
+
+Envelope layout:
+    magic "SGC1" | chunk size exponent (1 byte) | salt (16) | nonce prefix (7)
+    followed by the ciphertext chunks, each CHUNK_SIZE bytes of plaintext
+    plus a 16-byte GCM tag (the last chunk may be shorter, or empty for an
+    empty payload).
+
+Every chunk is sealed on its own with the nonce
+    nonce prefix (7) | chunk counter (>I) | final flag (1)
+so chunks cannot be reordered, dropped or truncated without the tag check
+failing, and neither side ever needs more than one chunk in memory.
+
+Keys come from scrypt. Derived keys are cached for the life of the
+process, and the encrypt side reuses one salt per password, so only the
+first payload of a session pays for the KDF.
+"""
+
+import functools
+import os
+import struct
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
+MAGIC = b"SGC1"
+CHUNK_EXP = 20
+CHUNK_SIZE = 1 << CHUNK_EXP
+SALT_SIZE = 16
+PREFIX_SIZE = 7
+TAG_SIZE = 16
+HEADER_SIZE = len(MAGIC) + 1 + SALT_SIZE + PREFIX_SIZE
+
+SCRYPT_N = 1 << 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+
+# --------------------------------------------------
+# Key derivation
+# --------------------------------------------------
+@functools.lru_cache(maxsize=64)
+def derive_key(password: str, salt: bytes) -> bytes:
+    """
+    256-bit key for `password` and `salt` (cached per process).
+    """
+    kdf = Scrypt(salt=salt, length=32, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P)
+    return kdf.derive(password.encode("utf-8"))
+
+
+@functools.lru_cache(maxsize=64)
+def _session_salt(password: str) -> bytes:
+    # One salt per password per process keeps derive_key() cache hits on
+    # the encrypt side; nonce prefixes stay random per payload.
+    return os.urandom(SALT_SIZE)
+
+
+def _nonce(prefix, counter, final):
+    return prefix + struct.pack(">IB", counter, final)
+
+
+def encrypted_size(size, chunk_size=CHUNK_SIZE):
+    """
+    Envelope size (bytes) for `size` bytes of plaintext.
+    """
+    return HEADER_SIZE + size + max(-(-size // chunk_size), 1) * TAG_SIZE
+
+
+def is_encrypted(data) -> bool:
+    """
+    True if `data` starts with an encryption envelope header.
+    """
+    return bytes(data[:len(MAGIC)]) == MAGIC
+
+
+# --------------------------------------------------
+# Streaming encryptor / decryptor
+# --------------------------------------------------
+class StreamEncryptor:
+    """
+    Incremental encryption: feed plaintext to update(), then call
+    finalize(). Both return the ciphertext produced so far; the first
+    update() output begins with the envelope header.
+    """
+
+    def __init__(self, password: str):
+        salt = _session_salt(password)
+        self._aead = AESGCM(derive_key(password, salt))
+        self._prefix = os.urandom(PREFIX_SIZE)
+        self._counter = 0
+        self._buffer = bytearray()
+        self._header = MAGIC + bytes([CHUNK_EXP]) + salt + self._prefix
+
+    def _take_header(self):
+        header, self._header = self._header, b""
+        return header
+
+    def update(self, data) -> bytes:
+        self._buffer += data
+        out = [self._take_header()]
+        # Keep at least one byte back so the final chunk is sealed by finalize()
+        while len(self._buffer) > CHUNK_SIZE:
+            chunk = bytes(self._buffer[:CHUNK_SIZE])
+            del self._buffer[:CHUNK_SIZE]
+            out.append(self._aead.encrypt(_nonce(self._prefix, self._counter, 0), chunk, None))
+            self._counter += 1
+        return b"".join(out)
+
+    def finalize(self) -> bytes:
+        last = self._aead.encrypt(_nonce(self._prefix, self._counter, 1), bytes(self._buffer), None)
+        self._buffer = bytearray()
+        return self._take_header() + last
+
+
+class StreamDecryptor:
+    """
+    Incremental decryption. update() only releases plaintext from chunks
+    whose tag has already been verified; finalize() raises ValueError if
+    the stream was truncated or the password is wrong.
+    """
+
+    def __init__(self, password: str):
+        self._password = password
+        self._aead = None
+        self._chunk = None
+        self._prefix = None
+        self._counter = 0
+        self._buffer = bytearray()
+
+    def _open_header(self):
+        header = bytes(self._buffer[:HEADER_SIZE])
+        del self._buffer[:HEADER_SIZE]
+        if not is_encrypted(header):
+            raise ValueError("Payload is not encrypted")
+        exp = header[len(MAGIC)]
+        salt = header[len(MAGIC) + 1:len(MAGIC) + 1 + SALT_SIZE]
+        self._prefix = header[-PREFIX_SIZE:]
+        self._chunk = (1 << exp) + TAG_SIZE
+        self._aead = AESGCM(derive_key(self._password, salt))
+
+    def _open(self, chunk, final):
+        try:
+            return self._aead.decrypt(_nonce(self._prefix, self._counter, final), chunk, None)
+        except InvalidTag:
+            raise ValueError("Wrong password or corrupted payload")
+
+    def update(self, data) -> bytes:
+        self._buffer += data
+        if self._aead is None:
+            if len(self._buffer) < HEADER_SIZE:
+                return b""
+            self._open_header()
+
+        out = []
+        # A full chunk could still be the final one, so hold it back until
+        # more data (or finalize) arrives
+        while len(self._buffer) > self._chunk:
+            chunk = bytes(self._buffer[:self._chunk])
+            del self._buffer[:self._chunk]
+            out.append(self._open(chunk, 0))
+            self._counter += 1
+        return b"".join(out)
+
+    def finalize(self) -> bytes:
+        if self._aead is None:
+            raise ValueError("Encrypted payload is truncated")
+        last = self._open(bytes(self._buffer), 1)
+        self._buffer = bytearray()
+        return last
+
+
+# --------------------------------------------------
+# One-shot helpers
+# --------------------------------------------------
+def encrypt(data, password: str, out=None) -> bytearray:
+    """
+    Encrypt `data` chunk by chunk, appending the envelope to `out`
+    (a bytearray, e.g. one already holding a length header).
+    """
+    out = bytearray() if out is None else out
+    enc = StreamEncryptor(password)
+    view = memoryview(data)
+    for start in range(0, len(view), CHUNK_SIZE):
+        out += enc.update(view[start:start + CHUNK_SIZE])
+    out += enc.finalize()
+    return out
+
+
+def decrypt(data, password: str, out=None) -> bytearray:
+    """
+    Verify and decrypt an envelope, appending the plaintext to `out`.
+    """
+    if not is_encrypted(data):
+        raise ValueError("Payload is not encrypted")
+    out = bytearray() if out is None else out
+    dec = StreamDecryptor(password)
+    view = memoryview(data)
+    for start in range(0, len(view), CHUNK_SIZE):
+        out += dec.update(view[start:start + CHUNK_SIZE])
+    out += dec.finalize()
+    return out
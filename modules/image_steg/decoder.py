@@ -1,9 +1,40 @@
-from stegano import lsb
+from .image_core import extract_bytes
+from . import jpeg_core
 
-def decode(stego_image_path):
-    secret = lsb.reveal(stego_image_path)
+def decode_bytes(stego_image, password=None, with_bits=False):
+    """
+    Hidden bytes from a stego image (path or binary file object).
+    with_bits: return (bytes, bits per channel value they were stored at)
+    """
+    # LSB output is always PNG, so a JPEG can only hold DCT-domain data
+    if jpeg_core.is_jpeg(stego_image):
+        secret = jpeg_core.extract_bytes(stego_image, password)
+        return (secret, 1) if with_bits else secret
 
-    if secret is None:
+    found = extract_bytes(stego_image, password, with_bits=True)
+    if found is not None:
+        return found if with_bits else found[0]
+
+    # Images written by the old stegano-based encoder (1 bit per channel)
+    from stegano import lsb
+    if hasattr(stego_image, "seek"):
+        stego_image.seek(0)
+    try:
+        text = lsb.reveal(stego_image)
+    except Exception:
+        text = None
+    if text is None:
         raise ValueError("No hidden text found")
+    secret = text.encode("utf-8")
+    return (secret, 1) if with_bits else secret
+
+def decode(stego_image_path, output_path=None, password=None):
+    secret = decode_bytes(stego_image_path, password)
+
+    if output_path:
+        with open(output_path, "wb") as f:
+            f.write(secret)
+        return output_path
 
+    # Raw bytes, as from the audio decoder: payloads may be binary files or archives
     return secret
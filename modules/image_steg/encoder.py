@@ -1,12 +1,40 @@
-from stegano import lsb
-import os
+from .. import archive
+from .image_core import embed_bytes
+from . import jpeg_core
 
-def encode(input_image_path, secret_text, output_image_path):
-    if not secret_text:
-        raise ValueError("Secret text cannot be empty")
+def _payload(secret):
+    if not secret:
+        raise ValueError("Secret cannot be empty")
 
-    # stegano returns a PIL Image object
-    stego_img = lsb.hide(input_image_path, secret_text)
+    # Secret may be text, raw bytes, or a list of files packed into one archive
+    if isinstance(secret, (list, tuple)):
+        return archive.pack(secret)
+    if isinstance(secret, (bytes, bytearray)):
+        return bytes(secret)
+    return str(secret).encode("utf-8")
 
-    # Always save as PNG (lossless)
-    stego_img.save(output_image_path)
+def encode(input_image_path, secret, output_image_path, bits=1, password=None, compress=True,
+           scatter=False):
+    payload = _payload(secret)
+
+    # Always saved as PNG (lossless); compression / encryption happen in the container.
+    # scatter spreads the bits over the image at password-seeded positions
+    embed_bytes(input_image_path, payload, output_image_path, bits=bits,
+                password=password, compress=compress, scatter=scatter)
+    return output_image_path
+
+def encode_jpeg(input_image_path, secret, output_image_path, bits=1, password=None, compress=True,
+                scatter=False):
+    # JPEG carriers stay JPEGs: the payload goes into the DCT coefficients
+    if bits != 1 or scatter:
+        raise ValueError("JPEG output supports 1 bit per coefficient and no scatter")
+    payload = _payload(secret)
+    jpeg_core.embed_bytes(input_image_path, payload, output_image_path,
+                          password=password, compress=compress)
+    return output_image_path
+
+def encode_jpeg_file(input_image_path, secret_path, output_image_path, password=None, compress=True):
+    # Job queue entry point: the web app stages the payload in a file
+    with open(secret_path, "rb") as f:
+        payload = f.read()
+    return encode_jpeg(input_image_path, payload, output_image_path, password=password, compress=compress)
@@ -0,0 +1,188 @@
+"""
+Native LSB image steganography on a NumPy view of a PIL image.
+
+Layout of the hidden stream (channel values in row-major order):
+- the first HEADER_UNITS channel values carry the shared container header
+  (modules.container) at 1 bit each, so it can be read before the
+  bits-per-channel setting is known
+- the stored payload follows at `bits` bits per channel value
+
+With scatter=True the same header and payload units go to positions
+drawn from a password-seeded permutation (modules.scatter) instead of the
+leading ones. The channel values are cut into equal windows of about
+SCATTER_WINDOW_UNITS, like the sample blocks of audio, so the permutation
+is the size of one window rather than of the whole image.
+
+Decoding checks the header first and only touches the channel values
+that actually hold the payload. A password lets it fall back to the
+scattered layout.
+"""
+
+import numpy as np
+from PIL import Image
+
+from .. import bitplane, container, metrics, scatter as scattering
+
+HEADER_UNITS = container.HEADER_SIZE * 8
+PREFIX_UNITS = container.PREFIX_SIZE * 8
+
+NATIVE_MODES = ("L", "LA", "RGB", "RGBA")
+
+# Channel values per scattered window (a 4 MB permutation)
+SCATTER_WINDOW_UNITS = 1 << 20
+
+
+def _load_pixels(image_path, writable=False):
+    with metrics.stage("image.load") as timer:
+        img = Image.open(image_path)
+        if img.mode not in NATIVE_MODES:
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        pixels = np.array(img) if writable else np.asarray(img)
+        timer.nbytes = pixels.nbytes
+    return pixels
+
+
+def capacity_bytes(shape, bits=1):
+    """
+    Maximum stored payload (bytes) for an image array of the given shape.
+    """
+    units = int(np.prod(shape)) - HEADER_UNITS
+    return max(units * bits // 8, 0)
+
+
+# --------------------------------------------------
+# Scattered layout
+# --------------------------------------------------
+def _scatter_layout(size, password):
+    # Windows of equal size covering all but the last few channel values
+    windows = max(-(-size // SCATTER_WINDOW_UNITS), 1)
+    return scattering.Layout(size // windows, windows, HEADER_UNITS, password)
+
+
+def _scatter_windows(pixels, layout):
+    # (windows, window_units) view of the leading channel values
+    used = layout.windows * layout.window_units
+    return pixels.reshape(-1)[:used].reshape(layout.windows, layout.window_units)
+
+
+# --------------------------------------------------
+# Embed
+# --------------------------------------------------
+def embed_bytes(input_image_path, payload: bytes, output_image_path, bits=1,
+                password=None, compress=True, scatter=False):
+    """
+    Hide arbitrary bytes in an image and save the result as PNG.
+    The payload is compressed / encrypted by the container first.
+    scatter spreads it over the image at password-seeded positions.
+    """
+    if bits not in bitplane.SUPPORTED_BITS:
+        raise ValueError("bits must be between 1 and 4")
+
+    pixels = _load_pixels(input_image_path, writable=True)
+
+    sealed = container.build(payload, container.MEDIA_IMAGE, bits,
+                             password=password, compress=compress)
+    stored = memoryview(sealed)[container.HEADER_SIZE:]
+    if len(stored) > capacity_bytes(pixels.shape, bits):
+        raise ValueError(
+            f"Payload too large. Max capacity = {capacity_bytes(pixels.shape, bits)} bytes."
+        )
+
+    with metrics.stage("image.embed", len(sealed)):
+        header = bitplane.bytes_to_bits(sealed[:container.HEADER_SIZE])
+        units = bitplane.bits_to_units(bitplane.bytes_to_bits(stored), bits)
+
+        if scatter:
+            layout = _scatter_layout(pixels.size, password).plan(len(units))
+            windows = _scatter_windows(pixels, layout)
+            bitplane.embed_units_at(windows[0], header, 1, layout.header_positions())
+            for window in range(layout.spread):
+                bitplane.embed_units_at(windows[window], layout.slice(window, units), bits,
+                                        layout.positions(window))
+        else:
+            bitplane.embed_units(pixels, header, 1)
+            bitplane.embed_units(pixels, units, bits, start=HEADER_UNITS)
+
+    # Always save as PNG (lossless)
+    with metrics.stage("image.save", pixels.nbytes):
+        Image.fromarray(pixels).save(output_image_path, format="PNG")
+
+
+# --------------------------------------------------
+# Extract
+# --------------------------------------------------
+def _read_units(pixels, bits, nbytes, start, perm=None):
+    # perm: scattered header, unit i lives at channel value perm[i]
+    count = bitplane.units_needed(nbytes * 8, bits)
+    if perm is None:
+        units = bitplane.extract_units(pixels, bits, count, start=start)
+    else:
+        units = bitplane.extract_units_at(pixels, bits, perm[start:start + count])
+    return bitplane.bits_to_bytes(bitplane.units_to_bits(units, bits)[:nbytes * 8])
+
+
+def _read_scattered(pixels, layout, bits, nbytes):
+    count = bitplane.units_needed(nbytes * 8, bits)
+    layout.plan(count)
+    windows = _scatter_windows(pixels, layout)
+    units = np.concatenate([
+        bitplane.extract_units_at(windows[window], bits, layout.positions(window))
+        for window in range(layout.spread)
+    ])[:count]
+    return bitplane.bits_to_bytes(bitplane.units_to_bits(units, bits)[:nbytes * 8])
+
+
+def read_header(pixels, perm=None):
+    """
+    Parse the container header, or return None if the image carries none.
+    Only the first 32 channel values are read for a non-stego image.
+    perm : header positions of a scattered layout (see modules.scatter)
+    """
+    if pixels.size < HEADER_UNITS:
+        return None
+
+    if not container.has_prefix(_read_units(pixels, 1, container.PREFIX_SIZE, 0, perm)):
+        return None
+    try:
+        header = container.parse_header(
+            _read_units(pixels, 1, container.HEADER_SIZE, 0, perm), container.MEDIA_IMAGE
+        )
+    except ValueError:
+        return None
+    if header.bits not in bitplane.SUPPORTED_BITS:
+        return None
+    if header.name_len + header.length > capacity_bytes(pixels.shape, header.bits):
+        return None
+    return header
+
+
+def extract_bytes(stego_image_path, password=None, with_bits=False):
+    """
+    Recover the hidden bytes, or None if the image has no native header.
+    Raises ValueError for a wrong password or a failed integrity check.
+    with_bits : return (bytes, bits per channel value they were stored at)
+    """
+    pixels = _load_pixels(stego_image_path)
+
+    layout = None
+    header = read_header(pixels)
+    if header is None and password and pixels.size > HEADER_UNITS:
+        # Only the first window's permutation is needed to probe the
+        # scattered header; the payload windows are read once it parses
+        layout = _scatter_layout(pixels.size, password)
+        header = read_header(pixels, layout.header_positions())
+    if header is None:
+        return None
+
+    with metrics.stage("image.extract", header.name_len + header.length):
+        nbytes = header.name_len + header.length
+        if layout is None:
+            stored = _read_units(pixels, header.bits, nbytes, HEADER_UNITS)
+        else:
+            try:
+                stored = _read_scattered(pixels, layout, header.bits, nbytes)
+            except ValueError:
+                return None
+    name = stored[:header.name_len]
+    payload = container.open_payload(header, stored[header.name_len:], password, name)
+    return (payload, header.bits) if with_bits else payload
@@ -0,0 +1,919 @@
+"""
+JPEG-native steganography in the quantized DCT coefficients.
+
+The carrier is never decoded to pixels: the entropy-coded scans are
+Huffman-decoded to coefficients, the payload goes into the coefficients
+and the file is Huffman-coded again, so the result stays a JPEG of about
+the input's size instead of a multi-MB PNG.
+
+Carrier units are the AC coefficients of the first component (luma for
+YCbCr and greyscale files) whose magnitude is at least 2, in block
+raster order and zig-zag order within a block. Each one holds one bit in
+the least significant bit of its magnitude; setting that bit keeps the
+magnitude at 2 or more, so encoder and decoder always agree on which
+coefficients carry data. Zeros and +-1 (most of a JPEG) are left alone,
+and the DC terms are never touched.
+
+The stream layout is the shared container (modules.container), header
+first. Baseline and progressive Huffman-coded 8-bit JPEGs are read; the
+output is a baseline JPEG with one scan per component and optimised
+Huffman tables, luma first. Decoding Huffman-decodes only the luma scan,
+stopping as soon as the payload is complete, and skips the chroma scans
+without decoding them.
+
+Costs and limits of an encode:
+- every scan is Huffman-decoded symbol by symbol in Python, about 0.3 s
+  per megapixel on one core; the re-encode is NumPy (symbols placed by
+  cumulative counts, bits packed into 64-bit words) and adds about a
+  quarter of that. A 12 MP photo takes about 4 s, which is why the web
+  app runs Keep JPEG encodes on the job pool
+- restart intervals are not kept: the output has no DRI segment and no
+  RSTn markers, so a decoder cannot resynchronise after a corrupt byte
+  and the file cannot be decoded in parallel by restart interval
+"""
+
+import re
+import struct
+
+import numpy as np
+
+from .. import bitplane, container, metrics
+
+SOI = b"\xff\xd8"
+EOI = b"\xff\xd9"
+
+SOF_BASELINE, SOF_EXTENDED, SOF_PROGRESSIVE = 0xC0, 0xC1, 0xC2
+DHT, DQT, DRI, SOS = 0xC4, 0xDB, 0xDD, 0xDA
+# Kept verbatim in the output: APPn, COM and the quantization tables
+PRESERVED = set(range(0xE0, 0xF0)) | {0xFE, DQT}
+
+MIN_MAGNITUDE = 2
+PREFIX_BITS = container.PREFIX_SIZE * 8
+HEADER_BITS = container.HEADER_SIZE * 8
+
+# End of the entropy-coded data: any marker except RSTn (and stuffed 0xFF00)
+_SCAN_END = re.compile(rb"\xff[^\x00\xd0-\xd7]")
+_RESTART = re.compile(rb"\xff[\xd0-\xd7]")
+
+
+def is_jpeg(image) -> bool:
+    """
+    True if `image` (path or binary file object) starts with a JPEG SOI marker.
+    """
+    if hasattr(image, "read"):
+        pos = image.tell()
+        head = image.read(2)
+        image.seek(pos)
+    else:
+        with open(image, "rb") as f:
+            head = f.read(2)
+    return head == SOI
+
+
+def _read_all(image):
+    if hasattr(image, "read"):
+        image.seek(0)
+        return image.read()
+    with open(image, "rb") as f:
+        return f.read()
+
+
+# --------------------------------------------------
+# Entropy-coded data
+# --------------------------------------------------
+# Lookup table entries: bits 0-4 bits consumed (0: not a valid code),
+# 5-8 run, 9-12 size, 13 _FAST, 14 _EOB; bits 16-31 the value (16-bit two's complement)
+_FAST = 1 << 13
+_EOB = 1 << 14  # AC end of block without an EOB run
+# 1 bits after a restart interval, as a decoder sees at the end of a segment
+_PAD = b"\xff" * 16
+
+
+def _lookup(tc, counts, symbols):
+    """
+    16-bit peek table for a DHT table (tc: 0 DC, 1 AC). When a code and
+    the value bits after it fit in the 16 peeked bits (nearly always), the
+    entry is _FAST and holds the decoded coefficient / DC difference, so
+    one lookup decodes the whole symbol.
+    """
+    lengths = np.zeros(65536, dtype=np.int64)
+    decoded = np.zeros(65536, dtype=np.int64)
+    code = k = 0
+    for length, count in enumerate(counts, 1):
+        for _ in range(count):
+            start, stop = code << (16 - length), (code + 1) << (16 - length)
+            if stop > 65536:
+                raise ValueError("Corrupt JPEG (invalid Huffman table)")
+            lengths[start:stop] = length
+            decoded[start:stop] = symbols[k]
+            code += 1
+            k += 1
+        code <<= 1
+
+    run, size = decoded >> 4, decoded & 15
+    # AC symbols without value bits are EOB / ZRL and take the slow path
+    fast = (lengths > 0) & (lengths + size <= 16) & ((size > 0) | (tc == 0))
+    extra = (np.arange(65536) >> np.where(fast, 16 - lengths - size, 0)) & ((1 << size) - 1)
+    value = np.where(fast, np.where(extra >= (1 << size) >> 1, extra, extra - (1 << size) + 1), 0)
+    consumed = np.where(fast, lengths + size, lengths)
+    eob = (lengths > 0) & (decoded == 0) & (tc == 1)
+    return (((value & 0xFFFF) << 16) | (fast.astype(np.int64) * _FAST) | (eob.astype(np.int64) * _EOB)
+            | (size << 9) | (run << 5) | consumed).tolist()
+
+
+class Component:
+    """
+    One colour component: sampling factors, quantization table and the
+    coefficients of its padded block grid (flat int32 array, 64 zig-zag
+    coefficients per block, row-major blocks).
+
+    rows, cols   : blocks covering the image
+    prows, pcols : blocks covering whole MCUs (what interleaved scans code)
+    """
+
+    def __init__(self, ident, h, v, tq):
+        self.id, self.h, self.v, self.tq = ident, h, v, tq
+        self.rows = self.cols = self.prows = self.pcols = 0
+        self.coefs = None
+
+    def blocks(self):
+        """
+        Coefficients of the blocks covering the image, (rows, cols, 64).
+        """
+        return self.coefs.reshape(self.prows, self.pcols, 64)[:self.rows, :self.cols]
+
+
+class JpegFile:
+    """
+    Coefficient-level view of a Huffman-coded JPEG.
+
+    JpegFile(data) decodes every scan. To read less:
+
+    planes : component indexes to decode; scans for other components
+             are skipped without Huffman-decoding them
+    ac     : only AC coefficients are needed, DC-only scans are skipped
+    stop   : stop(jpeg, rows) is called with the number of finished block
+             rows of component 0 while a sequential scan decodes it;
+             returning True ends decoding there (the file is then incomplete)
+    """
+
+    def __init__(self, data, planes=None, ac=False, stop=None):
+        if data[:2] != SOI:
+            raise ValueError("Not a JPEG file")
+        self.segments = []  # (marker, body) kept for the output
+        self.components = []
+        self.precision = self.height = self.width = 0
+        self.progressive = False
+        self.complete = True
+        self._tables = {}
+        self._restart = 0
+        with metrics.stage("jpeg.decode", len(data)):
+            self._parse(data, planes, ac, stop)
+        if not self.components:
+            raise ValueError("Corrupt JPEG (no frame header)")
+
+    # --------------------------------------------------
+    # Markers
+    # --------------------------------------------------
+    def _parse(self, data, planes, ac, stop):
+        pos = 2
+        while pos < len(data):
+            if data[pos] != 0xFF:
+                raise ValueError("Corrupt JPEG (marker expected)")
+            marker = data[pos + 1]
+            if marker == 0xFF:  # fill byte
+                pos += 1
+                continue
+            pos += 2
+            if marker == 0xD9:
+                return
+            if 0xD0 <= marker <= 0xD7 or marker == 0x01:
+                continue
+            if pos + 2 > len(data):
+                break
+            length = struct.unpack(">H", data[pos:pos + 2])[0]
+            body = data[pos + 2:pos + length]
+            pos += length
+
+            if marker in PRESERVED:
+                self.segments.append((marker, body))
+            elif marker in (SOF_BASELINE, SOF_EXTENDED, SOF_PROGRESSIVE):
+                self._frame(body, marker == SOF_PROGRESSIVE)
+            elif 0xC0 <= marker <= 0xCF and marker not in (DHT, 0xC8, 0xCC):
+                raise ValueError("Only Huffman-coded baseline / progressive JPEGs are supported")
+            elif marker == DHT:
+                self._huffman_tables(body)
+            elif marker == DRI:
+                self._restart = struct.unpack(">H", body[:2])[0]
+            elif marker == SOS:
+                match = _SCAN_END.search(data, pos)
+                end = match.start() if match else len(data)
+                if not self._scan(body, data[pos:end].rstrip(b"\xff"), planes, ac, stop):
+                    self.complete = False
+                    return
+                pos = end
+            # other segments (DNL, DAC, EXP, ...) are dropped
+
+    def _frame(self, body, progressive):
+        if self.components:
+            raise ValueError("Multi-frame JPEGs are not supported")
+        self.precision, self.height, self.width, count = struct.unpack(">BHHB", body[:6])
+        if self.precision != 8:
+            raise ValueError("Only 8-bit JPEGs are supported")
+        if not self.height or not self.width:
+            raise ValueError("Corrupt JPEG (missing image size)")
+        self.progressive = progressive
+        for i in range(count):
+            ident, sampling, tq = body[6 + 3 * i:9 + 3 * i]
+            self.components.append(Component(ident, sampling >> 4, sampling & 15, tq))
+
+        hmax = max(c.h for c in self.components)
+        vmax = max(c.v for c in self.components)
+        self.mcux = _ceil_div(self.width, 8 * hmax)
+        self.mcuy = _ceil_div(self.height, 8 * vmax)
+        for c in self.components:
+            c.cols = _ceil_div(_ceil_div(self.width * c.h, hmax), 8)
+            c.rows = _ceil_div(_ceil_div(self.height * c.v, vmax), 8)
+            c.pcols, c.prows = self.mcux * c.h, self.mcuy * c.v
+            c.coefs = np.zeros(c.prows * c.pcols * 64, dtype=np.int32)
+
+    def _huffman_tables(self, body):
+        pos = 0
+        while pos < len(body):
+            tc_th = body[pos]
+            counts = body[pos + 1:pos + 17]
+            total = sum(counts)
+            symbols = body[pos + 17:pos + 17 + total]
+            self._tables[tc_th >> 4, tc_th & 15] = _lookup(tc_th >> 4, counts, symbols)
+            pos += 17 + total
+
+    # --------------------------------------------------
+    # Scans
+    # --------------------------------------------------
+    def _scan(self, header, data, planes, ac, stop):
+        """
+        Decode one scan; False if `stop` ended decoding early.
+        """
+        count = header[0]
+        by_id = {c.id: i for i, c in enumerate(self.components)}
+        scan = []
+        for i in range(count):
+            ident, tables = header[1 + 2 * i:3 + 2 * i]
+            if ident not in by_id:
+                raise ValueError("Corrupt JPEG (unknown component in scan)")
+            scan.append((by_id[ident], tables >> 4, tables & 15))
+        ss, se, approx = header[1 + 2 * count:4 + 2 * count]
+        ah, al = approx >> 4, approx & 15
+
+        if planes is not None and not any(index in planes for index, _, _ in scan):
+            return True
+        if ac and se == 0:
+            return True
+
+        try:
+            dc = [self._tables[0, td] if ss == 0 and ah == 0 else None for _, td, _ in scan]
+            acs = [self._tables[1, ta] if se > 0 else None for _, _, ta in scan]
+        except KeyError:
+            raise ValueError("Corrupt JPEG (missing Huffman table)") from None
+
+        # rows of a sequential scan are final as soon as they are decoded
+        watch = stop is not None and not self.progressive and scan[0][0] == 0
+        for rows in self._decode_scan(scan, dc, acs, data, ss, se, ah, al):
+            if watch and stop(self, rows):
+                return False
+        return True
+
+    def _decode_scan(self, scan, dc_tables, ac_tables, data, ss, se, ah, al):
+        """
+        Huffman-decode a scan into the component coefficient arrays.
+        Yields the number of finished block rows of the scan's first
+        component after every MCU row.
+
+        The bit reader is inlined (a Python int holding the next 32-80
+        bits, refilled 6 bytes at a time) and most symbols are decoded
+        by a single _lookup() entry: this loop is the only per-symbol
+        Python code. Decoded values are collected as index << 16 | value
+        (16-bit) and stored into the NumPy arrays once per MCU row.
+        """
+        comps = [self.components[index] for index, _, _ in scan]
+        if len(comps) == 1:
+            c = comps[0]
+            mcux, mcuy = c.cols, c.rows
+            offsets = [[0]]
+            row_step = [c.pcols * 64]
+            block_step = [64]
+            rows_per_mcu = 1
+        else:
+            mcux, mcuy = self.mcux, self.mcuy
+            offsets = [[(v * c.pcols + h) * 64 for v in range(c.v) for h in range(c.h)] for c in comps]
+            row_step = [c.pcols * 64 * c.v for c in comps]
+            block_step = [64 * c.h for c in comps]
+            rows_per_mcu = comps[0].v
+
+        # index << 16 | value decoded since the last flush, DC refinements;
+        # first passes store values before the point transform (<< al)
+        pending = [[] for _ in comps]
+        shift = 0 if ah else al
+        refined = [[] for _ in comps]
+        if ah and se:
+            # AC refinement reads a correction bit for every coefficient that
+            # earlier passes made non-zero: list them per block, so runs of
+            # zero coefficients are skipped in one step
+            band = comps[0].coefs.reshape(-1, 64)[:, ss:se + 1]
+            nz_block, nz_k = np.nonzero(band)
+            nz_start = np.concatenate(([0], np.cumsum(np.bincount(nz_block, minlength=len(band))))).tolist()
+            nz_value = band[nz_block, nz_k].tolist()
+            nz_k = (nz_k + ss).tolist()
+
+        segments = [s.replace(b"\xff\x00", b"\xff") for s in _RESTART.split(data)]
+        interval = self._restart or mcux * mcuy
+        p1, m1 = 1 << al, -1 << al
+        k_first = max(ss, 1)
+        fast, eob = _FAST, _EOB
+        buf, limit, i, acc, nbits = b"", 0, 0, 0, 0
+        preds = [0] * len(comps)
+        eobrun = 0
+        mcu = 0
+
+        for my in range(mcuy):
+            for mx in range(mcux):
+                if mcu % interval == 0:
+                    segment = mcu // interval
+                    buf = segments[segment] if segment < len(segments) else b""
+                    limit = len(buf) + 8
+                    buf += _PAD
+                    i = acc = nbits = 0
+                    preds = [0] * len(comps)
+                    eobrun = 0
+                mcu += 1
+
+                for n in range(len(comps)):
+                    dct, act = dc_tables[n], ac_tables[n]
+                    add = pending[n].append
+                    base = my * row_step[n] + mx * block_step[n]
+                    for offset in offsets[n]:
+                        at = base + offset
+
+                        # ---- DC ----
+                        if ss == 0:
+                            if nbits < 32:
+                                if i > limit:
+                                    raise ValueError("Corrupt JPEG data")
+                                acc = ((acc & ((1 << nbits) - 1)) << 48) | int.from_bytes(buf[i:i + 6], "big")
+                                i += 6
+                                nbits += 48
+                            if ah == 0:
+                                e = dct[(acc >> (nbits - 16)) & 0xFFFF]
+                                nbits -= e & 31
+                                if e & fast:
+                                    diff = ((e >> 16) ^ 0x8000) - 0x8000
+                                else:
+                                    if not e & 31:
+                                        raise ValueError("Corrupt JPEG data")
+                                    s = (e >> 9) & 15
+                                    extra = (acc >> (nbits - s)) & ((1 << s) - 1)
+                                    nbits -= s
+                                    diff = extra if s == 0 or extra >> (s - 1) else extra - (1 << s) + 1
+                                preds[n] += diff
+                                if preds[n]:
+                                    add(at << 16 | preds[n] & 0xFFFF)
+                            else:
+                                nbits -= 1
+                                if (acc >> nbits) & 1:
+                                    refined[n].append(at)
+                        if se == 0:
+                            continue
+
+                        k = k_first
+                        # ---- AC, first pass (or sequential) ----
+                        if ah == 0:
+                            if eobrun:
+                                eobrun -= 1
+                                continue
+                            # k runs over the block's absolute coefficient indexes here
+                            k, last, top = at + k, at + se, at + 63
+                            while k <= last:
+                                if nbits < 32:
+                                    if i > limit:
+                                        raise ValueError("Corrupt JPEG data")
+                                    acc = ((acc & ((1 << nbits) - 1)) << 48) | int.from_bytes(buf[i:i + 6], "big")
+                                    i += 6
+                                    nbits += 48
+                                e = act[(acc >> (nbits - 16)) & 0xFFFF]
+                                nbits -= e & 31
+                                if e & fast:
+                                    k += (e >> 5) & 15
+                                    if k > top:
+                                        raise ValueError("Corrupt JPEG data")
+                                    add(k << 16 | e >> 16)
+                                    k += 1
+                                    continue
+                                if e & eob:
+                                    break
+                                if not e & 31:
+                                    raise ValueError("Corrupt JPEG data")
+                                r, s = (e >> 5) & 15, (e >> 9) & 15
+                                if s:
+                                    k += r
+                                    if k > top:
+                                        raise ValueError("Corrupt JPEG data")
+                                    extra = (acc >> (nbits - s)) & ((1 << s) - 1)
+                                    nbits -= s
+                                    add(k << 16 | (extra if extra >> (s - 1) else extra - (1 << s) + 1) & 0xFFFF)
+                                    k += 1
+                                elif r == 15:
+                                    k += 16
+                                else:
+                                    eobrun = (1 << r) - 1 + ((acc >> (nbits - r)) & ((1 << r) - 1))
+                                    nbits -= r
+                                    break
+                            continue
+
+                        # ---- AC refinement (progressive) ----
+                        j, j_end = nz_start[at >> 6], nz_start[(at >> 6) + 1]
+                        if eobrun == 0:
+                            while k <= se:
+                                if nbits < 32:
+                                    if i > limit:
+                                        raise ValueError("Corrupt JPEG data")
+                                    acc = ((acc & ((1 << nbits) - 1)) << 48) | int.from_bytes(buf[i:i + 6], "big")
+                                    i += 6
+                                    nbits += 48
+                                e = act[(acc >> (nbits - 16)) & 0xFFFF]
+                                nbits -= e & 31
+                                r = (e >> 5) & 15
+                                if e & fast:
+                                    value = p1 if e >> 16 == 1 else m1
+                                elif not e & 31:
+                                    raise ValueError("Corrupt JPEG data")
+                                elif (e >> 9) & 15:
+                                    nbits -= 1
+                                    value = p1 if (acc >> nbits) & 1 else m1
+                                elif r != 15:
+                                    eobrun = (1 << r) + ((acc >> (nbits - r)) & ((1 << r) - 1))
+                                    nbits -= r
+                                    break
+                                else:
+                                    value = 0
+                                # skip r coefficients that are still zero, correcting
+                                # the non-zero ones passed on the way
+                                while True:
+                                    q = nz_k[j] if j < j_end else se + 1
+                                    if r < q - k:
+                                        k += r
+                                        break
+                                    r -= q - k
+                                    k = q
+                                    if k > se:
+                                        break
+                                    if nbits < 32:
+                                        if i > limit:
+                                            raise ValueError("Corrupt JPEG data")
+                                        acc = ((acc & ((1 << nbits) - 1)) << 48) | \
+                                            int.from_bytes(buf[i:i + 6], "big")
+                                        i += 6
+                                        nbits += 48
+                                    nbits -= 1
+                                    c = nz_value[j]
+                                    if (acc >> nbits) & 1 and not c & p1:
+                                        add((at + k) << 16 | (c + p1 if c >= 0 else c + m1) & 0xFFFF)
+                                    j += 1
+                                    k += 1
+                                if value and k <= se:
+                                    add((at + k) << 16 | value & 0xFFFF)
+                                k += 1
+                        if eobrun:
+                            # correction bits only for the rest of the block
+                            while j < j_end:
+                                if nbits < 32:
+                                    if i > limit:
+                                        raise ValueError("Corrupt JPEG data")
+                                    acc = ((acc & ((1 << nbits) - 1)) << 48) | int.from_bytes(buf[i:i + 6], "big")
+                                    i += 6
+                                    nbits += 48
+                                nbits -= 1
+                                c = nz_value[j]
+                                if (acc >> nbits) & 1 and not c & p1:
+                                    add((at + nz_k[j]) << 16 | (c + p1 if c >= 0 else c + m1) & 0xFFFF)
+                                j += 1
+                            eobrun -= 1
+
+            for n, c in enumerate(comps):
+                if pending[n]:
+                    packed = np.array(pending[n], dtype=np.int64)
+                    c.coefs[packed >> 16] = (packed & 0xFFFF).astype(np.uint16).view(np.int16).astype(np.int32) << shift
+                    pending[n].clear()
+                if refined[n]:
+                    c.coefs[refined[n]] |= p1
+                    refined[n].clear()
+            yield min((my + 1) * rows_per_mcu, comps[0].prows)
+
+    # --------------------------------------------------
+    # Output
+    # --------------------------------------------------
+    def to_bytes(self):
+        """
+        Baseline JPEG: the kept segments, then one scan per component
+        with optimised Huffman tables (luma first).
+        """
+        if not self.complete:
+            raise ValueError("JPEG was only partially decoded")
+        with metrics.stage("jpeg.encode") as timer:
+            out = bytearray(SOI)
+            for marker, body in self.segments:
+                out += _segment(marker, body)
+            frame = struct.pack(">BHHB", 8, self.height, self.width, len(self.components))
+            for c in self.components:
+                frame += bytes((c.id, c.h << 4 | c.v, c.tq))
+            out += _segment(SOF_BASELINE, frame)
+
+            for c in self.components:
+                tables, data = _encode_blocks(c.blocks().reshape(-1, 64))
+                out += _segment(DHT, tables)
+                out += _segment(SOS, bytes((1, c.id, 0x00, 0, 63, 0)))
+                out += data
+            out += EOI
+            timer.nbytes = len(out)
+        return bytes(out)
+
+
+def _ceil_div(a, b):
+    return -(-a // b)
+
+
+def _segment(marker, body):
+    return struct.pack(">BBH", 0xFF, marker, len(body) + 2) + body
+
+
+# --------------------------------------------------
+# Baseline Huffman encoding (vectorized)
+# --------------------------------------------------
+def _magnitude_bits(values):
+    """
+    JPEG size category and appended bits for each coefficient / DC diff.
+    """
+    magnitude = np.abs(values)
+    size = np.frexp(magnitude.astype(np.float64))[1].astype(np.int64)
+    extra = np.where(values < 0, values + (1 << size) - 1, values)
+    return size, extra.astype(np.int64)
+
+
+def _optimal_table(freq):
+    """
+    Code lengths limited to 16 bits from symbol counts (ITU T.81 Annex K.2,
+    as libjpeg does it), with one code point reserved so no code is all ones.
+
+    returns : (counts per length 1..16, symbols in code order)
+    """
+    freq = [int(f) for f in freq] + [1]
+    codesize = [0] * 257
+    others = [-1] * 257
+    live = [i for i, f in enumerate(freq) if f]
+
+    while True:
+        # the two least frequent live symbols (largest index on ties)
+        c1 = c2 = -1
+        for i in live:
+            if c1 < 0 or freq[i] <= freq[c1]:
+                c1, c2 = i, c1
+            elif c2 < 0 or freq[i] <= freq[c2]:
+                c2 = i
+        if c2 < 0:
+            break
+        freq[c1] += freq[c2]
+        freq[c2] = 0
+        live.remove(c2)
+        for c in (c1, c2):
+            codesize[c] += 1
+            while others[c] >= 0:
+                c = others[c]
+                codesize[c] += 1
+        c = c1
+        while others[c] >= 0:
+            c = others[c]
+        others[c] = c2
+
+    bits = [0] * 33
+    for size in codesize:
+        if size:
+            bits[size] += 1
+    for i in range(32, 16, -1):
+        while bits[i] > 0:
+            j = i - 2
+            while bits[j] == 0:
+                j -= 1
+            bits[i] -= 2
+            bits[i - 1] += 1
+            bits[j + 1] += 2
+            bits[j] -= 1
+    i = 16
+    while bits[i] == 0:
+        i -= 1
+    bits[i] -= 1  # drop the reserved code point
+
+    symbols = [s for size in range(1, 33) for s in range(256) if codesize[s] == size]
+    return bits[1:17], symbols
+
+
+def _canonical_codes(counts, symbols):
+    codes = np.zeros(256, dtype=np.int64)
+    lengths = np.zeros(256, dtype=np.int64)
+    code = k = 0
+    for length, count in enumerate(counts, 1):
+        for _ in range(count):
+            codes[symbols[k]] = code
+            lengths[symbols[k]] = length
+            code += 1
+            k += 1
+        code <<= 1
+    return codes, lengths
+
+
+def _pack_bits(values, lengths):
+    """
+    Concatenate `values` as `lengths`-bit big-endian fields (at most 57
+    bits each), pad the last byte with 1 bits and byte-stuff the result.
+
+    Fields are OR-ed into 64-bit words (one reduceat over the fields of
+    each word); a field crossing a word boundary puts its low bits into
+    the next word, and at most one field crosses each boundary.
+    """
+    keep = lengths > 0
+    values, lengths = values[keep], lengths[keep]
+    total = int(lengths.sum())
+    pad = -total % 8
+    if pad:
+        values = np.append(values, (1 << pad) - 1)
+        lengths = np.append(lengths, pad)
+        total += pad
+    if not total:
+        return b""
+    starts = np.cumsum(lengths) - lengths
+    word = starts >> 6
+    spill = (starts & 63) + lengths - 64  # > 0: bits that go to the next word
+    values = values.astype(np.uint64)
+    lengths = lengths.astype(np.uint64)
+    head = np.where(spill > 0, values >> np.maximum(spill, 0).astype(np.uint64),
+                    values << np.maximum(-spill, 0).astype(np.uint64))
+
+    words = np.zeros(-(-total // 64), dtype=np.uint64)
+    first = np.flatnonzero(np.r_[True, word[1:] != word[:-1]])
+    words[word[first]] = np.bitwise_or.reduceat(head, first)
+    crossing = np.flatnonzero(spill > 0)
+    if len(crossing):
+        low = spill[crossing].astype(np.uint64)
+        words[word[crossing] + 1] |= (values[crossing] & ((np.uint64(1) << low) - np.uint64(1))) << (np.uint64(64) - low)
+    return words.astype(">u8").tobytes()[:total // 8].replace(b"\xff", b"\xff\x00")
+
+
+def _encode_blocks(blocks):
+    """
+    Huffman-code the blocks of one non-interleaved baseline scan.
+
+    blocks : (n, 64) zig-zag coefficients in scan order
+
+    returns : (DHT segment body, entropy-coded bytes)
+
+    Every symbol is written straight to its place in the scan: a block is
+    its DC symbol, then per non-zero AC coefficient its 16-zero runs (ZRL)
+    and its (run, size) symbol, then an end-of-block unless it ends on a
+    non-zero coefficient. Block offsets are cumulative symbol counts.
+    """
+    n = len(blocks)
+
+    # DC: difference to the previous block
+    dc = blocks[:, 0].astype(np.int64)
+    dc_size, dc_extra = _magnitude_bits(np.diff(dc, prepend=0))
+
+    ac = blocks[:, 1:]
+    row, col = np.nonzero(ac)
+    k = col.astype(np.int64) + 1
+    first = np.r_[True, row[1:] != row[:-1]] if len(row) else np.zeros(0, bool)
+    prev = np.where(first, 0, np.r_[0, k[:-1]])
+    run = k - prev - 1
+    zrl = run >> 4
+    size, extra = _magnitude_bits(ac[row, col].astype(np.int64))
+
+    last = np.zeros(n, dtype=np.int64)
+    if len(row):
+        ends = np.r_[row[1:] != row[:-1], True]
+        last[row[ends]] = k[ends]
+    eob = last < 63
+
+    # symbols per block and where each block starts
+    ac_count = zrl + 1
+    per_block = np.bincount(row, weights=ac_count, minlength=n).astype(np.int64)
+    block_start = np.cumsum(1 + per_block + eob) - (1 + per_block + eob)
+    # an AC symbol follows the DC and every earlier symbol of its block
+    before = np.cumsum(ac_count) - np.repeat(np.cumsum(per_block) - per_block, np.bincount(row, minlength=n))
+    ac_pos = block_start[row] + before
+    total = int(block_start[-1] + 1 + per_block[-1] + eob[-1]) if n else 0
+
+    table = np.ones(total, np.int64)  # 0 DC / 1 AC
+    symbols = np.zeros(total, np.int64)  # EOB is AC symbol 0x00
+    extra_len = np.zeros(total, np.int64)
+    extra_bits = np.zeros(total, np.int64)
+
+    table[block_start] = 0
+    symbols[block_start] = dc_size
+    extra_len[block_start] = dc_size
+    extra_bits[block_start] = dc_extra
+
+    zrl_of = np.repeat(np.arange(len(k)), zrl)
+    symbols[ac_pos[zrl_of] - np.repeat(zrl, zrl) + (np.arange(len(zrl_of)) - np.repeat(np.cumsum(zrl) - zrl, zrl))] = 0xF0
+    symbols[ac_pos] = ((run & 15) << 4) | size
+    extra_len[ac_pos] = size
+    extra_bits[ac_pos] = extra
+
+    dht = bytearray()
+    codes = np.zeros((2, 256), np.int64)
+    lengths = np.zeros((2, 256), np.int64)
+    for tc in (0, 1):
+        counts, ordered = _optimal_table(np.bincount(symbols[table == tc], minlength=256))
+        codes[tc], lengths[tc] = _canonical_codes(counts, ordered)
+        dht += bytes([tc << 4]) + bytes(counts) + bytes(ordered)
+
+    # each symbol's code and its extra bits form one field of at most 27 bits
+    return bytes(dht), _pack_bits((codes[table, symbols] << extra_len) | extra_bits,
+                                  lengths[table, symbols] + extra_len)
+
+
+# --------------------------------------------------
+# Carrier units
+# --------------------------------------------------
+def _carrier(blocks):
+    """
+    Flat AC coefficients of component 0 and the indexes of the usable ones.
+    """
+    ac = blocks[:, :, 1:].reshape(-1)
+    return ac, np.flatnonzero(np.abs(ac) >= MIN_MAGNITUDE)
+
+
+def carrier_units(image):
+    """
+    Usable coefficients of a JPEG carrier (path or binary file object).
+    Needs the luma coefficients, so the luma scans are decoded.
+
+    returns : (units, JpegFile with only the luma plane decoded)
+    """
+    jpeg = JpegFile(_read_all(image), planes=(0,), ac=True)
+    _, usable = _carrier(jpeg.components[0].blocks())
+    return len(usable), jpeg
+
+
+def capacity_bytes(image):
+    """
+    Maximum stored payload (bytes) of a JPEG carrier.
+    """
+    units, _ = carrier_units(image)
+    return max(units // 8 - container.HEADER_SIZE, 0)
+
+
+# --------------------------------------------------
+# Embed
+# --------------------------------------------------
+def embed_bytes(input_image, payload: bytes, output_image, password=None, compress=True):
+    """
+    Hide `payload` in the DCT coefficients of a JPEG.
+
+    input_image  : JPEG path or binary file object
+    output_image : path or writable binary file object; receives a JPEG
+    password     : encrypt with AES-GCM when set
+    compress     : let the container pick a compression codec
+    """
+    jpeg = JpegFile(_read_all(input_image))
+    luma = jpeg.components[0]
+    blocks = luma.blocks()
+    ac, usable = _carrier(blocks)
+
+    stream = container.build(payload, container.MEDIA_IMAGE, 1, password=password, compress=compress)
+    if len(stream) * 8 > len(usable):
+        raise ValueError(
+            f"Payload too large for this JPEG: {len(stream)} bytes needed, "
+            f"{len(usable) // 8} available"
+        )
+
+    with metrics.stage("jpeg.embed", len(stream)):
+        target = usable[:len(stream) * 8]
+        bits = bitplane.bytes_to_bits(stream).astype(ac.dtype)
+        values = ac[target]
+        ac[target] = np.sign(values) * ((np.abs(values) & ~1) | bits)
+
+        # write the luma blocks back into the component's padded grid
+        luma.blocks()[:, :, 1:] = ac.reshape(luma.rows, luma.cols, 63)
+
+    data = jpeg.to_bytes()
+    if hasattr(output_image, "write"):
+        output_image.write(data)
+    else:
+        with open(output_image, "wb") as f:
+            f.write(data)
+    return output_image
+
+
+# --------------------------------------------------
+# Extract
+# --------------------------------------------------
+class _RowCollector:
+    """
+    JpegFile stop callback: gathers the usable coefficients of luma block
+    rows as soon as they are decoded, and ends decoding once done() says so.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.parts = []
+        self.count = 0
+
+    def __call__(self, jpeg, rows):
+        luma = jpeg.components[0]
+        rows = min(rows, luma.rows)
+        if rows > self.rows:
+            start, stop = self.rows * luma.pcols * 64, rows * luma.pcols * 64
+            grid = luma.coefs[start:stop].reshape(rows - self.rows, luma.pcols, 64)
+            ac = grid[:, :luma.cols, 1:].reshape(-1)
+            ac = ac[np.abs(ac) >= MIN_MAGNITUDE]
+            self.parts.append(ac)
+            self.count += len(ac)
+            self.rows = rows
+        return self.done()
+
+    def done(self):
+        return False
+
+    def values(self):
+        values = np.concatenate(self.parts) if self.parts else np.zeros(0, np.int32)
+        self.parts = [values]
+        return values
+
+
+class _Extractor(_RowCollector):
+    """
+    Stops once the container header and the payload it announces are in.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.needed = PREFIX_BITS
+        self.header = None
+        self.complete = False
+
+    def done(self):
+        while self.count >= self.needed and not self.complete:
+            stream = self.stream()
+            if self.needed == PREFIX_BITS:
+                if not container.has_prefix(stream):
+                    raise ValueError("No hidden data found")
+                self.needed = HEADER_BITS
+            elif self.header is None:
+                self.header = container.parse_header(stream, container.MEDIA_IMAGE)
+                self.needed = HEADER_BITS + (self.header.name_len + self.header.length) * 8
+            else:
+                self.complete = True
+        return self.complete
+
+    def stream(self):
+        bits = (np.abs(self.values()[:self.needed]) & 1).astype(np.uint8)
+        return bitplane.bits_to_bytes(bits)
+
+
+class _Sampler(_RowCollector):
+    def __init__(self, count):
+        super().__init__()
+        self.wanted = count
+
+    def done(self):
+        return self.count >= self.wanted
+
+
+def leading_units(image, count):
+    """
+    The first `count` usable coefficients of a JPEG in carrier order,
+    decoding only the luma rows that hold them (all of the luma plane for
+    progressive files). Used for cheap screening (modules.steganalysis).
+    """
+    sampler = _Sampler(count)
+    jpeg = JpegFile(_read_all(image), planes=(0,), ac=True, stop=sampler)
+    if not sampler.done():
+        sampler(jpeg, jpeg.components[0].rows)
+    return sampler.values()[:count]
+
+
+def extract_bytes(stego_image, password=None):
+    """
+    Hidden bytes from a JPEG written by embed_bytes (path or binary file
+    object). Raises ValueError when it holds no container.
+    """
+    extractor = _Extractor()
+    jpeg = JpegFile(_read_all(stego_image), planes=(0,), ac=True, stop=extractor)
+    if not extractor.complete:
+        # progressive files: the luma plane is only final after the last scan
+        extractor(jpeg, jpeg.components[0].rows)
+    if not extractor.complete:
+        raise ValueError("No hidden data found (payload incomplete)")
+
+    stream = extractor.stream()
+    header = extractor.header
+    name_end = container.HEADER_SIZE + header.name_len
+    with metrics.stage("image.extract", header.length):
+        return container.open_payload(header, stream[name_end:], password, stream[container.HEADER_SIZE:name_end])
@@ -0,0 +1,237 @@
+"""
+Lightweight instrumentation: stage timers, counters and histograms,
+rendered in the Prometheus text format (served on /metrics).
+
+Off unless the STEGO_METRICS environment variable is set (or enable()
+is called, which sets it for worker processes started afterwards). When
+off, stage() hands back one shared no-op context manager and observe() /
+inc() return after a single flag check, so the codecs keep their
+instrumentation in place at no measurable cost.
+
+Codec stages are timed with
+
+    with metrics.stage("video.embed", frame.nbytes):
+        ...
+
+which records the call's duration and, given a byte count, its
+throughput. Work done in job worker processes is collected there with
+snapshot() and merged into the server's registry with merge().
+"""
+
+import bisect
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ENV_FLAG = "STEGO_METRICS"
+
+_enabled = os.environ.get(ENV_FLAG, "") not in ("", "0")
+_lock = threading.Lock()
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+RATE_BUCKETS = (1e5, 1e6, 5e6, 1e7, 5e7, 1e8, 5e8, 1e9, 5e9)
+FPS_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+MEMORY_BUCKETS = (32e6, 64e6, 128e6, 256e6, 512e6, 1e9, 2e9, 4e9, 8e9)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9)
+
+# name -> (type, help, buckets)
+METRICS = {
+    "stego_stage_seconds": ("histogram", "Duration of one codec stage call", SECONDS_BUCKETS),
+    "stego_stage_bytes_per_second": ("histogram", "Throughput of one codec stage call", RATE_BUCKETS),
+    "stego_stage_bytes_total": ("counter", "Bytes processed per codec stage", None),
+    "stego_frames_per_second": ("histogram", "Video frames read or written per second, per call", FPS_BUCKETS),
+    "stego_http_request_seconds": ("histogram", "Flask request handling time", SECONDS_BUCKETS),
+    "stego_http_upload_seconds": ("histogram", "Time to receive a request body (asgi.py)", SECONDS_BUCKETS),
+    "stego_http_upload_bytes": ("histogram", "Request body size (asgi.py)", SIZE_BUCKETS),
+    "stego_job_queue_wait_seconds": ("histogram", "Time a job waited for a pool worker", SECONDS_BUCKETS),
+    "stego_job_seconds": ("histogram", "Job run time", SECONDS_BUCKETS),
+    "stego_job_peak_memory_bytes": ("histogram", "Peak RSS of the worker after a job", MEMORY_BUCKETS),
+}
+
+# (name, sorted label items) -> float (counter) or [bucket counts..., sum, count]
+_values = {}
+
+
+def enabled():
+    return _enabled
+
+
+def enable(flag=True):
+    """
+    Turn collection on or off for this process and the worker processes
+    it starts from now on.
+    """
+    global _enabled
+    _enabled = bool(flag)
+    if flag:
+        os.environ[ENV_FLAG] = "1"
+    else:
+        os.environ.pop(ENV_FLAG, None)
+
+
+# --------------------------------------------------
+# Recording
+# --------------------------------------------------
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(name, value, **labels):
+    if not _enabled:
+        return
+    buckets = METRICS[name][2]
+    key = _key(name, labels)
+    with _lock:
+        series = _values.get(key)
+        if series is None:
+            series = _values[key] = [0] * (len(buckets) + 3)
+        series[bisect.bisect_left(buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+
+def inc(name, value=1, **labels):
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _values[key] = _values.get(key, 0) + value
+
+
+class _Stage:
+    __slots__ = ("name", "nbytes", "started")
+
+    def __init__(self, name, nbytes):
+        self.name = name
+        self.nbytes = nbytes
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        observe("stego_stage_seconds", elapsed, stage=self.name)
+        if self.nbytes:
+            inc("stego_stage_bytes_total", self.nbytes, stage=self.name)
+            if elapsed > 0:
+                observe("stego_stage_bytes_per_second", self.nbytes / elapsed, stage=self.name)
+
+
+class _NullStage:
+    __slots__ = ()
+    nbytes = property(lambda self: 0, lambda self, value: None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return None
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name, nbytes=0):
+    """
+    Context manager timing one call of a codec stage; `nbytes` is the
+    amount of data it handled (0: duration only). It can also be set on
+    the returned object inside the block, once it is known.
+    """
+    return _Stage(name, nbytes) if _enabled else _NULL_STAGE
+
+
+def peak_memory():
+    """
+    Peak resident set size of this process in bytes (0 if unknown).
+    """
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+# --------------------------------------------------
+# Cross-process merge
+# --------------------------------------------------
+def reset():
+    with _lock:
+        _values.clear()
+
+
+def snapshot():
+    """
+    Picklable copy of everything recorded in this process.
+    """
+    with _lock:
+        return {key: list(value) if isinstance(value, list) else value for key, value in _values.items()}
+
+
+def merge(values):
+    """
+    Add a snapshot() taken in another process to this registry.
+    """
+    if not _enabled or not values:
+        return
+    with _lock:
+        for key, value in values.items():
+            current = _values.get(key)
+            if isinstance(value, list):
+                if current is None:
+                    _values[key] = list(value)
+                else:
+                    _values[key] = [a + b for a, b in zip(current, value)]
+            else:
+                _values[key] = (current or 0) + value
+
+
+# --------------------------------------------------
+# Exposition
+# --------------------------------------------------
+def _labels(items, extra=()):
+    items = list(items) + list(extra)
+    if not items:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """
+    Everything recorded, in the Prometheus text exposition format.
+    """
+    values = snapshot()
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        series = sorted((labels, value) for (metric, labels), value in values.items() if metric == name)
+        if not series:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in series:
+            if kind == "counter":
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + (float("inf"),), value[:len(buckets) + 1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(float(bound))
+                lines.append(f"{name}_bucket{_labels(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(float(value[-2]))}")
+            lines.append(f"{name}_count{_labels(labels)} {value[-1]}")
+
+    lines.append("# HELP stego_peak_memory_bytes Peak RSS of the web process")
+    lines.append("# TYPE stego_peak_memory_bytes gauge")
+    lines.append(f"stego_peak_memory_bytes {peak_memory()}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,176 @@
+"""
+Password-seeded scattered embedding.
+
+Instead of filling carrier units in order from the first pixel / sample /
+frame, the payload is spread over the carrier at positions drawn from a
+permutation seeded by the password, so the changed LSBs carry no
+positional pattern and the work is spread evenly.
+
+The carrier is seen as equally sized windows (the whole image, runs of
+audio samples, video frames) so block-wise codecs keep streaming:
+
+- window 0 holds the container header at permutation positions [0, H)
+- the payload is split evenly over the first `spread` windows: window 0
+  takes positions [H, H + quota), every other window the first `quota`
+  positions of the same permutation, rotated by a per-window offset
+
+`spread` is every window for images and audio, and a bounded number of
+frames for video (see Layout). Windows are bounded in size (about a
+million channel values or samples, or one video frame), so the
+permutation stays a few MB; it is computed once per (window size,
+derived key) and a handful are cached. All reads and writes are NumPy
+gather / scatter operations (bitplane.embed_units_at / extract_units_at).
+
+The seed goes through the same scrypt KDF as payload encryption, and
+NumPy's legacy RandomState is used because its streams are frozen across
+NumPy releases: a carrier written today must decode after an upgrade.
+"""
+
+import functools
+
+import numpy as np
+
+from . import bitplane, crypto
+
+SALT = b"stego-scatter-v1"
+
+
+def permutation(size, password):
+    """
+    Read-only permutation of range(size) seeded by `password` (cached).
+    """
+    return _permutation(size, crypto.derive_key(password, SALT))
+
+
+@functools.lru_cache(maxsize=4)
+def _permutation(size, key):
+    rng = np.random.RandomState(np.frombuffer(key, dtype=np.uint32))
+    perm = rng.permutation(size).astype(np.uint32 if size < 1 << 32 else np.int64)
+    perm.flags.writeable = False
+    return perm
+
+
+def offsets(size, count, password):
+    """
+    Per-window rotation of the permutation (window 0 is not rotated).
+    """
+    return _offsets(size, count, crypto.derive_key(password, SALT))
+
+
+@functools.lru_cache(maxsize=16)
+def _offsets(size, count, key):
+    rng = np.random.RandomState(np.frombuffer(key[::-1], dtype=np.uint32))
+    shifts = rng.randint(0, size, count).astype(np.int64)
+    shifts[:1] = 0
+    shifts.flags.writeable = False
+    return shifts
+
+
+class Layout:
+    """
+    Positions of the header and payload units in a windowed carrier.
+
+    window_units : carrier units per window
+    windows      : number of whole windows in the carrier
+    header_units : units taken by the container header in window 0
+    span         : spread the payload over at least this many windows
+                   (None: every window)
+    """
+
+    def __init__(self, window_units, windows, header_units, password, span=None):
+        if not password:
+            raise ValueError("Scattered embedding needs a password")
+        if windows < 1 or window_units <= header_units:
+            raise ValueError("Carrier too small for scattered embedding")
+        self.window_units = window_units
+        self.windows = windows
+        self.header_units = header_units
+        self.password = password
+        self.span = span
+        self.spread = 0
+        self.quota = 0
+
+    def capacity_units(self):
+        """
+        Largest payload (units, header excluded) the layout can hold.
+        """
+        return (self.window_units - self.header_units) * self.windows
+
+    def plan(self, payload_units):
+        """
+        Fix how many windows the payload spreads over and how many units
+        each one carries. Raises ValueError if the payload cannot fit.
+        """
+        per_window = self.window_units - self.header_units
+        needed = max(-(-payload_units // per_window), 1)
+        if needed > self.windows:
+            raise ValueError("Payload too large for this carrier")
+        self.spread = min(self.windows, max(needed, self.span or self.windows))
+        self.quota = -(-payload_units // self.spread)
+        return self
+
+    def _perm(self):
+        return permutation(self.window_units, self.password)
+
+    def header_positions(self):
+        return self._perm()[:self.header_units]
+
+    def positions(self, window):
+        """
+        Carrier positions (within the window) of that window's payload units.
+        """
+        perm = self._perm()
+        if window == 0:
+            return perm[self.header_units:self.header_units + self.quota]
+        shift = offsets(self.window_units, self.spread, self.password)[window]
+        return (perm[:self.quota] + shift) % self.window_units
+
+    def slice(self, window, units):
+        """
+        The part of the payload units that `window` carries.
+        """
+        return units[window * self.quota:(window + 1) * self.quota]
+
+
+class ScatterReader(bitplane.BitReader):
+    """
+    Embedded bits of a scattered carrier, in payload order.
+
+    next_window : callable returning the next window (flat integer array),
+                  window 0 first; raises ValueError when the carrier ends
+
+    The header units come first. Once the header is parsed, plan() must be
+    called with the payload size before reading on.
+    """
+
+    def __init__(self, next_window, layout, nbits=1):
+        super().__init__(nbits)
+        self._next_window = next_window
+        self.layout = layout
+        self._first = next_window().reshape(-1)
+        self._window = None
+
+    def plan(self, payload_units):
+        """
+        Switch from the header to the payload. Raises ValueError when the
+        header asks for more than the carrier holds (no hidden data).
+        """
+        try:
+            self.layout.plan(payload_units)
+        except ValueError:
+            raise ValueError("No hidden data found (invalid payload length)")
+        # the header's last unit may be padded: drop its spare bits
+        self.reset()
+        self._window = 0
+
+    def _next_block(self):
+        if self._window is None:
+            self._window = -1
+            return self._first[self.layout.header_positions()]
+        if self._window < 0 or self._window >= self.layout.spread:
+            raise ValueError("No hidden data found (payload incomplete)")
+
+        window = self._first if self._window == 0 else self._next_window().reshape(-1)
+        block = window[self.layout.positions(self._window)]
+        self._window += 1
+        return block
@@ -0,0 +1,394 @@
+"""
+Fast steganalysis for screening carriers without decoding them.
+
+Each scan reads a subsample of the carrier (the leading units, where the
+sequential layouts put their data, plus an evenly spread sample for
+scattered embedding) and runs four detectors on it as NumPy operations:
+
+- header probe   : the container / frame-index magic in the leading
+                   LSBs; certain when it matches
+- chi-square     : Westfeld-Pfitzmann test on pairs of values (2k, 2k+1),
+                   which LSB replacement evens out; returns the p-value
+- profile        : the chi-square test over consecutive windows from the
+                   start, checked against the shifted pairs (2k+1, 2k+2);
+                   counts the windows a sequential payload evened out
+- RS analysis    : Fridrich's regular / singular group counts on groups
+                   of 4 neighbouring units; estimates the embedding rate
+                   (images and video)
+
+The result is a likelihood score in [0, 1]: 1.0 for a header match,
+otherwise a chi-square p-value, but only when the profile or RS agrees
+with it. A smooth histogram (a resized or cropped photo, most audio)
+passes the chi-square test without any payload, so the p-value alone is
+no evidence. Images are read through PIL (JPEG carriers through their
+luma DCT coefficients, decoding only the leading rows), WAV files as a
+few sample windows and videos as their first frames, so a scan costs a
+fraction of a full decode.
+
+    from modules import steganalysis
+    report = steganalysis.scan("suspect.png")   # {"score": 0.97, ...}
+"""
+
+import math
+import os
+
+import numpy as np
+
+from . import bitplane, container
+
+# Leading units examined, and the prefixes of it the chi-square test runs on
+SAMPLE_UNITS = 1 << 16
+CHI_PREFIXES = (1 << 12, 1 << 14, 1 << 16)
+# Evenly spread units (scattered payloads)
+SPREAD_UNITS = 1 << 16
+# Categories with fewer expected values than this are left out (chi-square rule of thumb)
+MIN_EXPECTED = 5
+VIDEO_FRAMES = 3
+AUDIO_WINDOWS = 16
+
+# Westfeld profile: units per window, and leading windows that must look embedded
+PROFILE_WINDOW = 1 << 12
+PROFILE_RUN = 3
+# A window looks embedded when its pairs pass the chi-square test (p-value
+# at least EVEN) while the shifted pairs (2k+1, 2k+2) fail it (below UNEVEN)
+EVEN = 0.5
+UNEVEN = 0.001
+# RS estimates an embedding rate rather than a probability: natural content
+# stays below 0.2 (small images are the noisiest), so a rate this high backs
+# up the chi-square test
+RS_AGREE = 0.3
+THRESHOLD = 0.5  # scores at or above this are reported as suspicious
+
+
+# --------------------------------------------------
+# Detectors
+# --------------------------------------------------
+def _chi2_sf(x, dof):
+    """
+    Survival function of the chi-square distribution (regularized upper
+    incomplete gamma function Q(dof / 2, x / 2)).
+    """
+    a, x = dof / 2.0, x / 2.0
+    if x <= 0:
+        return 1.0
+    log_front = -x + a * math.log(x) - math.lgamma(a)
+    if x < a + 1:
+        # series for the lower function P
+        term = total = 1.0 / a
+        n = a
+        while term > total * 1e-12:
+            n += 1
+            term *= x / n
+            total += term
+        return max(0.0, 1.0 - total * math.exp(log_front))
+    # continued fraction for Q (modified Lentz)
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = 1 / (d if abs(d) > tiny else tiny)
+        c = b + an / c
+        c = c if abs(c) > tiny else tiny
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-12:
+            break
+    return min(1.0, h * math.exp(log_front))
+
+
+def chi_square(values, start=0):
+    """
+    P-value that the pairs of values (2k, 2k+1) are equalized, as LSB
+    replacement leaves them; near 1 for embedded data, near 0 for clean
+    natural content.
+
+    values : non-negative integers
+    start  : first value considered (even), e.g. 2 for JPEG magnitudes
+    """
+    hist = np.bincount(np.asarray(values).reshape(-1))[start:]
+    if len(hist) % 2:
+        hist = np.append(hist, 0)
+    even, odd = hist[0::2].astype(np.float64), hist[1::2].astype(np.float64)
+    expected = (even + odd) / 2
+    keep = expected >= MIN_EXPECTED
+    if keep.sum() < 2:
+        return 0.0
+    stat = float((((even - expected) ** 2)[keep] / expected[keep]).sum())
+    return _chi2_sf(stat, int(keep.sum()) - 1)
+
+
+def westfeld_profile(values, start=0, window=PROFILE_WINDOW):
+    """
+    Westfeld's chi-square profile over consecutive windows of the values.
+
+    LSB replacement evens out the pairs (2k, 2k+1) only; a smooth histogram
+    evens out the shifted pairs (2k+1, 2k+2) just as well, so a window only
+    counts when the shifted pairs stay uneven.
+
+    values  : non-negative integers, in embedding order
+    start   : as for chi_square()
+    returns : (windows, p-value) - the number of leading windows that look
+              embedded, and the chi-square p-value of those windows together
+    """
+    values = np.asarray(values).reshape(-1)
+    run = 0
+    while (run + 1) * window <= len(values):
+        part = values[run * window:(run + 1) * window]
+        if chi_square(part, start) < EVEN or chi_square(part, start + 1) >= UNEVEN:
+            break
+        run += 1
+    return run, (chi_square(values[:run * window], start) if run else 0.0)
+
+
+def _flip(x, mask):
+    return np.where(mask, x ^ 1, x)
+
+
+def _flip_neg(x, mask):
+    # F-1: -1 <-> 0, 1 <-> 2, ... (shifted LSB flip)
+    return np.where(mask, ((x + 1) ^ 1) - 1, x)
+
+
+def _rs_counts(groups, mask):
+    smooth = np.abs(np.diff(groups, axis=1)).sum(axis=1)
+    pos = np.abs(np.diff(_flip(groups, mask), axis=1)).sum(axis=1)
+    neg = np.abs(np.diff(_flip_neg(groups, mask), axis=1)).sum(axis=1)
+    return ((pos > smooth).mean() - (pos < smooth).mean(),
+            (neg > smooth).mean() - (neg < smooth).mean())
+
+
+def rs_rate(groups):
+    """
+    RS estimate of the fraction of units carrying embedded bits.
+
+    groups : (n, 4) integer array of neighbouring units
+    """
+    groups = np.asarray(groups, dtype=np.int64)
+    if len(groups) < 16:
+        return 0.0
+    mask = np.array([0, 1, 1, 0], dtype=bool)
+    d0, n0 = _rs_counts(groups, mask)
+    d1, n1 = _rs_counts(groups ^ 1, mask)
+
+    a = 2 * (d1 + d0)
+    b = n0 - n1 - d1 - 3 * d0
+    c = d0 - n0
+    if abs(a) < 1e-12:
+        if abs(b) < 1e-12:
+            return 0.0
+        z = -c / b
+    else:
+        disc = b * b - 4 * a * c
+        if disc < 0:
+            return 0.0
+        roots = ((-b + math.sqrt(disc)) / (2 * a), (-b - math.sqrt(disc)) / (2 * a))
+        z = min(roots, key=abs)
+    if z == 0.5:
+        return 1.0
+    return float(min(max(z / (z - 0.5), 0.0), 1.0)) + 0.0  # no -0.0
+
+
+def _groups(rows):
+    """
+    Groups of 4 horizontally neighbouring units per channel.
+
+    rows : (rows, width, channels) or (rows, width) array
+    """
+    rows = np.asarray(rows)
+    if rows.ndim == 2:
+        rows = rows[:, :, None]
+    lanes = rows.transpose(0, 2, 1).reshape(-1, rows.shape[1])
+    lanes = lanes[:, :rows.shape[1] // 4 * 4]
+    return lanes.reshape(-1, 4)
+
+
+def _leading_chi(flat, start=0):
+    # sequential payloads may fill only part of the sample: test growing prefixes
+    sizes = [n for n in CHI_PREFIXES if n < len(flat)] + [min(len(flat), CHI_PREFIXES[-1])]
+    return max(chi_square(flat[:n], start) for n in sizes)
+
+
+def _spread(flat):
+    step = max(1, len(flat) // SPREAD_UNITS)
+    return flat[::step]
+
+
+def _prefix_found(units_low_bits, nbits_options):
+    """
+    Which header the leading units hold, if any.
+
+    units_low_bits : callable(nbits, count) -> the low `nbits` bits of the
+                     first `count` units
+    """
+    from .video_steg import frame_index
+
+    for nbits in nbits_options:
+        count = bitplane.units_needed(container.PREFIX_SIZE * 8, nbits)
+        units = units_low_bits(nbits, count)
+        if len(units) < count:
+            continue
+        prefix = bitplane.bits_to_bytes(bitplane.units_to_bits(units, nbits)[:container.PREFIX_SIZE * 8])
+        if container.has_prefix(prefix):
+            return f"container ({nbits} bit)"
+        if frame_index.has_prefix(prefix):
+            return f"frame index ({nbits} bit)"
+    return None
+
+
+def _report(media, header, profile, chi_leading, chi_spread, rs, sampled):
+    # a chi-square p-value only counts with the profile or RS behind it
+    windows, chi_profile = profile
+    evidence = chi_profile if windows >= PROFILE_RUN else 0.0
+    if rs is not None and rs >= RS_AGREE:
+        evidence = max(evidence, chi_leading, chi_spread)
+    score = 1.0 if header else round(evidence, 4)
+    return {
+        "media": media,
+        "score": score,
+        "suspicious": score >= THRESHOLD,
+        "header": header,
+        "chi_square": {"leading": round(chi_leading, 4), "spread": round(chi_spread, 4), "windows": windows},
+        "rs": None if rs is None else round(rs, 4),
+        "sampled_units": sampled,
+    }
+
+
+# --------------------------------------------------
+# Carriers
+# --------------------------------------------------
+def scan_image(carrier):
+    """
+    Scan an image (path or binary file object).
+    """
+    from .image_steg import jpeg_core
+
+    if jpeg_core.is_jpeg(carrier):
+        # DCT-domain payloads: magnitudes >= 2 of the luma AC coefficients
+        values = jpeg_core.leading_units(carrier, SAMPLE_UNITS)
+        magnitudes = np.abs(values)
+        lsbs = (magnitudes & 1).astype(np.uint8)
+        header = _prefix_found(lambda nbits, count: lsbs[:count], (1,))
+        return _report("image", header, westfeld_profile(magnitudes, start=2),
+                       _leading_chi(magnitudes, start=2), 0.0, None, len(values))
+
+    from PIL import Image
+    from .image_steg.image_core import NATIVE_MODES
+
+    with Image.open(carrier) as img:
+        if img.mode not in NATIVE_MODES:
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        pixels = np.asarray(img)
+    flat = pixels.reshape(-1)
+
+    # the image header is always written at 1 bit per channel value
+    header = _prefix_found(lambda nbits, count: flat[:count] & 1, (1,))
+
+    width = pixels.shape[1] * (pixels.shape[2] if pixels.ndim == 3 else 1)
+    rows = max(1, -(-SAMPLE_UNITS // width))
+    step = max(1, pixels.shape[0] // rows)
+    rs = max(rs_rate(_groups(pixels[:rows])), rs_rate(_groups(pixels[::step])))
+    return _report("image", header, westfeld_profile(flat[:SAMPLE_UNITS]), _leading_chi(flat),
+                   chi_square(_spread(flat)), rs,
+                   int(min(flat.size, SAMPLE_UNITS + SPREAD_UNITS)))
+
+
+def _samples(buf, sampwidth):
+    """
+    Integer sample values from little-endian PCM bytes.
+    """
+    raw = np.frombuffer(buf, dtype=np.uint8)
+    raw = raw[:len(raw) // sampwidth * sampwidth].reshape(-1, sampwidth).astype(np.int64)
+    if sampwidth == 1:
+        return raw[:, 0]  # unsigned 8-bit
+    value = np.zeros(len(raw), dtype=np.int64)
+    for i in range(sampwidth):
+        value |= raw[:, i] << (8 * i)
+    sign = 1 << (8 * sampwidth - 1)
+    return (value ^ sign) - sign
+
+
+def scan_audio(carrier):
+    """
+    Scan a WAV file (path or binary file object): the leading samples and
+    AUDIO_WINDOWS windows spread over the recording.
+    """
+    from .audio_steg.wavstream import _open, read_layout
+
+    with _open(carrier, "rb") as f:
+        layout = read_layout(f)
+        frame = layout.nchannels * layout.sampwidth
+        frames = layout.nframes
+
+        lead_frames = min(frames, -(-SAMPLE_UNITS // layout.nchannels))
+        f.seek(layout.data_offset)
+        leading = _samples(f.read(lead_frames * frame), layout.sampwidth)
+
+        window = max(1, SPREAD_UNITS // AUDIO_WINDOWS // layout.nchannels)
+        spread = []
+        for i in range(AUDIO_WINDOWS):
+            first = (frames - window) * i // max(AUDIO_WINDOWS - 1, 1) if frames > window else 0
+            f.seek(layout.data_offset + first * frame)
+            spread.append(_samples(f.read(window * frame), layout.sampwidth))
+            if frames <= window:
+                break
+        spread = np.concatenate(spread)
+
+    # the header's bits are in the lowest byte of each sample
+    low = (leading & 0xFF).astype(np.uint8)
+    header = _prefix_found(lambda nbits, count: low[:count] & ((1 << nbits) - 1), bitplane.SUPPORTED_BITS)
+
+    # pairs (2k, 2k+1) survive reducing to the low 16 bits
+    profile = westfeld_profile(leading & 0xFFFF)
+    chi_leading = _leading_chi(leading & 0xFFFF)
+    chi_spread = chi_square(spread & 0xFFFF)
+    # no RS: neighbouring samples differ by far more than one LSB flip, so
+    # its estimate is noise (anywhere from 0 to 1 on clean recordings)
+    return _report("audio", header, profile, chi_leading, chi_spread, None, int(len(leading) + len(spread)))
+
+
+def scan_video(carrier):
+    """
+    Scan a video file: its first VIDEO_FRAMES frames.
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(str(carrier))
+    frames = []
+    try:
+        while len(frames) < VIDEO_FRAMES:
+            ret, frame = cap.read()
+            if not ret or frame is None:
+                break
+            frames.append(frame)
+    finally:
+        cap.release()
+    if not frames:
+        raise ValueError("Could not read video frames")
+
+    first = frames[0].reshape(-1)
+    header = _prefix_found(lambda nbits, count: first[:count] & ((1 << nbits) - 1), (1, 2))
+    stacked = np.concatenate([f.reshape(-1) for f in frames])
+    width = frames[0].shape[1] * frames[0].shape[2]
+    rows = max(1, -(-SAMPLE_UNITS // width))
+    rs = rs_rate(_groups(frames[0][:rows]))
+    return _report("video", header, westfeld_profile(first[:SAMPLE_UNITS]), _leading_chi(first),
+                   chi_square(_spread(stacked)), rs,
+                   int(min(first.size, SAMPLE_UNITS) + min(stacked.size, SPREAD_UNITS)))
+
+
+def scan(carrier, media=None):
+    """
+    Scan one carrier; media defaults to the file extension.
+
+    returns : dict with "score" (0-1), "suspicious" and per-detector results
+    """
+    from . import codecs
+    from .capacity import media_for
+
+    media = media or media_for(carrier if isinstance(carrier, (str, os.PathLike)) else "")
+    return codecs.get(media).scan(carrier)
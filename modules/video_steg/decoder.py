@@ -7,19 +7,65 @@ Expected call:
 - stego_video_path: path to uploaded stego video
 - output_path: desired path (or directory) where extracted file will be saved
 - password: password if the payload was encrypted
+- progress_cb: optional callable(done, total) reporting payload bytes extracted
+- workers: processes extracting chunks in parallel (videos embedded with chunk_size only, default 0)
+- entry: name (or position) of one file to extract from an archive payload
 Returns:
-- absolute path to the extracted file (string)
+- absolute path to the extracted file (string); an archive payload extracted whole
+  is returned as a .zip of its entries
+
+list_contents(stego_video_path, password=None, bits=1) returns the archive entries
+(modules.archive.Entry) without extracting them, or None for a single hidden file.
+
+decode_range(stego_video_path, start, length, password=None, bits=1) returns bytes
+[start, start + length) of the hidden file from a video embedded with chunk_size,
+seeking straight to the frames that hold them.
 """
 import os
+from .. import archive
 from .video_core import VideoSteganography
 
-def decode(stego_video_path, output_path, password=None, bits=1):
+def decode(stego_video_path, output_path, password=None, bits=1, progress_cb=None, workers=0, entry=None):
     if not os.path.exists(stego_video_path):
         raise FileNotFoundError(f"Input stego video not found: {stego_video_path}")
 
     if bits not in (1,2):
         raise ValueError("bits must be 1 or 2")
 
-    vs = VideoSteganography(bits_per_channel=bits)
-    saved_path = vs.extract_to_file(in_video=stego_video_path, out_path=output_path, password=password or None, progress_cb=None)
+    vs = VideoSteganography(bits_per_channel=bits, workers=workers)
+    if entry is not None:
+        return vs.extract_entry(stego_video_path, entry, output_path, password=password or None)
+
+    saved_path = vs.extract_to_file(in_video=stego_video_path, out_path=output_path, password=password or None, progress_cb=progress_cb)
+
+    # Several files were hidden together: hand them back as a ZIP
+    with open(saved_path, "rb") as f:
+        if archive.is_archive(f.read(archive.PREFIX_SIZE)):
+            f.seek(0)
+            zip_path = os.path.splitext(saved_path)[0] + ".zip"
+            archive.to_zip(f, zip_path)
+        else:
+            zip_path = None
+    if zip_path:
+        os.remove(saved_path)
+        return zip_path
     return saved_path
+
+
+def decode_range(stego_video_path, start, length, password=None, bits=1):
+    if not os.path.exists(stego_video_path):
+        raise FileNotFoundError(f"Input stego video not found: {stego_video_path}")
+
+    if bits not in (1,2):
+        raise ValueError("bits must be 1 or 2")
+
+    vs = VideoSteganography(bits_per_channel=bits)
+    return vs.extract_range(stego_video_path, start, length, password=password or None)
+
+
+def list_contents(stego_video_path, password=None, bits=1):
+    if not os.path.exists(stego_video_path):
+        raise FileNotFoundError(f"Input stego video not found: {stego_video_path}")
+
+    vs = VideoSteganography(bits_per_channel=bits)
+    return vs.list_archive(stego_video_path, password=password or None)
@@ -6,29 +6,53 @@ Expected call:
 
 - input_video_path: existing video path (carrier)
 - secret: path to payload file to embed (server will read it). For security, prefer file path only.
+  A list of paths is packed into one archive payload (modules.archive) and embedded in a single pass.
 - output_video_path: where to save the stego video (full path)
 - password: optional password string to encrypt payload (AES-GCM)
 - bits: 1 or 2 bits per channel (default 1)
-Returns: None (raises on error)
+- progress_cb: optional callable(done, total) reporting frames written
+- workers: embed worker processes for the frame pipeline (default 0: single process; decoding and
+  FFV1 encoding stay serial, so extra workers only pay off for heavy payload frames)
+- segment_copy: only re-encode payload frames, stream-copy the rest and the audio (default True)
+- compress: compress the payload (codec picked from its content) before embedding (default True)
+- chunk_size: store the payload as independently decodable chunks of this many bytes behind a
+  frame index, for byte-range and parallel extraction (default None: one contiguous payload)
+- scatter: spread the payload over the leading frames at positions seeded by the password
+  (needs a password, not combined with chunk_size; the decoder finds it on its own)
+Returns: output_video_path (raises on error)
 """
 import os
+import tempfile
+from .. import archive
 from .video_core import VideoSteganography  # see note: we will create a tiny shim to import class
 
-def encode(input_video_path, secret, output_video_path, password=None, bits=1):
+def encode(input_video_path, secret, output_video_path, password=None, bits=1, progress_cb=None, workers=0, segment_copy=True, compress=True, chunk_size=None, scatter=False):
     if not os.path.exists(input_video_path):
         raise FileNotFoundError(f"Input video not found: {input_video_path}")
+
+    if isinstance(secret, (list, tuple)):
+        with tempfile.TemporaryDirectory() as tmp:
+            bundle = archive.write(secret, os.path.join(tmp, archive.DEFAULT_NAME))
+            return encode(input_video_path, bundle, output_video_path, password=password, bits=bits,
+                          progress_cb=progress_cb, workers=workers, segment_copy=segment_copy,
+                          compress=compress, chunk_size=chunk_size, scatter=scatter)
+
     if not os.path.exists(secret):
         raise FileNotFoundError(f"Payload file not found: {secret}")
 
     if bits not in (1, 2):
         raise ValueError("bits must be 1 or 2")
 
-    vs = VideoSteganography(bits_per_channel=bits)
-    # Use compress=True by default for smaller payloads; change if you want raw
+    if scatter and not password:
+        raise ValueError("Scattered embedding needs a password")
+
+    vs = VideoSteganography(bits_per_channel=bits, workers=workers, segment_copy=segment_copy,
+                           chunk_size=chunk_size, scatter=scatter)
+    # Compressible payloads (text, documents) need far fewer frames; media files are stored as-is
     vs.embed_file_into_video(in_video=input_video_path,
                              payload_path=secret,
                              out_video=output_video_path,
                              password=password or None,
-                             compress=True,
-                             progress_cb=None)
-    return None
+                             compress=compress,
+                             progress_cb=progress_cb)
+    return output_video_path
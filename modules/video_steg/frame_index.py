@@ -0,0 +1,105 @@
+"""
+Frame index for random-access video payloads.
+
+An indexed payload is split into fixed-size chunks, and each chunk is
+stored as its own container (modules.container) with its own compression,
+encryption and CRC. A small index at the very start of the embedded
+stream (inside the first frame) records where every chunk begins:
+
+    magic "STI" | version | bits | chunk size (I) | payload size (Q)
+    | name length (H) | chunk count (I)
+    name
+    count x (stream offset (Q) | stored length (I))
+    CRC32 of everything above (I)
+
+Offsets are byte positions in the embedded stream, so a decoder can turn
+one into a frame number and a unit inside that frame, seek there
+(CAP_PROP_POS_FRAMES) and decode that chunk alone.
+"""
+
+import struct
+import zlib
+from collections import namedtuple
+
+MAGIC = b"STI"
+VERSION = 1
+HEAD_FMT = ">3sBBIQHI"
+HEAD_SIZE = struct.calcsize(HEAD_FMT)
+ENTRY_FMT = ">QI"
+ENTRY_SIZE = struct.calcsize(ENTRY_FMT)
+CRC_SIZE = 4
+
+# Chunks are decoded whole, so this bounds the waste of a small range read
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# offset: where the chunk's container starts in the embedded stream
+# length: container header + stored bytes
+Chunk = namedtuple("Chunk", "offset length")
+FrameIndex = namedtuple("FrameIndex", "bits chunk_size size name chunks")
+
+
+def has_prefix(buf) -> bool:
+    return bytes(buf[:len(MAGIC)]) == MAGIC and len(buf) > len(MAGIC) and buf[len(MAGIC)] == VERSION
+
+
+def index_size(name_len, count):
+    return HEAD_SIZE + name_len + count * ENTRY_SIZE + CRC_SIZE
+
+
+def build(bits, chunk_size, size, name, lengths):
+    """
+    Serialise the index for chunks of the given stored lengths, which are
+    embedded back to back right after it.
+
+    returns : bytes
+    """
+    name_bytes = name.encode("utf-8")
+    out = bytearray(struct.pack(HEAD_FMT, MAGIC, VERSION, bits, chunk_size, size,
+                                len(name_bytes), len(lengths)))
+    out += name_bytes
+
+    offset = index_size(len(name_bytes), len(lengths))
+    for length in lengths:
+        out += struct.pack(ENTRY_FMT, offset, length)
+        offset += length
+
+    out += struct.pack(">I", zlib.crc32(out))
+    return bytes(out)
+
+
+def read(read_bytes, prefix=b""):
+    """
+    Parse an index from a byte source.
+
+    read_bytes : callable(count) -> bytes, positioned at the index
+                 (after `prefix`, the bytes already consumed)
+
+    returns : FrameIndex, or raises ValueError
+    """
+    head = prefix + read_bytes(HEAD_SIZE - len(prefix))
+    if not has_prefix(head):
+        raise ValueError("No hidden data found")
+
+    _, _, bits, chunk_size, size, name_len, count = struct.unpack(HEAD_FMT, head)
+    if chunk_size == 0 or count != -(-size // chunk_size):
+        raise ValueError("No hidden data found (index corrupted)")
+
+    body = read_bytes(name_len + count * ENTRY_SIZE)
+    (crc,) = struct.unpack(">I", read_bytes(CRC_SIZE))
+    if zlib.crc32(body, zlib.crc32(head)) != crc:
+        raise ValueError("Hidden data index failed the integrity check (carrier modified or corrupted)")
+
+    name = body[:name_len].decode("utf-8", "replace")
+    chunks = [Chunk(*entry) for entry in struct.iter_unpack(ENTRY_FMT, body[name_len:])]
+    return FrameIndex(bits, chunk_size, size, name, chunks)
+
+
+def chunks_for_range(index, start, length):
+    """
+    Indices of the chunks holding payload bytes [start, start + length).
+    """
+    if start < 0 or length < 0 or start + length > index.size:
+        raise ValueError(f"Byte range outside the hidden file ({index.size} bytes)")
+    if length == 0:
+        return range(0)
+    return range(start // index.chunk_size, (start + length - 1) // index.chunk_size + 1)
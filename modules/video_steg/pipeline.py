@@ -0,0 +1,200 @@
+"""
+Three-stage parallel frame pipeline for video embedding.
+
+    reader (calling thread) -> embed workers (processes) -> writer (thread)
+
+Decoded frames live in a ring of shared-memory slots: the reader decodes
+straight into a free slot, workers embed their bits in place and the
+writer hands slots back once the frame is encoded. Only (sequence, slot)
+tuples travel through the queues, so frame buffers are never pickled, and
+the ring size bounds memory to `depth` frames in flight.
+
+Each payload-bearing frame is dispatched with its precomputed unit offset,
+so workers never coordinate with each other. Frames past the payload skip
+the workers and go straight to the writer, which restores the original
+order before encoding.
+"""
+
+import multiprocessing as mp
+import queue
+import threading
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from .. import bitplane, metrics
+
+POLL_SECONDS = 0.5
+
+
+def _payload_units(payload, nbits, unit_start, count):
+    """
+    Unit values for carrier units [unit_start, unit_start + count).
+    Only the payload bytes covering that range are expanded.
+    """
+    bit_start = unit_start * nbits
+    bit_stop = min((unit_start + count) * nbits, len(payload) * 8)
+    byte_start = bit_start // 8
+    byte_stop = -(-bit_stop // 8)
+
+    bits = np.unpackbits(payload[byte_start:byte_stop])
+    bits = bits[bit_start - byte_start * 8:bit_stop - byte_start * 8]
+    return bitplane.bits_to_units(bits, nbits)
+
+
+# --------------------------------------------------
+# Stage 2: embed workers
+# --------------------------------------------------
+def _embed_worker(ring_name, ring_shape, payload_name, payload_len, nbits, tasks, done):
+    ring_shm = shared_memory.SharedMemory(name=ring_name)
+    payload_shm = shared_memory.SharedMemory(name=payload_name)
+    ring = np.ndarray(ring_shape, dtype=np.uint8, buffer=ring_shm.buf)
+    payload = np.ndarray((payload_len,), dtype=np.uint8, buffer=payload_shm.buf)
+    units_per_frame = ring[0].size
+
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            seq, slot, unit_start = task
+            try:
+                units = _payload_units(payload, nbits, unit_start, units_per_frame)
+                bitplane.embed_units(ring[slot], units, nbits)
+                done.put((seq, slot, None))
+            except Exception as e:
+                done.put((seq, slot, str(e) or e.__class__.__name__))
+    finally:
+        del ring, payload
+        ring_shm.close()
+        payload_shm.close()
+
+
+# --------------------------------------------------
+# Pipeline driver
+# --------------------------------------------------
+def embed_pipelined(cap, writer, payload, nbits, frames_needed,
+                    workers=2, depth=None, progress_cb=None, total_frames=0,
+                    max_frames=None):
+    """
+    Copy every frame of `cap` to `writer`, embedding `payload` into the
+    first `frames_needed` frames using `workers` processes.
+
+    payload    : bytes to embed (header included)
+    depth      : number of shared frame slots (defaults to 2 per worker + 2)
+    max_frames : stop after this many frames (default: whole video)
+
+    returns : number of payload units written
+    """
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    depth = depth or 2 * workers + 2
+    ring_shape = (depth, height, width, 3)
+    units_per_frame = height * width * 3
+    total_units = bitplane.units_needed(len(payload) * 8, nbits)
+
+    ring_shm = shared_memory.SharedMemory(create=True, size=int(np.prod(ring_shape)))
+    payload_shm = shared_memory.SharedMemory(create=True, size=max(len(payload), 1))
+    ring = np.ndarray(ring_shape, dtype=np.uint8, buffer=ring_shm.buf)
+    payload_shm.buf[:len(payload)] = payload
+
+    free = queue.Queue()
+    for slot in range(depth):
+        free.put(slot)
+    tasks = mp.Queue()
+    done = mp.Queue()
+    failure = []
+    crashed = []
+
+    procs = [
+        mp.Process(
+            target=_embed_worker,
+            args=(ring_shm.name, ring_shape, payload_shm.name, len(payload), nbits, tasks, done),
+            daemon=True,
+        )
+        for _ in range(workers)
+    ]
+    for p in procs:
+        p.start()
+
+    # Stage 3: ordered writer
+    def write_frames():
+        next_seq = 0
+        pending = {}
+        while True:
+            item = done.get()
+            if item is None:
+                break
+            seq, slot, error = item
+            if error is not None:
+                failure.append(error)
+            if failure:
+                # keep draining so workers can exit, but stop writing
+                continue
+            pending[seq] = slot
+            try:
+                while next_seq in pending:
+                    slot = pending.pop(next_seq)
+                    with metrics.stage("video.write", ring[slot].nbytes):
+                        writer.write(ring[slot])
+                    free.put(slot)
+                    next_seq += 1
+                    if progress_cb:
+                        progress_cb(next_seq, total_frames)
+            except Exception as e:
+                # the reader sees the failure on its next poll
+                failure.append(str(e) or e.__class__.__name__)
+
+    writer_thread = threading.Thread(target=write_frames, daemon=True)
+    writer_thread.start()
+
+    # Stage 1: reader
+    seq = 0
+    try:
+        while not failure and (max_frames is None or seq < max_frames):
+            try:
+                slot = free.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                # a worker killed mid-frame (OOM, segfault) never returns its slot
+                crashed = [p for p in procs if not p.is_alive()]
+                if crashed:
+                    failure.append(f"embed worker exited with code {crashed[0].exitcode}")
+                    break
+                if not writer_thread.is_alive():
+                    failure.append("frame writer stopped")
+                    break
+                continue
+
+            with metrics.stage("video.read", ring[slot].nbytes):
+                ret, _ = cap.read(ring[slot])
+            if not ret:
+                break
+
+            if seq < frames_needed:
+                tasks.put((seq, slot, seq * units_per_frame))
+            else:
+                done.put((seq, slot, None))
+            seq += 1
+    finally:
+        for _ in procs:
+            tasks.put(None)
+        for p in procs:
+            # the dead worker may have held the task queue's lock
+            p.join(POLL_SECONDS * 4 if crashed else None)
+            if p.is_alive():
+                p.terminate()
+                p.join()
+        done.put(None)
+        writer_thread.join()
+
+        del ring
+        ring_shm.close()
+        ring_shm.unlink()
+        payload_shm.close()
+        payload_shm.unlink()
+
+    if failure:
+        raise ValueError(f"Frame embedding failed: {failure[0]}")
+
+    return min(min(seq, frames_needed) * units_per_frame, total_units)
@@ -1,30 +1,67 @@
+import io
 import os
 import cv2
 import json
 import struct
-import hashlib
+import shutil
 import tempfile
 import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .. import archive, bitplane, capacity, compression, container, metrics, scatter as scattering
+from . import frame_index
+from .pipeline import embed_pipelined
 
 # --------------------------------------------------
-# Helper: convert bytes to bits
+# Helper: locate an ffmpeg binary
 # --------------------------------------------------
-def bytes_to_bits(data: bytes):
-    for byte in data:
-        for i in range(7, -1, -1):
-            yield (byte >> i) & 1
+def find_ffmpeg():
+    """
+    System ffmpeg if on PATH, else the binary bundled with moviepy
+    (imageio-ffmpeg). Returns None when neither is available.
+    """
+    path = shutil.which("ffmpeg")
+    if path:
+        return path
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return None
 
 # --------------------------------------------------
-# Helper: convert bits to bytes
+# Helper: mux the payload segment with the untouched source
 # --------------------------------------------------
-def bits_to_bytes(bits):
-    out = bytearray()
-    for i in range(0, len(bits), 8):
-        byte = 0
-        for b in bits[i:i+8]:
-            byte = (byte << 1) | b
-        out.append(byte)
-    return bytes(out)
+def remux_with_source(segment_path, in_video, out_video, ffmpeg):
+    """
+    Build an MKV whose first video track is the lossless payload segment
+    (read by the decoder) and whose default video track plus all audio
+    tracks are stream-copied from the source.
+    """
+    with metrics.stage("video.remux", os.path.getsize(in_video)):
+        _run_remux(segment_path, in_video, out_video, ffmpeg)
+
+
+def _run_remux(segment_path, in_video, out_video, ffmpeg):
+    # Track order is part of the format: the decoder reads frames through
+    # cv2.VideoCapture, which opens the first video track whatever the
+    # dispositions say, so the payload segment must be mapped first. The
+    # source track is marked default only so players show the original.
+    # tests/test_video.py pins this order.
+    result = subprocess.run(
+        [
+            ffmpeg, "-y", "-loglevel", "error",
+            "-i", segment_path, "-i", in_video,
+            "-map", "0:v:0", "-map", "1:v:0", "-map", "1:a?",
+            "-c", "copy",
+            "-disposition:v:0", "0", "-disposition:v:1", "default",
+            "-f", "matroska", out_video,
+        ],
+        capture_output=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError("ffmpeg remux failed: " + result.stderr.decode(errors="replace").strip())
 
 # --------------------------------------------------
 # Video Steganography Core Class
@@ -34,12 +71,30 @@ class VideoSteganography:
     LSB-based Video Steganography
     - Hides ANY file inside a video
     - Uses lossless video processing
+    - Bits are written with whole-frame NumPy operations (see modules.bitplane)
+    - The payload travels in the shared binary container (modules.container),
+      checked against its CRC while it is extracted
+    - workers > 0 runs encoding through the parallel frame pipeline
+    - segment_copy re-encodes only the payload-bearing frames and
+      stream-copies the source video and audio next to them (needs ffmpeg)
+    - chunk_size stores the payload as independently decodable chunks
+      behind a frame index (see frame_index), so byte ranges can be
+      extracted by seeking and whole files by parallel workers
+    - scatter spreads the payload over the first SCATTER_FRAMES frames (or
+      as many as it needs) at password-seeded positions (see modules.scatter)
     """
 
-    def __init__(self, bits_per_channel=1):
+    def __init__(self, bits_per_channel=1, workers=0, segment_copy=False, chunk_size=None,
+                 scatter=False):
         if bits_per_channel not in (1, 2):
             raise ValueError("bits_per_channel must be 1 or 2")
+        if scatter and chunk_size:
+            raise ValueError("Scattered embedding cannot be combined with chunk_size")
         self.bits = bits_per_channel
+        self.workers = workers
+        self.segment_copy = segment_copy
+        self.chunk_size = chunk_size
+        self.scatter = scatter
 
     # --------------------------------------------------
     # Embed file into video
@@ -58,25 +113,33 @@ class VideoSteganography:
         if not os.path.exists(payload_path):
             raise FileNotFoundError("Payload file not found")
 
-        # Read payload
+        # Metadata-only check first: an incompressible payload that cannot
+        # fit is turned away before it is read
         with open(payload_path, "rb") as f:
-            payload = f.read()
-
-        payload_size = len(payload)
-        payload_hash = hashlib.md5(payload).hexdigest()
-
-        # Build header
-        header = {
-            "filename": os.path.basename(payload_path),
-            "size": payload_size,
-            "md5": payload_hash
-        }
-
-        header_bytes = json.dumps(header).encode("utf-8")
-        header_len = struct.pack(">I", len(header_bytes))
+            sample = f.read(compression.SAMPLE_SIZE)
+        info = capacity.probe(in_video, "video")
+        codec, stored = capacity.estimate_stored(
+            os.path.getsize(payload_path), sample, password, compress
+        )
+        available = capacity.stored_capacity(
+            info, self.bits, len(os.path.basename(payload_path).encode("utf-8"))
+        )
+        if codec == "none" and stored > available:
+            raise ValueError(f"Payload too large for this video (max {available} bytes stored)")
+
+        if self.chunk_size:
+            frame_bytes = info.units // max(info.details["frames"], 1) * self.bits // 8
+            final_payload = self._build_indexed(payload_path, password, compress, frame_bytes)
+        else:
+            # Header + file name + payload (compressed / encrypted while the
+            # file is streamed in), so the payload is held in memory only once
+            final_payload = container.build(
+                payload_path, container.MEDIA_VIDEO, self.bits,
+                password=password, compress=compress,
+                name=os.path.basename(payload_path)
+            )
 
-        final_payload = header_len + header_bytes + payload
-        bits = list(bytes_to_bits(final_payload))
+        total_units = bitplane.units_needed(len(final_payload) * 8, self.bits)
 
         cap = cv2.VideoCapture(in_video)
         width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
@@ -84,51 +147,156 @@ class VideoSteganography:
         fps = cap.get(cv2.CAP_PROP_FPS)
         frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
 
-        capacity = frames * width * height * 3 * self.bits
-        if len(bits) > capacity:
+        units_per_frame = width * height * 3
+        layout = None
+        if self.scatter:
+            try:
+                layout = _scatter_layout(units_per_frame, frames, self.bits, password)
+                layout.plan(total_units - layout.header_units)
+            except ValueError:
+                cap.release()
+                raise
+            frames_needed = layout.spread
+        else:
+            frames_needed = -(-total_units // units_per_frame)
+        if frames_needed > frames:
+            cap.release()
             raise ValueError("Payload too large for this video")
 
-        # Prepare output video
+        ffmpeg = find_ffmpeg() if self.segment_copy else None
+
+        try:
+            if ffmpeg:
+                tmp_dir = tempfile.mkdtemp()
+                segment_path = os.path.join(tmp_dir, "segment.mkv")
+                try:
+                    unit_index = self._write_frames(
+                        cap, segment_path, fps, (width, height), final_payload,
+                        frames_needed, frames_needed, progress_cb, layout=layout
+                    )
+                    if unit_index >= total_units:
+                        remux_with_source(segment_path, in_video, out_video, ffmpeg)
+                finally:
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+            else:
+                unit_index = self._write_frames(
+                    cap, out_video, fps, (width, height), final_payload,
+                    frames_needed, None, progress_cb, total_frames=frames, layout=layout
+                )
+        finally:
+            cap.release()
+
+        if unit_index < total_units:
+            raise ValueError("Video ended before the payload was fully embedded")
+
+    # --------------------------------------------------
+    # Indexed layout: frame index + one container per chunk
+    # --------------------------------------------------
+    def _build_indexed(self, payload_path, password, compress, frame_bytes):
+        name = os.path.basename(payload_path)
+        size = os.path.getsize(payload_path)
+        count = -(-size // self.chunk_size)
+
+        # The decoder reads the whole index from the first frame
+        index_len = frame_index.index_size(len(name.encode("utf-8")), count)
+        if index_len > frame_bytes:
+            raise ValueError("Too many chunks for the frame index; use a larger chunk_size")
+
+        # Chunks are appended after room for the index, which is filled in
+        # once their stored lengths are known
+        out = bytearray(index_len)
+        lengths = []
+        with open(payload_path, "rb") as f:
+            for data in iter(lambda: f.read(self.chunk_size), b""):
+                chunk = container.build(
+                    data, container.MEDIA_VIDEO, self.bits,
+                    password=password, compress=compress
+                )
+                lengths.append(len(chunk))
+                out += chunk
+        if len(lengths) != count:
+            raise ValueError("Payload file changed while it was being read")
+
+        out[:index_len] = frame_index.build(self.bits, self.chunk_size, size, name, lengths)
+        return out
+
+    # --------------------------------------------------
+    # Write frames (payload embedded into the leading ones)
+    # --------------------------------------------------
+    def _write_frames(self, cap, out_path, fps, size, payload, frames_needed,
+                      max_frames=None, progress_cb=None, total_frames=None, layout=None):
         fourcc = cv2.VideoWriter_fourcc(*"FFV1")  # lossless
-        writer = cv2.VideoWriter(out_video, fourcc, fps, (width, height))
-
-        bit_index = 0
-        total_bits = len(bits)
-        payload_done = False
-
-        while True:
-          ret, frame = cap.read()
-
-        # 🔴 HARD SAFETY CHECK (THIS FIXES YOUR ERROR)
-          if not ret or frame is None:
-            break
-
-          if not payload_done:
-           height, width, channels = frame.shape
-
-           for y in range(height):
-             for x in range(width):
-                for c in range(channels):
-                    if bit_index < total_bits:
-                        frame[y, x, c] = (frame[y, x, c] & 0xFE) | bits[bit_index]
-                        bit_index += 1
-                    else:
-                        payload_done = True
+        writer = cv2.VideoWriter(out_path, fourcc, fps, size)
+        total_frames = total_frames or frames_needed
+        started = time.perf_counter()
+        first_frame = cap.get(cv2.CAP_PROP_POS_FRAMES)
+
+        unit_index = 0
+        frame_index = 0
+
+        try:
+            if layout is not None:
+                # Scattered: the header's last unit is padded, so header and
+                # payload are converted to units separately
+                header = bitplane.bits_to_units(
+                    bitplane.bytes_to_bits(payload[:container.HEADER_SIZE]), self.bits)
+                units = bitplane.bits_to_units(
+                    bitplane.bytes_to_bits(payload[container.HEADER_SIZE:]), self.bits)
+
+                while max_frames is None or frame_index < max_frames:
+                    ret, frame = _read_frame(cap)
+                    if not ret or frame is None:
+                        break
+
+                    if frame_index < frames_needed:
+                        with metrics.stage("video.embed", frame.nbytes):
+                            if frame_index == 0:
+                                unit_index += bitplane.embed_units_at(
+                                    frame, header, self.bits, layout.header_positions())
+                            unit_index += bitplane.embed_units_at(
+                                frame, layout.slice(frame_index, units), self.bits,
+                                layout.positions(frame_index)
+                            )
+
+                    _write_frame(writer, frame)
+                    frame_index += 1
+
+                    if progress_cb:
+                        progress_cb(frame_index, total_frames)
+
+            elif self.workers > 0:
+                unit_index = embed_pipelined(
+                    cap, writer, payload, self.bits, frames_needed,
+                    workers=self.workers, progress_cb=progress_cb,
+                    total_frames=total_frames, max_frames=max_frames
+                )
+            else:
+                units = bitplane.bits_to_units(bitplane.bytes_to_bits(payload), self.bits)
+
+                while max_frames is None or frame_index < max_frames:
+                    ret, frame = _read_frame(cap)
+                    if not ret or frame is None:
                         break
-                if payload_done:
-                    break
-             if payload_done:
-                break
 
-          # ✅ ALWAYS write frame (even after payload is done)
-          writer.write(frame)
+                    # Only the leading frames carry payload, the rest pass straight through
+                    if frame_index < frames_needed:
+                        with metrics.stage("video.embed", frame.nbytes):
+                            unit_index += bitplane.embed_units(
+                                frame, units[unit_index:], self.bits
+                            )
 
-          # ✅ CLEAN CLOSE (VERY IMPORTANT)
-          cap.release()
-          writer.release()
+                    _write_frame(writer, frame)
+                    frame_index += 1
 
+                    if progress_cb:
+                        progress_cb(frame_index, total_frames)
+        finally:
+            writer.release()
 
-        
+        if metrics.enabled():
+            frames = cap.get(cv2.CAP_PROP_POS_FRAMES) - first_frame
+            metrics.observe("stego_frames_per_second", frames / (time.perf_counter() - started), op="encode")
+        return unit_index
 
     # --------------------------------------------------
     # Extract file from video
@@ -140,48 +308,469 @@ class VideoSteganography:
         password=None,
         progress_cb=None
     ):
+        started = time.perf_counter()
+        # 32 bits are enough to tell a container from anything else
+        cap, reader, prefix, capacity = self._open_reader(in_video, password)
+
+        try:
+            if frame_index.has_prefix(prefix):
+                return self._extract_indexed(in_video, reader, prefix, out_path, password, progress_cb)
+            if not container.has_prefix(prefix):
+                return self._extract_legacy(reader, prefix, out_path, progress_cb)
+
+            header, name = self._read_header(reader, prefix, capacity)
+            payload = container.PayloadDecoder(header, password, name)
+            filename = os.path.basename(name.decode("utf-8", "replace")) or "extracted.bin"
+            out_file = os.path.join(out_path, filename) if os.path.isdir(out_path) else out_path
+
+            # Stream the payload one frame's worth of bits at a time; the CRC
+            # is checked as it goes and a bad file is removed
+            chunk_bytes = max(1, reader.frame_bits // 8)
+            done = 0
+
+            with open(out_file, "wb") as f:
+                try:
+                    while done < header.length:
+                        nbytes = min(header.length - done, chunk_bytes)
+                        f.write(payload.update(reader.read_bytes(nbytes)))
+                        done += nbytes
+                        if progress_cb:
+                            progress_cb(done, header.length)
+                    f.write(payload.finalize())
+                except ValueError:
+                    f.close()
+                    os.remove(out_file)
+                    raise
+        finally:
+            if metrics.enabled():
+                frames = cap.get(cv2.CAP_PROP_POS_FRAMES)
+                metrics.observe("stego_frames_per_second", frames / (time.perf_counter() - started), op="decode")
+            cap.release()
+
+        return out_file
+
+    def _open_reader(self, in_video, password=None):
+        """
+        Open the video and read the 4-byte prefix of the embedded stream.
+        With a password, a scattered layout is tried when the leading
+        frames hold no container, then the legacy layout. Every attempt
+        gets a fresh capture: seeking back to frame 0 is not reliable for
+        every container.
+
+        returns : (capture, reader, prefix, stream capacity in bytes);
+                  the caller releases the capture
+        """
+        def attempt(make_reader):
+            cap = cv2.VideoCapture(in_video)
+            try:
+                reader = make_reader(cap)
+                return cap, reader, reader.read_bytes(container.PREFIX_SIZE)
+            except Exception:
+                cap.release()
+                raise
+
+        cap, reader, prefix = attempt(lambda c: FrameBitReader(c, self.bits))
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        capacity = reader.frame_bits * frames // 8
+        if frame_index.has_prefix(prefix) or container.has_prefix(prefix) or not password:
+            return cap, reader, prefix, capacity
+        units_per_frame = reader.frame_bits // self.bits
+        cap.release()
+
+        try:
+            layout = _scatter_layout(units_per_frame, frames, self.bits, password)
+            cap, reader, prefix = attempt(lambda c: ScatterFrameReader(c, layout, self.bits))
+            if container.has_prefix(prefix):
+                return cap, reader, prefix, capacity
+            cap.release()
+        except ValueError:
+            pass
+
+        cap, reader, prefix = attempt(lambda c: FrameBitReader(c, self.bits))
+        return cap, reader, prefix, capacity
+
+    def _read_header(self, reader, prefix, capacity):
+        header = container.parse_header(
+            prefix + reader.read_bytes(container.HEADER_SIZE - container.PREFIX_SIZE),
+            container.MEDIA_VIDEO, capacity - container.HEADER_SIZE
+        )
+        if header.bits != self.bits:
+            raise ValueError(f"Video was encoded with {header.bits} bit(s) per channel")
+        if isinstance(reader, ScatterFrameReader):
+            reader.plan(bitplane.units_needed((header.name_len + header.length) * 8, self.bits))
+        return header, reader.read_bytes(header.name_len)
+
+    # --------------------------------------------------
+    # Indexed payloads: whole file, byte ranges, the index itself
+    # --------------------------------------------------
+    def _read_index(self, reader, prefix=b""):
+        index = frame_index.read(reader.read_bytes, prefix)
+        if index.bits != self.bits:
+            raise ValueError(f"Video was encoded with {index.bits} bit(s) per channel")
+        return index
+
+    def _iter_chunks(self, in_video, reader, index, password):
+        # Sequential: the chunks follow the index, so keep reading forward
+        if self.workers <= 0 or len(index.chunks) < 2:
+            for chunk in index.chunks:
+                yield _read_chunk(reader, chunk, password)
+            return
+
+        # Parallel: every worker seeks to its own chunk; results are
+        # yielded in order with a bounded number in flight
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            chunks = iter(index.chunks)
+            running = [
+                pool.submit(_extract_chunk, in_video, self.bits, chunk, password)
+                for _, chunk in zip(range(self.workers * 2), chunks)
+            ]
+            while running:
+                data = running.pop(0).result()
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    running.append(pool.submit(_extract_chunk, in_video, self.bits, chunk, password))
+                yield data
+
+    def _extract_indexed(self, in_video, reader, prefix, out_path, password=None, progress_cb=None):
+        index = self._read_index(reader, prefix)
+        filename = os.path.basename(index.name) or "extracted.bin"
+        out_file = os.path.join(out_path, filename) if os.path.isdir(out_path) else out_path
+        done = 0
+
+        with open(out_file, "wb") as f:
+            try:
+                for data in self._iter_chunks(in_video, reader, index, password):
+                    f.write(data)
+                    done += len(data)
+                    if progress_cb:
+                        progress_cb(done, index.size)
+                if done != index.size:
+                    raise ValueError("Hidden data failed the integrity check (carrier modified or corrupted)")
+            except ValueError:
+                f.close()
+                os.remove(out_file)
+                raise
+
+        return out_file
+
+    def read_index(self, in_video):
+        """
+        Frame index of an indexed stego video, or None for other layouts.
+        """
         cap = cv2.VideoCapture(in_video)
-        bits = []
+        try:
+            reader = FrameBitReader(cap, self.bits)
+            prefix = reader.read_bytes(container.PREFIX_SIZE)
+            if not frame_index.has_prefix(prefix):
+                return None
+            return self._read_index(reader, prefix)
+        finally:
+            cap.release()
+
+    def extract_range(self, in_video, start, length, password=None):
+        """
+        Bytes [start, start + length) of the hidden file, decoding only the
+        chunks that hold them (the video must be embedded with chunk_size).
+        """
+        _, stream = self.open_payload(in_video, password)
+        with stream:
+            if not isinstance(stream.raw, IndexedPayload):
+                raise ValueError("Video has no frame index (it was embedded without chunk_size)")
+            frame_index.chunks_for_range(stream.raw.index, start, length)
+            stream.seek(start)
+            return stream.read(length)
+
+    # --------------------------------------------------
+    # Hidden file as a stream: archives and partial reads
+    # --------------------------------------------------
+    def open_payload(self, in_video, password=None):
+        """
+        Hidden file as a readable binary stream, decoded only as far as it
+        is read. Indexed videos give a seekable stream that decodes just
+        the chunks it touches.
+
+        returns : (file name, buffered file object); close it when done
+        """
+        cap, reader, prefix, capacity = self._open_reader(in_video, password)
+
+        try:
+            if frame_index.has_prefix(prefix):
+                index = self._read_index(reader, prefix)
+                raw = IndexedPayload(cap, reader, index, password)
+                return os.path.basename(index.name), io.BufferedReader(raw, max(index.chunk_size, 1))
+
+            if container.has_prefix(prefix):
+                header, name = self._read_header(reader, prefix, capacity)
+                chunks = _container_chunks(reader, header, container.PayloadDecoder(header, password, name))
+                name = name.decode("utf-8", "replace")
+            else:
+                name, size = _legacy_header(reader, prefix)
+                chunks = _raw_chunks(reader, size)
+        except Exception:
+            cap.release()
+            raise
+
+        return os.path.basename(name), io.BufferedReader(archive.ChunkStream(chunks, on_close=cap.release))
+
+    def list_archive(self, in_video, password=None):
+        """
+        Entries of an archive payload (modules.archive), or None when the
+        video hides a single file. Only the table of contents is decoded.
+        """
+        _, stream = self.open_payload(in_video, password)
+        with stream:
+            prefix = stream.read(archive.PREFIX_SIZE)
+            if not archive.is_archive(prefix):
+                return None
+            return archive.read_toc(stream.read, prefix)
+
+    def extract_entry(self, in_video, entry, out_path, password=None):
+        """
+        Extract one archive entry (name or position). Decoding stops once
+        the entry is complete; indexed videos seek straight to it.
+        """
+        _, stream = self.open_payload(in_video, password)
+        with stream:
+            prefix = stream.read(archive.PREFIX_SIZE)
+            if not archive.is_archive(prefix):
+                raise ValueError("Hidden data is a single file, not an archive")
+            found = archive.find(archive.read_toc(stream.read, prefix), entry)
+
+            filename = os.path.basename(found.name) or "extracted.bin"
+            out_file = os.path.join(out_path, filename) if os.path.isdir(out_path) else out_path
+            with open(out_file, "wb") as f:
+                try:
+                    archive.copy_entry(stream, found, f)
+                except ValueError:
+                    f.close()
+                    os.remove(out_file)
+                    raise
+
+        return out_file
 
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
+    # --------------------------------------------------
+    # Extract videos written with the old JSON header
+    # --------------------------------------------------
+    def _extract_legacy(self, reader, prefix, out_path, progress_cb=None):
+        filename, size = _legacy_header(reader, prefix)
+        out_file = os.path.join(out_path, filename) if os.path.isdir(out_path) else out_path
+        chunk_bytes = max(1, reader.frame_bits // 8)
+        written = 0
 
-            for y in range(frame.shape[0]):
-                for x in range(frame.shape[1]):
-                    for c in range(3):
-                        bits.append(frame[y, x, c] & 1)
+        with open(out_file, "wb") as f:
+            try:
+                while written < size:
+                    nbytes = min(size - written, chunk_bytes)
+                    f.write(reader.read_bytes(nbytes))
+                    written += nbytes
+                    if progress_cb:
+                        progress_cb(written, size)
+            except ValueError:
+                f.close()
+                os.remove(out_file)
+                raise
 
+        return out_file
+
+
+# --------------------------------------------------
+# Payload readers shared by the extract paths
+# --------------------------------------------------
+def _legacy_header(reader, prefix):
+    header_len = struct.unpack(">I", prefix)[0]
+    if header_len == 0 or header_len > MAX_HEADER_LEN:
+        raise ValueError("No hidden data found in video (invalid header length)")
+
+    try:
+        header = json.loads(reader.read_bytes(header_len).decode("utf-8"))
+        return os.path.basename(header["filename"]), int(header["size"])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("No hidden data found in video (header unreadable)")
+
+
+def _raw_chunks(reader, size):
+    chunk_bytes = max(1, reader.frame_bits // 8)
+    done = 0
+    while done < size:
+        nbytes = min(size - done, chunk_bytes)
+        yield reader.read_bytes(nbytes)
+        done += nbytes
+
+
+def _container_chunks(reader, header, payload):
+    # Plaintext of a container payload, one frame's worth of bits at a time
+    for stored in _raw_chunks(reader, header.length):
+        yield payload.update(stored)
+    yield payload.finalize()
+
+
+class IndexedPayload(io.RawIOBase):
+    """
+    Seekable file object over an indexed payload. Reads seek the capture
+    to the chunk holding the position and decode that chunk alone; the
+    last decoded chunk is kept for the next read.
+    """
+
+    def __init__(self, cap, reader, index, password=None):
+        self._cap = cap
+        self._reader = reader
+        self._password = password
+        self.index = index
+        self._pos = 0
+        self._chunk = None
+        self._data = b""
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self.index.size}[whence]
+        self._pos = max(base + offset, 0)
+        return self._pos
+
+    def readinto(self, b):
+        if self._pos >= self.index.size:
+            return 0
+        i, skip = divmod(self._pos, self.index.chunk_size)
+        if i != self._chunk:
+            self._reader.seek(self.index.chunks[i].offset)
+            self._data = _read_chunk(self._reader, self.index.chunks[i], self._password)
+            self._chunk = i
+        n = min(len(b), len(self._data) - skip)
+        if n <= 0:
+            raise ValueError("Hidden data index does not match its chunks (carrier modified or corrupted)")
+        b[:n] = self._data[skip:skip + n]
+        self._pos += n
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._cap.release()
+        super().close()
+
+
+# --------------------------------------------------
+# Indexed chunk decoding
+# --------------------------------------------------
+def _read_chunk(reader, chunk, password=None):
+    """
+    Decode one chunk container at the reader's position.
+    """
+    header = container.parse_header(
+        reader.read_bytes(container.HEADER_SIZE), container.MEDIA_VIDEO,
+        chunk.length - container.HEADER_SIZE
+    )
+    if header.name_len or container.HEADER_SIZE + header.length != chunk.length:
+        raise ValueError("Hidden data index does not match its chunks (carrier modified or corrupted)")
+    return container.open_payload(header, reader.read_bytes(header.length), password)
+
+
+def _extract_chunk(in_video, bits, chunk, password=None):
+    # Runs in a worker process with its own capture
+    cap = cv2.VideoCapture(in_video)
+    try:
+        reader = FrameBitReader(cap, bits)
+        reader.seek(chunk.offset)
+        return _read_chunk(reader, chunk, password)
+    finally:
         cap.release()
 
-        # Read header length
-        if len(bits) < 32:
-             raise ValueError("No hidden data found in video (header missing)")
 
-        header_len_bytes = bits_to_bytes(bits[:32])
-        if len(header_len_bytes) != 4:
-             raise ValueError("Invalid or corrupted stego video (header length unreadable)")
+# --------------------------------------------------
+# Scattered layout
+# --------------------------------------------------
+# Frames a scattered payload is spread over (more if it needs them)
+SCATTER_FRAMES = 30
+
+
+def _scatter_layout(units_per_frame, frames, bits, password):
+    header_units = bitplane.units_needed(container.HEADER_SIZE * 8, bits)
+    return scattering.Layout(units_per_frame, frames, header_units, password, span=SCATTER_FRAMES)
+
+
+# --------------------------------------------------
+# Timed frame I/O
+# --------------------------------------------------
+def _read_frame(cap):
+    with metrics.stage("video.read") as timer:
+        ret, frame = cap.read()
+        if ret and frame is not None:
+            timer.nbytes = frame.nbytes
+    return ret, frame
+
 
-        header_len = struct.unpack(">I", header_len_bytes)[0]
+def _write_frame(writer, frame):
+    with metrics.stage("video.write", frame.nbytes):
+        writer.write(frame)
 
-        header_bytes = bits_to_bytes(bits[32:32 + header_len * 8])
 
-        header = json.loads(header_bytes.decode("utf-8"))
+# --------------------------------------------------
+# Streaming LSB reader over a cv2.VideoCapture
+# --------------------------------------------------
+# Largest JSON header accepted from legacy videos
+MAX_HEADER_LEN = 64 * 1024
+
 
-        payload_start = 32 + header_len * 8
-        payload_end = payload_start + header["size"] * 8
-        payload_bits = bits[payload_start:payload_end]
+class FrameBitReader(bitplane.BitReader):
+    """
+    Pulls embedded bits out of a video one frame at a time.
 
-        payload = bits_to_bytes(payload_bits)
+    Only one decoded frame is held in memory, and frames are only decoded
+    when more bits are requested.
+    """
 
-        # Save extracted file
-        if os.path.isdir(out_path):
-            out_file = os.path.join(out_path, header["filename"])
+    def __init__(self, cap, bits_per_channel=1):
+        super().__init__(bits_per_channel)
+        self.cap = cap
+        self.frame_bits = (
+            int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            * int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            * 3 * bits_per_channel
+        )
+        self.frames_read = 0
+
+    def seek(self, offset):
+        """
+        Continue reading at byte `offset` of the embedded stream, seeking
+        the capture to the frame that holds it.
+        """
+        frame, unit = divmod(offset * 8 // self.bits, self.frame_bits // self.bits)
+        if frame == self.frames_read - 1 and self._block is not None:
+            block = self._block
         else:
-            out_file = out_path
+            if frame != self.frames_read:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame)
+                self.frames_read = frame
+            block = self._next_block()
+        self.reset(block, unit)
 
-        with open(out_file, "wb") as f:
-            f.write(payload)
+    def _next_block(self):
+        ret, frame = _read_frame(self.cap)
+        if not ret or frame is None:
+            raise ValueError("No hidden data found in video (payload incomplete)")
+        self.frames_read += 1
+        return frame
 
-        return out_file
+
+class ScatterFrameReader(scattering.ScatterReader):
+    """
+    Embedded bits of a scattered video, one frame at a time from the
+    capture's current position (the first frame).
+    """
+
+    def __init__(self, cap, layout, bits_per_channel=1):
+        self.cap = cap
+        self.frame_bits = layout.window_units * bits_per_channel
+        super().__init__(self._read_frame, layout, bits_per_channel)
+
+    def _read_frame(self):
+        ret, frame = _read_frame(self.cap)
+        if not ret or frame is None:
+            raise ValueError("No hidden data found in video (payload incomplete)")
+        return frame
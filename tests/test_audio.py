@@ -0,0 +1,98 @@
+"""
+Audio codec round trips, including WAVs written before the container
+format (4-byte length header).
+
+Run from the repository root:
+
+    python -m pytest tests
+"""
+
+import io
+import os
+import struct
+import wave
+
+import numpy as np
+import pytest
+
+from modules import bitplane, codecs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_AUDIO = os.path.join(ROOT, "sample_audio.wav")
+
+
+def _payload(size, seed=0):
+    return np.random.default_rng(seed).bytes(size)
+
+
+def _samples(path):
+    with wave.open(path, "rb") as w:
+        return w.getparams(), w.readframes(w.getnframes())
+
+
+@pytest.mark.parametrize("bits", [1, 2, 4])
+def test_audio_round_trip(tmp_path, bits):
+    payload = _payload(10000)
+    out = str(tmp_path / "stego.wav")
+    codecs.get("audio").encode(SAMPLE_AUDIO, payload, out, bits=bits, compress=False)
+    assert codecs.get("audio").decode(out, bits=bits) == payload
+
+    # only the low `bits` bits of the samples change
+    params, original = _samples(SAMPLE_AUDIO)
+    _, stego = _samples(out)
+    assert len(stego) == len(original)
+    diff = np.frombuffer(original, np.uint8) ^ np.frombuffer(stego, np.uint8)
+    assert diff.max() < 1 << bits
+    assert not diff[1::params.sampwidth].any()
+
+
+def test_audio_round_trip_file_objects(tmp_path):
+    secret = tmp_path / "secret.txt"
+    secret.write_bytes(b"spooled upload " * 200)
+    with open(SAMPLE_AUDIO, "rb") as f:
+        carrier = io.BytesIO(f.read())
+    out = io.BytesIO()
+    codecs.get("audio").encode(carrier, str(secret), out)
+    out.seek(0)
+    decoded = str(tmp_path / "decoded.txt")
+    assert codecs.get("audio").decode(out, decoded) == decoded
+    assert (tmp_path / "decoded.txt").read_bytes() == secret.read_bytes()
+
+
+@pytest.mark.parametrize("scatter", [False, True])
+def test_audio_password(tmp_path, scatter):
+    payload = _payload(5000)
+    out = str(tmp_path / "stego.wav")
+    codecs.get("audio").encode(SAMPLE_AUDIO, payload, out, password="secret", scatter=scatter)
+    assert codecs.get("audio").decode(out, password="secret") == payload
+    with pytest.raises(ValueError):
+        codecs.get("audio").decode(out, password="wrong")
+
+
+def test_audio_scatter_needs_password(tmp_path):
+    with pytest.raises(ValueError):
+        codecs.get("audio").encode(SAMPLE_AUDIO, b"x", str(tmp_path / "stego.wav"), scatter=True)
+
+
+def test_audio_too_large(tmp_path):
+    params, _ = _samples(SAMPLE_AUDIO)
+    capacity = params.nframes * params.nchannels // 8
+    with pytest.raises(ValueError):
+        codecs.get("audio").encode(SAMPLE_AUDIO, _payload(capacity), str(tmp_path / "stego.wav"),
+                                   compress=False)
+
+
+def test_audio_legacy_input(tmp_path):
+    # the original encoder: 4-byte big-endian length, then the raw payload,
+    # one bit in the LSB of every sample
+    payload = b"written by the old encoder"
+    params, frames = _samples(SAMPLE_AUDIO)
+    samples = np.frombuffer(frames, np.uint8).copy()
+    units = bitplane.bytes_to_bits(struct.pack(">I", len(payload)) + payload)
+    bitplane.embed_units(samples[::params.sampwidth], units, 1)
+
+    out = str(tmp_path / "legacy.wav")
+    with wave.open(out, "wb") as w:
+        w.setparams(params)
+        w.writeframes(samples.tobytes())
+    assert codecs.get("audio").decode(out) == payload
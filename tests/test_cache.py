@@ -0,0 +1,95 @@
+"""
+Result cache: deduplicated uploads, cached results and LRU eviction.
+
+Run from the repository root:
+
+    python -m pytest tests
+"""
+
+import hashlib
+import io
+import os
+import time
+
+from cache import ResultCache, hash_file, hash_stream
+
+
+def _age(path, seconds):
+    # backdate an entry past min_age, older entries first in LRU order
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+def test_hash_stream_resets_position(tmp_path):
+    data = b"cached carrier " * 1000
+    stream = io.BytesIO(data)
+    stream.seek(10)
+    assert hash_stream(stream) == hashlib.sha256(data).hexdigest()
+    assert stream.tell() == 0
+
+    path = tmp_path / "carrier.bin"
+    path.write_bytes(data)
+    assert hash_file(str(path)) == hash_stream(stream)
+
+
+def test_key_is_stable():
+    assert ResultCache.key("image", "abc", {"bits": 1, "scatter": False}) == \
+        ResultCache.key("image", "abc", {"scatter": False, "bits": 1})
+    assert ResultCache.key("image", "abc", 1) != ResultCache.key("image", "abc", 2)
+
+
+def test_store_blob_deduplicates(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=1 << 20)
+    digest, path = cache.store_blob(io.BytesIO(b"upload"), suffix=".PNG")
+    assert digest == hashlib.sha256(b"upload").hexdigest()
+    assert path.endswith(digest + ".png")
+
+    again = cache.store_blob(io.BytesIO(b"upload"), suffix=".png")
+    assert again == (digest, path)
+    assert len(os.listdir(cache.blobs)) == 1
+
+
+def test_result_round_trip(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=1 << 20)
+    key = ResultCache.key("audio", "encode", "digest")
+    assert cache.get(key) is None
+
+    stream = io.BytesIO(b"stego output")
+    path = cache.put_stream(key, stream, "stego.wav")
+    assert stream.tell() == 0
+    assert cache.get(key) == path
+    with open(path, "rb") as f:
+        assert f.read() == b"stego output"
+
+    src = tmp_path / "result.mkv"
+    src.write_bytes(b"video output")
+    other = ResultCache.key("video", "encode", "digest")
+    path = cache.put_file(other, str(src))
+    assert os.path.basename(path) == "result.mkv"
+    with open(cache.get(other), "rb") as f:
+        assert f.read() == b"video output"
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=2500, min_age=60)
+    keys = [ResultCache.key("image", i) for i in range(3)]
+    for i, key in enumerate(keys[:2]):
+        cache.put_stream(key, io.BytesIO(bytes(1000)), "out.png")
+        _age(os.path.dirname(cache.get(key)), 3600 - i)
+    # reading the older entry makes it the most recently used one
+    cache.get(keys[0])
+
+    cache.put_stream(keys[2], io.BytesIO(bytes(1000)), "out.png")
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[2]) is not None
+
+
+def test_pinned_and_recent_entries_are_kept(tmp_path):
+    _, pinned = ResultCache(str(tmp_path), max_bytes=1 << 20).store_blob(io.BytesIO(bytes(1000)))
+    _age(pinned, 3600)
+    cache = ResultCache(str(tmp_path), max_bytes=500, pinned=lambda: [pinned])
+
+    _, recent = cache.store_blob(io.BytesIO(bytes(800)))
+    assert os.path.exists(pinned)
+    assert os.path.exists(recent)
@@ -0,0 +1,135 @@
+"""
+Image codec round trips: LSB PNG output, the JPEG DCT codec and images
+from the original stegano-based encoder.
+
+Run from the repository root:
+
+    python -m pytest tests
+"""
+
+import io
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from modules import codecs
+from modules.image_steg import image_core, jpeg_core
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_IMAGE = os.path.join(ROOT, "sample_img.jpg")
+
+
+def _payload(size, seed=0):
+    return np.random.default_rng(seed).bytes(size)
+
+
+def _encode(payload, codec="image", **options):
+    out = io.BytesIO()
+    codecs.get(codec).encode(SAMPLE_IMAGE, payload, out, **options)
+    out.seek(0)
+    return out
+
+
+# --------------------------------------------------
+# LSB (PNG output)
+# --------------------------------------------------
+@pytest.mark.parametrize("bits", [1, 2, 4])
+def test_image_round_trip(bits):
+    payload = _payload(5000)
+    stego = _encode(payload, bits=bits, compress=False)
+    assert codecs.get("image").decode_bytes(stego, with_bits=True) == (payload, bits)
+
+
+def test_image_round_trip_text():
+    stego = _encode("hidden text, compressed " * 50)
+    assert codecs.get("image").decode(stego) == b"hidden text, compressed " * 50
+
+
+def test_image_decode_to_file(tmp_path):
+    stego = str(tmp_path / "stego.png")
+    codecs.get("image").encode(SAMPLE_IMAGE, b"to a file", stego)
+    out = str(tmp_path / "secret.bin")
+    assert codecs.get("image").decode(stego, out) == out
+    assert (tmp_path / "secret.bin").read_bytes() == b"to a file"
+
+
+@pytest.mark.parametrize("scatter", [False, True])
+def test_image_password(scatter):
+    payload = _payload(20000)
+    stego = _encode(payload, password="secret", scatter=scatter)
+    assert codecs.get("image").decode_bytes(stego, password="secret") == payload
+
+    stego.seek(0)
+    with pytest.raises(ValueError):
+        codecs.get("image").decode_bytes(stego, password="wrong")
+
+
+def test_image_scatter_hides_the_header():
+    stego = _encode(_payload(1000), password="secret", scatter=True)
+    pixels = np.array(Image.open(stego))
+    assert image_core.read_header(pixels) is None
+
+
+def test_image_too_large():
+    with Image.open(SAMPLE_IMAGE) as img:
+        capacity = image_core.capacity_bytes(np.array(img).shape)
+    with pytest.raises(ValueError):
+        _encode(_payload(capacity + 1), compress=False)
+
+
+def test_image_legacy_stegano_input():
+    lsb = pytest.importorskip("stegano.lsb")
+    out = io.BytesIO()
+    lsb.hide(SAMPLE_IMAGE, "written by the old encoder").save(out, "PNG")
+    out.seek(0)
+    assert codecs.get("image").decode_bytes(out) == b"written by the old encoder"
+
+
+# --------------------------------------------------
+# JPEG (DCT coefficients)
+# --------------------------------------------------
+def _jpeg(**options):
+    with Image.open(SAMPLE_IMAGE) as img:
+        out = io.BytesIO()
+        img.convert("RGB").save(out, "JPEG", **options)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("options", [{}, {"progressive": True}, {"subsampling": 0}])
+def test_jpeg_file_round_trip(options):
+    # re-encoding keeps every coefficient, so the pixels are unchanged
+    data = _jpeg(quality=85, **options)
+    jpeg = jpeg_core.JpegFile(data)
+    again = jpeg_core.JpegFile(jpeg.to_bytes())
+    for a, b in zip(jpeg.components, again.components):
+        assert np.array_equal(a.blocks(), b.blocks())
+    assert np.array_equal(np.array(Image.open(io.BytesIO(data))),
+                          np.array(Image.open(io.BytesIO(jpeg.to_bytes()))))
+
+
+@pytest.mark.parametrize("password", [None, "secret"])
+def test_jpeg_round_trip(password):
+    payload = _payload(2000)
+    stego = _encode(payload, codec="jpeg", password=password, compress=False)
+    assert jpeg_core.is_jpeg(stego)
+    assert codecs.get("jpeg").decode_bytes(stego, password=password) == payload
+
+
+def test_jpeg_round_trip_progressive_carrier():
+    out = io.BytesIO()
+    jpeg_core.embed_bytes(io.BytesIO(_jpeg(progressive=True)), b"progressive carrier", out)
+    out.seek(0)
+    assert jpeg_core.extract_bytes(out) == b"progressive carrier"
+
+
+def test_jpeg_capacity():
+    capacity = jpeg_core.capacity_bytes(SAMPLE_IMAGE)
+    payload = _payload(capacity)
+    out = io.BytesIO()
+    jpeg_core.embed_bytes(SAMPLE_IMAGE, payload, out, compress=False)
+    out.seek(0)
+    assert jpeg_core.extract_bytes(out) == payload
+    with pytest.raises(ValueError):
+        jpeg_core.embed_bytes(SAMPLE_IMAGE, payload + b"x", io.BytesIO(), compress=False)
@@ -0,0 +1,189 @@
+"""
+Round trips of the payload building blocks: bit planes, the container,
+encryption and the multi-file archive.
+
+Run from the repository root:
+
+    python -m pytest tests
+"""
+
+import io
+import zipfile
+
+import numpy as np
+import pytest
+
+from modules import archive, bitplane, container, crypto
+
+
+def _payload(size, seed=0):
+    return np.random.default_rng(seed).bytes(size)
+
+
+# --------------------------------------------------
+# Bit planes
+# --------------------------------------------------
+def test_bytes_bits_round_trip():
+    data = _payload(257)
+    bits = bitplane.bytes_to_bits(data)
+    assert len(bits) == 8 * len(data)
+    assert bitplane.bits_to_bytes(bits) == data
+
+
+@pytest.mark.parametrize("nbits", [1, 2, 3, 4])
+def test_units_round_trip(nbits):
+    bits = bitplane.bytes_to_bits(_payload(101))
+    units = bitplane.bits_to_units(bits, nbits)
+    assert len(units) == bitplane.units_needed(len(bits), nbits)
+    assert units.max() < 1 << nbits
+    assert np.array_equal(bitplane.units_to_bits(units, nbits)[:len(bits)], bits)
+
+
+@pytest.mark.parametrize("nbits", [1, 2, 3, 4])
+def test_embed_extract_units(nbits):
+    carrier = np.random.default_rng(1).integers(0, 256, size=(40, 30, 3), dtype=np.uint8)
+    original = carrier.copy()
+    units = bitplane.bits_to_units(bitplane.bytes_to_bits(_payload(200)), nbits)
+
+    written = bitplane.embed_units(carrier, units, nbits, start=7)
+    assert written == len(units)
+    assert np.array_equal(bitplane.extract_units(carrier, nbits, len(units), start=7), units)
+    # only the low bits of the written units change
+    diff = (carrier ^ original).reshape(-1)
+    assert not diff[:7].any() and not diff[7 + len(units):].any()
+    assert diff.max() < 1 << nbits
+
+
+def test_embed_extract_units_at():
+    carrier = np.zeros(1000, dtype=np.int16)
+    units = bitplane.bits_to_units(bitplane.bytes_to_bits(_payload(37)), 1)
+    positions = np.random.default_rng(2).permutation(carrier.size)[:len(units)]
+    bitplane.embed_units_at(carrier, units, 1, positions)
+    assert np.array_equal(bitplane.extract_units_at(carrier, 1, positions), units)
+
+
+# --------------------------------------------------
+# Container
+# --------------------------------------------------
+def _open(stream, password=None):
+    header = container.parse_header(stream, container.MEDIA_AUDIO, len(stream) - container.HEADER_SIZE)
+    name_end = container.HEADER_SIZE + header.name_len
+    name = bytes(stream[container.HEADER_SIZE:name_end])
+    return header, name, container.open_payload(header, stream[name_end:], password, name)
+
+
+@pytest.mark.parametrize("compress", [False, True])
+@pytest.mark.parametrize("password", [None, "secret"])
+def test_container_round_trip(compress, password):
+    payload = b"container round trip " * 500
+    stream = container.build(payload, container.MEDIA_AUDIO, 2, password=password,
+                             compress=compress, name="notes.txt")
+    assert container.has_prefix(stream)
+
+    header, name, out = _open(stream, password)
+    assert out == payload
+    assert name == b"notes.txt"
+    assert header.bits == 2
+    assert bool(header.encryption) == bool(password)
+    if compress and not password:
+        assert len(stream) < len(payload)
+
+
+def test_container_streams_from_path(tmp_path):
+    secret = tmp_path / "secret.bin"
+    secret.write_bytes(_payload(3000))
+    stream = container.build(str(secret), container.MEDIA_AUDIO, 1, compress=False)
+    assert _open(stream)[2] == secret.read_bytes()
+
+
+def test_container_rejects_other_media():
+    stream = container.build(b"image payload", container.MEDIA_IMAGE, 1)
+    with pytest.raises(ValueError):
+        container.parse_header(stream, container.MEDIA_VIDEO)
+
+
+def test_container_detects_corruption():
+    stream = container.build(_payload(500), container.MEDIA_AUDIO, 1, compress=False)
+    stream[-1] ^= 1
+    with pytest.raises(ValueError):
+        _open(stream)
+
+
+def test_container_needs_the_password():
+    stream = container.build(b"locked", container.MEDIA_AUDIO, 1, password="secret")
+    with pytest.raises(ValueError):
+        _open(stream)
+    with pytest.raises(ValueError):
+        _open(stream, "wrong")
+
+
+# --------------------------------------------------
+# Encryption
+# --------------------------------------------------
+@pytest.mark.parametrize("size", [0, 1, crypto.CHUNK_SIZE, crypto.CHUNK_SIZE + 17])
+def test_crypto_round_trip(size):
+    data = _payload(size)
+    sealed = crypto.encrypt(data, "secret")
+    assert crypto.is_encrypted(sealed)
+    assert len(sealed) == crypto.encrypted_size(size)
+    assert crypto.decrypt(sealed, "secret") == data
+
+
+def test_crypto_rejects_wrong_password_and_tampering():
+    sealed = crypto.encrypt(_payload(100), "secret")
+    with pytest.raises(ValueError):
+        crypto.decrypt(sealed, "wrong")
+    sealed[-1] ^= 1
+    with pytest.raises(ValueError):
+        crypto.decrypt(sealed, "secret")
+
+
+def test_crypto_rejects_truncation():
+    sealed = crypto.encrypt(_payload(crypto.CHUNK_SIZE + 100), "secret")
+    with pytest.raises(ValueError):
+        crypto.decrypt(sealed[:crypto.encrypted_size(crypto.CHUNK_SIZE)], "secret")
+
+
+# --------------------------------------------------
+# Archive
+# --------------------------------------------------
+def _files(tmp_path):
+    first = tmp_path / "a.txt"
+    first.write_bytes(b"first file\n" * 10)
+    second = tmp_path / "b.bin"
+    second.write_bytes(_payload(5000))
+    return [str(first), str(second)]
+
+
+def test_archive_round_trip(tmp_path):
+    files = _files(tmp_path)
+    data = archive.pack(files)
+    assert archive.is_archive(data)
+
+    entries = archive.list_entries(data)
+    assert [e.name for e in entries] == ["a.txt", "b.bin"]
+    for i, path in enumerate(files):
+        with open(path, "rb") as f:
+            expected = f.read()
+        assert archive.extract(data, i) == expected
+        assert archive.extract(data, entries[i].name) == expected
+
+
+def test_archive_to_zip(tmp_path):
+    files = _files(tmp_path)
+    path = archive.write(files, str(tmp_path / "packed.sta"))
+    out = io.BytesIO()
+    with open(path, "rb") as f:
+        archive.to_zip(f, out)
+    with zipfile.ZipFile(out) as zf:
+        assert zf.namelist() == ["a.txt", "b.bin"]
+        assert zf.read("b.bin") == (tmp_path / "b.bin").read_bytes()
+
+
+def test_archive_detects_corruption(tmp_path):
+    data = bytearray(archive.pack(_files(tmp_path)))
+    data[-1] ^= 1
+    with pytest.raises(ValueError):
+        archive.extract(bytes(data), "b.bin")
+    with pytest.raises(ValueError):
+        archive.extract(bytes(data), "missing.txt")
@@ -0,0 +1,118 @@
+"""
+Screening scores for clean carriers and for this app's own stego outputs.
+
+Run from the repository root:
+
+    python -m pytest tests
+"""
+
+import io
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from modules import codecs, steganalysis
+from modules.image_steg import jpeg_core
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_IMAGE = os.path.join(ROOT, "sample_img.jpg")
+SAMPLE_AUDIO = os.path.join(ROOT, "sample_audio.wav")
+SAMPLE_VIDEO = os.path.join(ROOT, "sample_vedio.mp4")
+
+
+def _photo():
+    with Image.open(SAMPLE_IMAGE) as img:
+        return img.convert("RGB")
+
+
+def _png(img):
+    out = io.BytesIO()
+    img.save(out, "PNG")
+    out.seek(0)
+    return out
+
+
+def _payload(size, seed=0):
+    # encrypted / compressed payloads look like random bytes
+    return np.random.default_rng(seed).bytes(size)
+
+
+def _encode_image(size, **options):
+    out = io.BytesIO()
+    codecs.get("image").encode(SAMPLE_IMAGE, _payload(size), out, compress=False, **options)
+    out.seek(0)
+    return out
+
+
+# --------------------------------------------------
+# Clean carriers
+# --------------------------------------------------
+@pytest.mark.parametrize("width", [128, 200, 256, 300, 384, 400, 640, 800])
+@pytest.mark.parametrize("resample", [Image.NEAREST, Image.BILINEAR, Image.LANCZOS])
+def test_resized_photo_is_clean(width, resample):
+    img = _photo()
+    img = img.resize((width, width * img.height // img.width), resample)
+    report = steganalysis.scan_image(_png(img))
+    assert report["score"] < steganalysis.THRESHOLD, report
+
+
+@pytest.mark.parametrize("left, top", [(0, 0), (100, 50), (128, 128), (200, 200), (256, 0), (0, 256)])
+def test_cropped_photo_is_clean(left, top):
+    report = steganalysis.scan_image(_png(_photo().crop((left, top, left + 256, top + 256))))
+    assert report["score"] < steganalysis.THRESHOLD, report
+
+
+def test_grayscale_photo_is_clean():
+    report = steganalysis.scan_image(_png(_photo().convert("L")))
+    assert report["score"] < steganalysis.THRESHOLD, report
+
+
+@pytest.mark.parametrize("path", [SAMPLE_IMAGE, SAMPLE_AUDIO, SAMPLE_VIDEO])
+def test_sample_carriers_are_clean(path):
+    pytest.importorskip("cv2")
+    report = steganalysis.scan(path)
+    assert report["score"] < steganalysis.THRESHOLD, report
+
+
+# --------------------------------------------------
+# Stego outputs
+# --------------------------------------------------
+@pytest.mark.parametrize("size, bits", [(200, 1), (8000, 1), (40000, 1), (8000, 2)])
+def test_sequential_image_is_flagged(size, bits):
+    report = steganalysis.scan_image(_encode_image(size, bits=bits))
+    assert report["suspicious"], report
+
+
+def test_sequential_image_without_header_is_flagged():
+    # the statistics alone: flip the header's LSBs so its magic is gone
+    pixels = np.array(Image.open(_encode_image(8000)))
+    pixels.reshape(-1)[:512] ^= 1
+    report = steganalysis.scan_image(_png(Image.fromarray(pixels)))
+    assert report["header"] is None
+    assert report["chi_square"]["windows"] >= steganalysis.PROFILE_RUN
+    assert report["suspicious"], report
+
+
+def test_scattered_image_is_flagged():
+    # no header in the leading pixels: RS and the spread sample carry it
+    report = steganalysis.scan_image(_encode_image(60000, password="secret", scatter=True))
+    assert report["header"] is None
+    assert report["suspicious"], report
+
+
+def test_jpeg_output_is_flagged():
+    out = io.BytesIO()
+    jpeg_core.embed_bytes(SAMPLE_IMAGE, _payload(3000), out, compress=False)
+    out.seek(0)
+    report = steganalysis.scan_image(out)
+    assert report["suspicious"], report
+
+
+@pytest.mark.parametrize("bits", [1, 2])
+def test_wav_output_is_flagged(tmp_path, bits):
+    out = str(tmp_path / "stego.wav")
+    codecs.get("audio").encode(SAMPLE_AUDIO, _payload(2000), out, bits=bits)
+    report = steganalysis.scan(out)
+    assert report["suspicious"], report
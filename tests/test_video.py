@@ -0,0 +1,157 @@
+"""
+Video codec round trips: plain, password, scattered and indexed payloads,
+and videos written before the container format.
+
+Run from the repository root:
+
+    python -m pytest tests
+"""
+
+import io
+import json
+import os
+import re
+import struct
+import subprocess
+import zipfile
+
+import numpy as np
+import pytest
+
+from modules import bitplane, codecs
+from modules.video_steg import frame_index, video_core
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_VIDEO = os.path.join(ROOT, "sample_vedio.mp4")
+
+
+def _video_tracks(ffmpeg, path):
+    # (codec, is default) per video track, in file order
+    probe = subprocess.run([ffmpeg, "-hide_banner", "-i", path], capture_output=True, text=True)
+    return [(codec, line.rstrip().endswith("(default)"))
+            for line in probe.stderr.splitlines()
+            for codec in re.findall(r"Stream #0:\d+.*?: Video: (\w+)", line)]
+
+
+def test_segment_copy_keeps_payload_track_first(tmp_path):
+    pytest.importorskip("cv2")
+    ffmpeg = video_core.find_ffmpeg()
+    if ffmpeg is None:
+        pytest.skip("ffmpeg not available")
+    secret = tmp_path / "secret.txt"
+    secret.write_bytes(b"stream order " * 100)
+    out = str(tmp_path / "stego.mkv")
+    codecs.get("video").encode(SAMPLE_VIDEO, str(secret), out, segment_copy=True)
+
+    # the decoder reads the first video track (what OpenCV opens); players
+    # show the default one, the untouched source
+    tracks = _video_tracks(ffmpeg, out)
+    assert tracks[0] == ("ffv1", False)
+    assert [default for _, default in tracks[1:]] == [True]
+
+    decoded = codecs.get("video").decode(out, str(tmp_path / "decoded"))
+    with open(decoded, "rb") as f:
+        assert f.read() == secret.read_bytes()
+
+
+def _secret(tmp_path, name="secret.bin", size=20000, seed=0):
+    path = tmp_path / name
+    path.write_bytes(np.random.default_rng(seed).bytes(size))
+    return path
+
+
+@pytest.mark.parametrize("scatter", [False, True])
+def test_video_password(tmp_path, scatter):
+    pytest.importorskip("cv2")
+    secret = _secret(tmp_path)
+    out = str(tmp_path / "stego.mkv")
+    codecs.get("video").encode(SAMPLE_VIDEO, str(secret), out, password="secret", scatter=scatter)
+
+    decoded = codecs.get("video").decode(out, str(tmp_path / "decoded"), password="secret")
+    with open(decoded, "rb") as f:
+        assert f.read() == secret.read_bytes()
+    with pytest.raises(ValueError):
+        codecs.get("video").decode(out, str(tmp_path / "wrong"), password="wrong")
+
+
+def test_video_indexed_archive(tmp_path):
+    pytest.importorskip("cv2")
+    first = _secret(tmp_path, "a.bin", 30000, seed=1)
+    second = _secret(tmp_path, "b.bin", 30000, seed=2)
+    out = str(tmp_path / "stego.mkv")
+    codecs.get("video").encode(SAMPLE_VIDEO, [str(first), str(second)], out,
+                               password="secret", chunk_size=4096)
+
+    entries = codecs.get("video").list_contents(out, password="secret")
+    assert [e.name for e in entries] == ["a.bin", "b.bin"]
+
+    # byte ranges only decode the chunks that hold them
+    start = entries[1].offset + 5000
+    assert (codecs.get("video").decode_range(out, start, 10000, password="secret")
+            == second.read_bytes()[5000:15000])
+
+    extracted = codecs.get("video").decode(out, str(tmp_path / "entry"), password="secret", entry="b.bin")
+    with open(extracted, "rb") as f:
+        assert f.read() == second.read_bytes()
+
+    decoded = codecs.get("video").decode(out, str(tmp_path / "decoded"), password="secret")
+    with zipfile.ZipFile(decoded) as zf:
+        assert zf.read("a.bin") == first.read_bytes()
+        assert zf.read("b.bin") == second.read_bytes()
+
+
+def test_video_legacy_input(tmp_path):
+    # the original encoder: 4-byte length, a JSON header, then the raw
+    # payload, one bit in the LSB of every channel value
+    cv2 = pytest.importorskip("cv2")
+    payload = b"written by the old encoder " * 40
+    header = json.dumps({"filename": "old.txt", "size": len(payload)}).encode("utf-8")
+    bits = bitplane.bytes_to_bits(struct.pack(">I", len(header)) + header + payload)
+
+    cap = cv2.VideoCapture(SAMPLE_VIDEO)
+    frames = [cap.read()[1] for _ in range(2)]
+    cap.release()
+    bitplane.embed_units(frames[0], bits, 1)
+
+    out = str(tmp_path / "legacy.avi")
+    height, width = frames[0].shape[:2]
+    writer = cv2.VideoWriter(out, cv2.VideoWriter_fourcc(*"FFV1"), 25, (width, height))
+    for frame in frames:
+        writer.write(frame)
+    writer.release()
+
+    decoded = codecs.get("video").decode(out, str(tmp_path / "decoded"))
+    with open(decoded, "rb") as f:
+        assert f.read() == payload
+
+
+# --------------------------------------------------
+# Frame index
+# --------------------------------------------------
+def test_frame_index_round_trip():
+    lengths = [1100, 1100, 400]
+    data = frame_index.build(2, 1024, 2500, "notes.txt", lengths)
+    assert frame_index.has_prefix(data)
+    assert len(data) == frame_index.index_size(len("notes.txt"), len(lengths))
+
+    # a prefix already consumed by the caller is passed on
+    stream = io.BytesIO(data)
+    index = frame_index.read(stream.read, stream.read(frame_index.HEAD_SIZE // 2))
+    assert (index.bits, index.chunk_size, index.size, index.name) == (2, 1024, 2500, "notes.txt")
+    assert [c.length for c in index.chunks] == lengths
+    assert index.chunks[0].offset == len(data)
+    assert index.chunks[2].offset == len(data) + 2200
+
+    assert list(frame_index.chunks_for_range(index, 0, 1)) == [0]
+    assert list(frame_index.chunks_for_range(index, 1000, 100)) == [0, 1]
+    assert list(frame_index.chunks_for_range(index, 2048, 452)) == [2]
+    assert list(frame_index.chunks_for_range(index, 10, 0)) == []
+    with pytest.raises(ValueError):
+        frame_index.chunks_for_range(index, 2000, 501)
+
+
+def test_frame_index_detects_corruption():
+    data = bytearray(frame_index.build(1, 1024, 2048, "x", [1100, 1100]))
+    data[-5] ^= 1
+    with pytest.raises(ValueError):
+        frame_index.read(io.BytesIO(bytes(data)).read)